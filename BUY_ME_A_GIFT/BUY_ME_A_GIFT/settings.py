@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'drf_yasg',
     'product.apps.ProductConfig',
     'user.apps.UserConfig',
@@ -48,6 +49,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'product.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -96,6 +98,47 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# The product read cache relies on invalidation counters, so every process
+# must share the same backend in production (e.g. Redis or Memcached).
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+PRODUCT_CACHE_TIMEOUT = int(os.environ.get('PRODUCT_CACHE_TIMEOUT', '300'))
+# Shortest prefix completed by the name suggestions, a shorter one matches too
+# many products to group on every keystroke, see product.search.
+SUGGEST_MIN_LENGTH = int(os.environ.get('SUGGEST_MIN_LENGTH', '3'))
+# Response compression, see product.compression. Views can override the
+# levels with a `compression_levels` attribute.
+COMPRESSION_MIN_LENGTH = int(os.environ.get('COMPRESSION_MIN_LENGTH', '1024'))
+COMPRESSION_LEVELS = {
+    'br': int(os.environ.get('COMPRESSION_BROTLI_LEVEL', '4')),
+    'gzip': int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6')),
+}
+# Number of products in each category leaderboard, see product.leaderboards.
+LEADERBOARD_SIZE = int(os.environ.get('LEADERBOARD_SIZE', '20'))
+# Currency that product prices are converted to for filtering, sorting and
+# totals, and the default rates file of the load_fx_rates command, see product.fx.
+FX_BASE_CURRENCY = os.environ.get('FX_BASE_CURRENCY', 'USD')
+FX_RATES_FILE = os.environ.get('FX_RATES_FILE', str(BASE_DIR / 'fx_rates.json'))
+# Seconds a process may keep using rates another one has changed, with a
+# per-process cache backend such as the default LocMemCache.
+FX_RATES_CACHE_TIMEOUT = int(os.environ.get('FX_RATES_CACHE_TIMEOUT', '60'))
+# Half-life of the trending score, and how many products or seconds of
+# wishlist changes are coalesced in memory before a flush, see product.popularity.
+POPULARITY_HALF_LIFE = float(os.environ.get('POPULARITY_HALF_LIFE', str(7 * 24 * 3600)))
+POPULARITY_FLUSH_SIZE = int(os.environ.get('POPULARITY_FLUSH_SIZE', '500'))
+POPULARITY_FLUSH_INTERVAL = float(os.environ.get('POPULARITY_FLUSH_INTERVAL', '10'))
+# Render the hot product endpoints from values() rows instead of DRF serializers.
+# Opt-in: the fast detail skips the object permission checks of DRF.
+PRODUCT_FAST_SERIALIZER = os.environ.get('PRODUCT_FAST_SERIALIZER', 'false').lower() in ('1', 'true')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -119,6 +162,16 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'product.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'product.renderers.MessagePackRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'product.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 SWAGGER_SETTINGS = {
    'USE_SESSION_AUTH': False,
@@ -154,6 +207,13 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Catalog export files
+EXPORT_ROOT = os.environ.get('EXPORT_ROOT', str(BASE_DIR / 'exports'))
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', '2'))
+# Seconds without progress after which a pending or running export is
+# failed, its process having restarted, see product.exports.
+EXPORT_STALE_AFTER = int(os.environ.get('EXPORT_STALE_AFTER', '3600'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
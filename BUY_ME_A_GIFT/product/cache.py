@@ -0,0 +1,196 @@
+"""
+This module contains the read cache for serialized product payloads.
+
+Product details are cached under a key made of the product id, a
+per-product version counter, a detail generation counter and the fieldset
+variant, so dropping the version or bumping the generation (which set-based
+updates do instead of enumerating the rows they touched) invalidates every
+variant at once. Product lists are cached under a key made of the normalized
+query parameters and a generation counter, so a single counter bump
+invalidates every cached list at once; name suggestions and facet counts
+share that counter. Public wishlists carry a per-user version counter and
+are cached rendered under a key made of that counter, the detail generation
+and the query parameters (the sort option among them), so a write to a
+product only drops the wishlists holding it. All of them are invalidated
+from the model signals in `product.signals`.
+"""
+
+import hashlib
+import time
+from typing import Any, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.request import Request
+
+DETAIL_KEY = 'product:detail:{id}:{version}:{variant}'
+DETAIL_GENERATION_KEY = 'product:detail:generation'
+VERSION_KEY = 'product:version:{id}'
+LIST_KEY = 'product:list:{generation}:{signature}'
+LIST_GENERATION_KEY = 'product:list:generation'
+SUGGEST_KEY = 'product:suggest:{generation}:{limit}:{prefix}'
+FACETS_KEY = 'product:facets:{generation}:{signature}'
+WISHLIST_KEY = 'wishlist:public:{user_id}:{version}:{signature}'
+WISHLIST_VERSION_KEY = 'wishlist:version:{user_id}'
+STATS_KEY = 'product:stats:{kind}:{outcome}'
+STATS_KINDS = ('detail', 'list', 'suggest', 'facets', 'wishlist')
+
+
+def get_timeout() -> int:
+    return getattr(settings, 'PRODUCT_CACHE_TIMEOUT', 300)
+
+
+def get_version(key: str) -> int:
+    """
+    Return the counter stored under `key`.
+
+    A missing counter is seeded from the clock rather than from zero, so a
+    counter evicted from the cache never goes back to a value that older
+    cache entries were stored under.
+    """
+    version: int | None = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_version(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def query_signature(request: Request, exclude: Iterable[str] = ()) -> str:
+    """Hash the request host and its query parameters, ignoring their order."""
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists() if name not in exclude
+        for value in values
+    )
+    raw = request.get_host() + '?' + '&'.join(f'{name}={value}' for name, value in params)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def record(kind: str, hit: bool) -> None:
+    key = STATS_KEY.format(kind=kind, outcome='hits' if hit else 'misses')
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def get_stats() -> dict[str, dict[str, Any]]:
+    """Return the hit/miss counters and hit ratio of every cached payload kind."""
+    stats = {}
+    for kind in STATS_KINDS:
+        hits = cache.get(STATS_KEY.format(kind=kind, outcome='hits'), 0)
+        misses = cache.get(STATS_KEY.format(kind=kind, outcome='misses'), 0)
+        total = hits + misses
+        stats[kind] = {'hits': hits, 'misses': misses, 'ratio': hits / total if total else 0.0}
+    return stats
+
+
+def reset_stats() -> None:
+    cache.delete_many([
+        STATS_KEY.format(kind=kind, outcome=outcome)
+        for kind in STATS_KINDS for outcome in ('hits', 'misses')
+    ])
+
+
+def detail_key(product_id: Any, variant: str = '') -> str:
+    return DETAIL_KEY.format(id=product_id, version=get_product_version(product_id), variant=variant)
+
+
+def get_product(product_id: Any, variant: str = '') -> Any:
+    data = cache.get(detail_key(product_id, variant))
+    record('detail', data is not None)
+    return data
+
+
+def set_product(product_id: Any, data: Any, variant: str = '') -> None:
+    cache.set(detail_key(product_id, variant), data, get_timeout())
+
+
+def get_product_version(product_id: Any) -> str:
+    return f'{get_version(DETAIL_GENERATION_KEY)}.{get_version(VERSION_KEY.format(id=product_id))}'
+
+
+def list_key(request: Request) -> str:
+    return LIST_KEY.format(generation=get_version(LIST_GENERATION_KEY), signature=query_signature(request))
+
+
+def suggest_key(prefix: str, limit: int) -> str:
+    digest = hashlib.sha1(prefix.upper().encode('utf-8')).hexdigest()
+    return SUGGEST_KEY.format(generation=get_version(LIST_GENERATION_KEY), limit=limit, prefix=digest)
+
+
+def facets_key(request: Request, exclude: Iterable[str]) -> str:
+    return FACETS_KEY.format(
+        generation=get_version(LIST_GENERATION_KEY), signature=query_signature(request, exclude))
+
+
+def get_list(key: str, kind: str = 'list') -> Any:
+    data = cache.get(key)
+    record(kind, data is not None)
+    return data
+
+
+def set_list(key: str, data: Any) -> None:
+    cache.set(key, data, get_timeout())
+
+
+def invalidate_products(product_ids: Iterable[Any]) -> None:
+    """
+    Drop the cached details of `product_ids` and every cached list.
+
+    The invalidation runs right away and again once the current transaction
+    commits, so a concurrent read can not re-cache the pre-commit state.
+    """
+    # Deleting a version key invalidates it, the next read reseeds it.
+    keys = [VERSION_KEY.format(id=product_id) for product_id in product_ids]
+
+    def invalidate() -> None:
+        if keys:
+            cache.delete_many(keys)
+        bump_version(LIST_GENERATION_KEY)
+
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+def invalidate_all_products() -> None:
+    """
+    Drop every cached product detail and list, for writes that do not know
+    which rows they changed, such as a filtered `QuerySet.update()`.
+    """
+    def invalidate() -> None:
+        bump_version(DETAIL_GENERATION_KEY)
+        bump_version(LIST_GENERATION_KEY)
+
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+def get_wishlist_version(user_id: Any) -> int:
+    return get_version(WISHLIST_VERSION_KEY.format(user_id=user_id))
+
+
+def wishlist_key(request: Request, user_id: Any) -> str:
+    # The detail generation covers the set-based product updates.
+    version = f'{get_version(DETAIL_GENERATION_KEY)}.{get_wishlist_version(user_id)}'
+    return WISHLIST_KEY.format(user_id=user_id, version=version, signature=query_signature(request))
+
+
+def invalidate_wishlists(user_ids: Iterable[Any]) -> None:
+    """Bump the version of the wishlists of `user_ids`, now and on commit."""
+    keys = [WISHLIST_VERSION_KEY.format(user_id=user_id) for user_id in user_ids]
+
+    def invalidate() -> None:
+        for key in keys:
+            bump_version(key)
+
+    invalidate()
+    transaction.on_commit(invalidate)
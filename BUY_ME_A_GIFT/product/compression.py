@@ -0,0 +1,149 @@
+"""
+This module contains the response compression middleware.
+
+Responses are compressed with brotli or gzip, whichever the client prefers
+in `Accept-Encoding` (brotli on a tie). Bodies shorter than
+`settings.COMPRESSION_MIN_LENGTH` are sent as they are, and streamed bodies
+are compressed chunk by chunk, each chunk being flushed so that the client
+receives it without waiting for the end of the stream.
+
+The compression levels default to `settings.COMPRESSION_LEVELS` and can be
+overridden per view with a `compression_levels` attribute, for example
+`compression_levels = {'br': 1, 'gzip': 1}` on a latency sensitive view.
+"""
+
+import zlib
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator
+
+import brotli
+from django.conf import settings
+from django.http import HttpRequest, HttpResponseBase
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+DEFAULT_LEVELS = {'br': 4, 'gzip': 6}
+DEFAULT_MIN_LENGTH = 1024
+# Content that is already compressed.
+SKIPPED_CONTENT_TYPES = ('application/gzip', 'application/zip', 'application/x-brotli', 'image/', 'audio/', 'video/')
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Return the quality of every coding listed in an Accept-Encoding header."""
+    codings = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            codings[coding.strip().lower()] = quality
+    return codings
+
+
+def choose_encoding(header: str) -> str | None:
+    codings = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for encoding in ('br', 'gzip'):
+        quality = codings.get(encoding, codings.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class Compressor:
+    """Incremental brotli or gzip compressor."""
+
+    def __init__(self, encoding: str, level: int) -> None:
+        self.encoding = encoding
+        if encoding == 'br':
+            self.brotli = brotli.Compressor(quality=level)
+        else:
+            # wbits=31 writes a gzip header and trailer.
+            self.zlib = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress `data` and flush it, so that it can be decoded on its own."""
+        if self.encoding == 'br':
+            compressed: bytes = self.brotli.process(data) + self.brotli.flush()
+            return compressed
+        return self.zlib.compress(data) + self.zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == 'br':
+            finished: bytes = self.brotli.finish()
+            return finished
+        return self.zlib.flush()
+
+
+def compress_sequence(compressor: Compressor, sequence: Iterable[bytes]) -> Iterator[bytes]:
+    for chunk in sequence:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def acompress_sequence(compressor: Compressor, sequence: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    async for chunk in sequence:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with brotli or gzip, see the module documentation.
+    """
+
+    def process_view(self, request: HttpRequest, view_func: Callable, view_args: Any, view_kwargs: Any) -> None:
+        view_class = getattr(view_func, 'view_class', view_func)
+        request.compression_levels = getattr(view_class, 'compression_levels', None)  # type: ignore[attr-defined]
+
+    def get_level(self, request: HttpRequest, encoding: str) -> int:
+        levels: dict[str, int] = getattr(request, 'compression_levels', None) or {}
+        if encoding not in levels:
+            levels = {**DEFAULT_LEVELS, **getattr(settings, 'COMPRESSION_LEVELS', {})}
+        return levels[encoding]
+
+    def process_response(self, request: HttpRequest, response: HttpResponseBase) -> HttpResponseBase:
+        if response.status_code == 304:
+            # It stands for a 200 that may have been compressed, with the same Vary.
+            patch_vary_headers(response, ('Accept-Encoding',))
+            return response
+        min_length = getattr(settings, 'COMPRESSION_MIN_LENGTH', DEFAULT_MIN_LENGTH)
+        if not response.streaming and len(response.content) < min_length:  # type: ignore[attr-defined]
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+        if response.get('Content-Type', '').startswith(SKIPPED_CONTENT_TYPES):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        compressor = Compressor(encoding, self.get_level(request, encoding))
+
+        if response.streaming:
+            if response.is_async:  # type: ignore[attr-defined]
+                response.streaming_content = acompress_sequence(  # type: ignore[attr-defined]
+                    compressor, response.streaming_content)  # type: ignore[attr-defined]
+            else:
+                response.streaming_content = compress_sequence(  # type: ignore[attr-defined]
+                    compressor, response.streaming_content)  # type: ignore[attr-defined]
+            del response.headers['Content-Length']
+        else:
+            content = compressor.compress(response.content) + compressor.finish()  # type: ignore[attr-defined]
+            if len(content) >= len(response.content):  # type: ignore[attr-defined]
+                return response
+            response.content = content  # type: ignore[attr-defined]
+            response.headers['Content-Length'] = str(len(content))
+
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,56 @@
+"""
+This module contains conditional GET support for read endpoints.
+
+Views compute an ETag from cheap inputs (a version counter or a couple of
+indexed columns) without serializing the payload, and requests carrying a
+matching If-None-Match header are answered with 304 Not Modified.
+"""
+
+import hashlib
+from typing import Any
+
+from django.http import HttpResponseBase
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from rest_framework.request import Request
+
+
+def make_etag(request: Request, *parts: Any) -> str:
+    """
+    Build a weak ETag from `parts` and the negotiated media type. It follows
+    version counters rather than the bytes, which the compression middleware
+    changes as well, so it only promises an equivalent body.
+    """
+    # DRF keeps the quality of a wildcard match, which does not change the content.
+    media_type = ';'.join(
+        param for param in getattr(request, 'accepted_media_type', '').split(';') if not param.strip().startswith('q='))
+    raw = ':'.join(str(part) for part in (*parts, media_type))
+    return 'W/' + quote_etag(hashlib.sha1(raw.encode('utf-8')).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    View mixin answering GET requests with 304 when the ETag matches.
+
+    Views implement `get_etag()` and return None when no ETag can be computed
+    (for instance for a missing object), in which case the request is
+    handled normally.
+    """
+
+    def get_etag(self, request: Request, *args: Any, **kwargs: Any) -> str | None:
+        raise NotImplementedError('`get_etag()` must be implemented.')
+
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        etag = self.get_etag(request, *args, **kwargs)
+        if etag is not None:
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                # A 304 carries the headers the 200 would have, ETag included.
+                not_modified['ETag'] = etag
+                patch_vary_headers(not_modified, ('Accept',))
+                return not_modified
+        response: HttpResponseBase = super().get(request, *args, **kwargs)  # type: ignore[misc]
+        if etag is not None and response.status_code == 200:
+            response['ETag'] = etag
+            patch_vary_headers(response, ('Accept',))
+        return response
@@ -0,0 +1,132 @@
+"""
+This module contains the background catalog export jobs.
+
+An ExportJob writes every product of its owner, with its category and the
+number of wishlists it belongs to, into a gzip compressed NDJSON or CSV file
+under `settings.EXPORT_ROOT`. Rows are read through `QuerySet.iterator()`
+(a server-side cursor on PostgreSQL) and written one by one, so memory stays
+flat regardless of the catalog size. Jobs run on a small thread pool and
+record their progress on the ExportJob row.
+
+The pool lives in the web process, so a restart loses the jobs it queued or
+ran. A job left pending or running without progress for
+`settings.EXPORT_STALE_AFTER` seconds is marked failed when it is polled.
+"""
+
+import csv
+import gzip
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Iterator
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ExportJob, Product, WishListItem
+
+EXPORT_FIELDS = (
+    'id', 'name', 'price', 'currency', 'rank', 'created_time', 'updated_time',
+    'product_category_id', 'product_category__name', 'wishlist_count',
+)
+CHUNK_SIZE = 2000
+PROGRESS_INTERVAL = 1.0
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'EXPORT_WORKERS', 2), thread_name_prefix='catalog-export')
+
+
+def get_stale_after() -> float:
+    return getattr(settings, 'EXPORT_STALE_AFTER', 3600)
+
+
+def export_path(job: ExportJob) -> Path:
+    return Path(settings.EXPORT_ROOT) / f'{job.pk}.{job.format}.gz'
+
+
+def export_rows(owner_id: Any) -> Iterator[dict[str, Any]]:
+    wishlist_count = (
+        WishListItem.objects.filter(product_id=OuterRef('pk'))
+        .values('product_id').annotate(count=Count('*')).values('count')
+    )
+    queryset = (
+        Product.objects.filter(owner_id=owner_id).order_by('pk')
+        .annotate(wishlist_count=Coalesce(Subquery(wishlist_count, output_field=IntegerField()), 0))
+        .values(*EXPORT_FIELDS)
+    )
+    rows: Iterator[dict[str, Any]] = queryset.iterator(chunk_size=CHUNK_SIZE)
+    return rows
+
+
+def run_export(job_id: Any) -> None:
+    """Run the export job `job_id` in the calling thread."""
+    job = ExportJob.objects.get(pk=job_id)
+    path = export_path(job)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    ExportJob.objects.filter(pk=job.pk).update(status='running', file=path.name, updated_time=timezone.now())
+
+    started = last_report = time.monotonic()
+    rows = 0
+    try:
+        with gzip.open(path, 'wt', encoding='utf-8', newline='') as output:
+            if job.format == 'csv':
+                writer = csv.writer(output)
+                writer.writerow(EXPORT_FIELDS)
+            for row in export_rows(job.owner_id):
+                if job.format == 'csv':
+                    writer.writerow([row[field] for field in EXPORT_FIELDS])
+                else:
+                    output.write(json.dumps(row, cls=DjangoJSONEncoder))
+                    output.write('\n')
+                rows += 1
+                now = time.monotonic()
+                if now - last_report >= PROGRESS_INTERVAL:
+                    last_report = now
+                    ExportJob.objects.filter(pk=job.pk).update(
+                        rows=rows, rows_per_second=rows / (now - started), updated_time=timezone.now())
+    except Exception as e:
+        path.unlink(missing_ok=True)
+        finished = timezone.now()
+        ExportJob.objects.filter(pk=job.pk).update(
+            status='failed', error=str(e), rows=rows, finished_time=finished, updated_time=finished)
+        raise
+    elapsed = max(time.monotonic() - started, 1e-6)
+    finished = timezone.now()
+    ExportJob.objects.filter(pk=job.pk).update(
+        status='done', rows=rows, rows_per_second=rows / elapsed, finished_time=finished, updated_time=finished)
+
+
+def fail_if_stale(job: ExportJob) -> None:
+    """
+    Mark `job` failed when it has been pending or running without progress
+    for longer than `settings.EXPORT_STALE_AFTER` seconds, its process having
+    gone away with it, so that clients stop polling.
+    """
+    if job.status not in ('pending', 'running'):
+        return
+    now = timezone.now()
+    if now - job.updated_time < timedelta(seconds=get_stale_after()):
+        return
+    # A job that made progress meanwhile is left alone.
+    stale = ExportJob.objects.filter(pk=job.pk, status=job.status, updated_time=job.updated_time)
+    if stale.update(status='failed', error='The export was interrupted.', finished_time=now, updated_time=now):
+        export_path(job).unlink(missing_ok=True)
+    job.refresh_from_db()
+
+
+def _run_in_thread(job_id: Any) -> None:
+    try:
+        run_export(job_id)
+    finally:
+        connection.close()
+
+
+def start_export(job_id: Any) -> None:
+    """Queue the export job `job_id` on the export thread pool."""
+    _executor.submit(_run_in_thread, job_id)
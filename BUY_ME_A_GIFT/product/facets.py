@@ -0,0 +1,52 @@
+"""
+This module contains the facet counts of the product list.
+
+Category counts, currency counts and a fixed-width price histogram are all
+computed from a single GROUP BY over (category, currency, price bucket).
+The query returns one row per combination, and those rows are folded into
+the three facets in Python.
+"""
+
+from collections import defaultdict
+from typing import Any
+
+from django.db.models import Count, F
+from django.db.models.functions import Floor
+from django.db.models.query import QuerySet
+
+DEFAULT_BUCKET_SIZE = 100.0
+MIN_BUCKET_SIZE = 1.0
+
+
+def compute_facets(queryset: QuerySet, bucket_size: float = DEFAULT_BUCKET_SIZE) -> dict[str, list[dict[str, Any]]]:
+    """Return the category, currency and price facets of `queryset`."""
+    rows = (
+        queryset.order_by()
+        .annotate(price_bucket=Floor(F('price') / bucket_size))
+        .values('product_category_id', 'product_category__name', 'currency', 'price_bucket')
+        .annotate(count=Count('id'))
+    )
+
+    categories: dict[Any, dict[str, Any]] = {}
+    currencies: dict[Any, int] = defaultdict(int)
+    buckets: dict[int, int] = defaultdict(int)
+    for row in rows:
+        category = categories.setdefault(
+            row['product_category_id'],
+            {'id': row['product_category_id'], 'name': row['product_category__name'], 'count': 0},
+        )
+        category['count'] += row['count']
+        currencies[row['currency']] += row['count']
+        buckets[int(row['price_bucket'])] += row['count']
+
+    return {
+        'product_category': sorted(categories.values(), key=lambda item: (-item['count'], item['id'])),
+        'currency': [
+            {'value': value, 'count': count}
+            for value, count in sorted(currencies.items(), key=lambda item: (-item[1], item[0] or ''))
+        ],
+        'price': [
+            {'min': bucket * bucket_size, 'max': (bucket + 1) * bucket_size, 'count': count}
+            for bucket, count in sorted(buckets.items())
+        ],
+    }
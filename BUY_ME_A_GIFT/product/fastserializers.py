@@ -0,0 +1,223 @@
+"""
+This module contains the fast representation path of the hot read endpoints.
+
+A DRF serializer is compiled into a plan: the `values()` lookup of every
+rendered field and a plain function converting its value. Rows fetched with
+`QuerySet.values()` are then turned into dicts by the plan, without creating
+model instances or running the DRF field machinery. The output is the same
+as the serializer's. Serializers with a field the plan can not reproduce
+(a method field, a many relation, a custom field...) are left to DRF.
+"""
+
+from typing import Any, Callable, Iterable, NamedTuple, cast
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Model
+from django.db.models.query import QuerySet
+from django.http import Http404
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# Fields whose representation only depends on the column value.
+SCALAR_FIELDS = (
+    serializers.BooleanField, serializers.CharField, serializers.ChoiceField, serializers.DateField,
+    serializers.DateTimeField, serializers.DecimalField, serializers.FloatField, serializers.IntegerField,
+    serializers.ReadOnlyField, serializers.TimeField, serializers.UUIDField,
+)
+
+
+class Unsupported(Exception):
+    pass
+
+
+class PlanField(NamedTuple):
+    name: str
+    # The values() lookup, or for a nested object the lookup of its primary key.
+    path: str
+    convert: Callable[[Any], Any] | None
+    nested: list['PlanField'] | None
+
+
+class Plan(NamedTuple):
+    fields: list[PlanField]
+    paths: list[str]
+
+
+def _datetime_converter(field: serializers.DateTimeField) -> Callable[[Any], Any]:
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    tz = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != 'iso-8601' or tz is None:
+        return field.to_representation
+
+    def convert(value: Any) -> Any:
+        if isinstance(value, str) or value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(tz).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return convert
+
+
+def _converter(field: serializers.Field) -> Callable[[Any], Any] | None:
+    # Exact types only: subclasses may override to_representation().
+    if type(field) is serializers.IntegerField:
+        return int
+    if type(field) is serializers.FloatField:
+        return float
+    if type(field) is serializers.CharField:
+        return str
+    if type(field) is serializers.DateTimeField:
+        return _datetime_converter(field)
+    if type(field) is serializers.ReadOnlyField:
+        return None
+    return field.to_representation
+
+
+def _resolve(model: type[Model], source_attrs: list[str]) -> tuple[str, Any]:
+    """Return the values() lookup of `source_attrs` and its model field."""
+    model_field = None
+    for attr in source_attrs:
+        if model_field is not None:
+            if not model_field.is_relation or model_field.many_to_many or model_field.one_to_many:
+                raise Unsupported(attr)
+            model = cast(type[Model], model_field.related_model)
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            raise Unsupported(attr)
+        if not model_field.concrete and not model_field.is_relation:
+            raise Unsupported(attr)
+    return '__'.join(source_attrs), model_field
+
+
+def _compile(serializer: Any, model: type[Model], prefix: str, paths: list[str]) -> list[PlanField]:
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    if not isinstance(serializer, serializers.ModelSerializer):
+        raise Unsupported(type(serializer).__name__)
+    paths.append(prefix + model._meta.pk.attname)
+
+    plan = []
+    for field in serializer._readable_fields:
+        # Bound fields are always named.
+        name = cast(str, field.field_name)
+        if field.source == '*':
+            raise Unsupported(name)
+        path, model_field = _resolve(model, field.source_attrs)
+        if model_field.many_to_many or model_field.one_to_many:
+            raise Unsupported(name)
+        if isinstance(field, serializers.BaseSerializer):
+            if not model_field.is_relation:
+                raise Unsupported(name)
+            related = model_field.related_model
+            nested = _compile(field, related, prefix + path + '__', paths)
+            plan.append(PlanField(name, prefix + path + '__' + related._meta.pk.attname, None, nested))
+        elif type(field) is serializers.PrimaryKeyRelatedField and field.pk_field is None:
+            # values() returns the foreign key column for a relation.
+            paths.append(prefix + path)
+            plan.append(PlanField(name, prefix + path, None, None))
+        elif isinstance(field, SCALAR_FIELDS) and not model_field.is_relation:
+            paths.append(prefix + path)
+            plan.append(PlanField(name, prefix + path, _converter(field), None))
+        else:
+            raise Unsupported(name)
+    return plan
+
+
+def compile_plan(serializer: Any) -> Plan | None:
+    """
+    Compile the model serializer `serializer` (an instance, so that fields it
+    prunes per request are left out) into a plan, or return None when it has
+    a field the plan can not reproduce.
+    """
+    paths: list[str] = []
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    if not isinstance(serializer, serializers.ModelSerializer):
+        return None
+    try:
+        fields = _compile(serializer, serializer.Meta.model, '', paths)
+    except Unsupported:
+        return None
+    return Plan(fields, list(dict.fromkeys(paths)))
+
+
+def _render(fields: list[PlanField], row: dict) -> dict:
+    data: dict[str, Any] = {}
+    for name, path, convert, nested in fields:
+        value = row[path]
+        if value is None:
+            data[name] = None
+        elif nested is not None:
+            data[name] = _render(nested, row)
+        else:
+            data[name] = convert(value) if convert is not None else value
+    return data
+
+
+def render_row(plan: Plan, row: dict) -> dict:
+    return _render(plan.fields, row)
+
+
+def render_rows(plan: Plan, rows: Iterable[dict]) -> list[dict]:
+    fields = plan.fields
+    return [_render(fields, row) for row in rows]
+
+
+class FastSerializerMixin:
+    """
+    View mixin rendering `list()` and `retrieve()` from `values()` rows with
+    a plan compiled from the view serializer, falling back to DRF when the
+    serializer can not be compiled or `settings.PRODUCT_FAST_SERIALIZER` is
+    off. Object level permissions are not checked by the fast `retrieve()`,
+    so only views without them should use it.
+    """
+
+    def get_fast_plan(self) -> Plan | None:
+        if not getattr(settings, 'PRODUCT_FAST_SERIALIZER', False):
+            return None
+        return compile_plan(self.get_serializer())  # type: ignore[attr-defined]
+
+    def get_values_queryset(self, plan: Plan) -> QuerySet:
+        queryset: QuerySet = self.filter_queryset(self.get_queryset())  # type: ignore[attr-defined]
+        return queryset.prefetch_related(None).values(*plan.paths)
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        plan = self.get_fast_plan()
+        response: Response
+        if plan is None:
+            response = super().list(request, *args, **kwargs)  # type: ignore[misc]
+            return response
+        queryset = self.get_values_queryset(plan)
+        page = self.paginate_queryset(queryset)  # type: ignore[attr-defined]
+        if page is not None:
+            response = self.get_paginated_response(render_rows(plan, page))  # type: ignore[attr-defined]
+            return response
+        return Response(render_rows(plan, queryset))
+
+    def retrieve(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        plan = self.get_fast_plan()
+        if plan is None:
+            response: Response = super().retrieve(request, *args, **kwargs)  # type: ignore[misc]
+            return response
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field  # type: ignore[attr-defined]
+        queryset = self.get_values_queryset(plan).filter(
+            **{self.lookup_field: kwargs[lookup_url_kwarg]})  # type: ignore[attr-defined]
+        rows = list(queryset[:1])
+        if not rows:
+            raise Http404
+        return Response(render_row(plan, rows[0]))
+
+    def get_stream_items(self, queryset: QuerySet) -> tuple[Callable[[Any], Any], Iterable[Any]]:
+        plan = self.get_fast_plan()
+        if plan is None:
+            items: tuple[Callable[[Any], Any], Iterable[Any]] = super().get_stream_items(queryset)  # type: ignore[misc]
+            return items
+        rows = queryset.prefetch_related(None).values(*plan.paths).iterator(
+            chunk_size=self.stream_chunk_size)  # type: ignore[attr-defined]
+        return lambda row: render_row(plan, row), rows
@@ -0,0 +1,169 @@
+"""
+This module contains the foreign exchange rates used to compare prices
+across currencies.
+
+Every product stores its price converted to `settings.FX_BASE_CURRENCY` in
+the indexed `price_base` column, so currency-aware range filters, sorting
+and totals run in SQL. A product without a currency is priced in the base
+currency; one whose currency has no rate yet has a NULL `price_base`.
+
+The rates live in the ExchangeRate table, each one being the value of one
+unit of a currency in the base currency, and are cached as a whole for
+`settings.FX_RATES_CACHE_TIMEOUT` seconds. An update deletes the cached
+rates, which is enough with a shared cache; with a per-process one the
+other processes pick the new rates up when their copy expires.
+`price_base` is set on save by a `pre_save` receiver in `product.signals`,
+by the bulk writes themselves, and recomputed with batched UPDATEs by
+`set_rates()` when a rate changes.
+"""
+
+from typing import Any, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.utils import timezone
+
+from . import cache as product_cache
+from .models import ExchangeRate, Product
+
+RATES_KEY = 'fx:rates'
+BATCH_SIZE = 5000
+
+
+class RateError(ValueError):
+    pass
+
+
+def get_base_currency() -> str:
+    return getattr(settings, 'FX_BASE_CURRENCY', 'USD')
+
+
+def get_rates() -> dict[str, float]:
+    """Return the rate of every currency, the base currency included."""
+    rates: dict[str, float] | None = cache.get(RATES_KEY)
+    if rates is None:
+        rates = dict(ExchangeRate.objects.values_list('currency', 'rate'))
+        rates[get_base_currency()] = 1.0
+        cache.set(RATES_KEY, rates, getattr(settings, 'FX_RATES_CACHE_TIMEOUT', 60))
+    return rates
+
+
+def to_base(price: float | None, currency: str | None, rates: dict[str, float] | None = None) -> float | None:
+    """Convert `price` to the base currency, None when the rate is unknown."""
+    if price is None:
+        return None
+    if currency is None:
+        return price
+    rate = (rates if rates is not None else get_rates()).get(currency)
+    return None if rate is None else price * rate
+
+
+def from_base(amount: float, currency: str, rates: dict[str, float] | None = None) -> float:
+    """Convert `amount` from the base currency, raising RateError when the rate is unknown."""
+    rate = (rates if rates is not None else get_rates()).get(currency)
+    if not rate:
+        raise RateError(f'No exchange rate for {currency}')
+    return amount / rate
+
+
+def base_price(price: Any = F('price'), rates: dict[str, float] | None = None) -> Case:
+    """
+    Return an SQL expression converting `price` (an expression on the
+    product price, the column itself by default) to the base currency.
+    """
+    rates = rates if rates is not None else get_rates()
+    whens = [When(currency__isnull=True, then=price)]
+    whens += [
+        When(currency=currency, then=price if rate == 1 else price * Value(rate))
+        for currency, rate in sorted(rates.items())
+    ]
+    return Case(*whens, default=Value(None), output_field=FloatField())
+
+
+def set_base_prices(products: Iterable[Product]) -> None:
+    """Set the `price_base` of unsaved products, for bulk writes."""
+    rates = get_rates()
+    for product in products:
+        product.price_base = to_base(product.price, product.currency, rates)
+
+
+def clean_rates(rates: Any) -> dict[str, float]:
+    currencies = {code for code, _ in Product.currency_choice}
+    if not isinstance(rates, dict):
+        raise RateError('Rates must be an object mapping currencies to rates')
+    cleaned = {}
+    for currency, rate in rates.items():
+        if currency not in currencies:
+            raise RateError(f'Unknown currency {currency}')
+        try:
+            rate = float(rate)
+        except (TypeError, ValueError):
+            raise RateError(f'The rate of {currency} must be a number')
+        if not rate > 0 or rate == float('inf'):
+            raise RateError(f'The rate of {currency} must be a positive number')
+        if currency == get_base_currency() and rate != 1:
+            raise RateError(f'The rate of the base currency {currency} is 1')
+        cleaned[currency] = rate
+    return cleaned
+
+
+def set_rates(rates: dict[str, Any]) -> int:
+    """
+    Store `rates` and recompute the `price_base` of the products priced in
+    the currencies whose rate changed. Returns the number of updated products.
+    """
+    rates = clean_rates(rates)
+    base = get_base_currency()
+    now = timezone.now()
+    with transaction.atomic():
+        current = dict(ExchangeRate.objects.select_for_update().values_list('currency', 'rate'))
+        changed = {
+            currency: rate for currency, rate in rates.items() if currency != base and current.get(currency) != rate
+        }
+        ExchangeRate.objects.bulk_create(
+            [ExchangeRate(currency=currency, rate=rate, updated_time=now) for currency, rate in changed.items()],
+            update_conflicts=True, unique_fields=['currency'], update_fields=['rate', 'updated_time'],
+        )
+        transaction.on_commit(lambda: cache.delete(RATES_KEY))
+    cache.delete(RATES_KEY)
+    updated = recompute(changed)
+    if changed and not updated:
+        # Cached lists filtered in another currency are stale all the same.
+        product_cache.invalidate_all_products()
+    return updated
+
+
+def recompute(currencies: Iterable[str] | None = None) -> int:
+    """
+    Recompute the `price_base` of the products priced in `currencies` (every
+    product by default), one short transaction per batch of ids so that
+    concurrent writes are never blocked for long. Returns the number of
+    updated products.
+    """
+    rates = get_rates()
+    queryset = Product.objects.all()
+    if currencies is not None:
+        currencies = list(currencies)
+        if not currencies:
+            return 0
+        queryset = queryset.filter(currency__in=currencies)
+    expression = base_price(rates=rates)
+    updated = 0
+    last_id = 0
+    while True:
+        # The last id of the next batch bounds an index range scan.
+        bounds = list(
+            queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[BATCH_SIZE - 1:BATCH_SIZE])
+        batch = queryset.filter(id__gt=last_id)
+        if bounds:
+            batch = batch.filter(id__lte=bounds[0])
+        with transaction.atomic():
+            updated += batch.update(price_base=expression)
+        if not bounds:
+            break
+        last_id = bounds[0]
+    if updated:
+        product_cache.invalidate_all_products()
+    return updated
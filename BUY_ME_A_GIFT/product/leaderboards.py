@@ -0,0 +1,138 @@
+"""
+This module maintains the per-category leaderboards of top ranked products.
+
+The `settings.LEADERBOARD_SIZE` best products of each category (highest rank
+first, then lowest id) are stored as CategoryLeaderboardEntry rows numbered
+by position, so reading a leaderboard is an index range scan with no sort.
+
+A leaderboard is refreshed from the `(product_category, -rank, id)` index
+whenever a write may change it: `product_saved()` and `product_deleted()`
+are called from the model signals and skip the refresh when the product
+neither is nor enters the leaderboard, and bulk writes, which send no
+signals, call `refresh()` with the categories they touched. The products
+deleted in a cascade, such as those of a deleted category or owner, have
+their categories refreshed once when the cascade commits rather than once
+per product. `rebuild()` recomputes every leaderboard with one window query.
+"""
+
+import threading
+from typing import Any, Iterable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .models import CategoryLeaderboardEntry, Product, ProductCategory
+
+BATCH_SIZE = 5000
+
+# The categories of the products deleted in cascades of this thread, refreshed on commit.
+_cascaded = threading.local()
+
+
+def get_size() -> int:
+    return getattr(settings, 'LEADERBOARD_SIZE', 20)
+
+
+def refresh(category_ids: Iterable[Any]) -> None:
+    """Recompute the leaderboards of `category_ids`."""
+    category_ids = sorted(set(category_ids))
+    if not category_ids:
+        return
+    size = get_size()
+    with transaction.atomic():
+        # Serializes concurrent refreshes of the same leaderboards.
+        category_ids = list(
+            ProductCategory.objects.select_for_update().filter(pk__in=category_ids)
+            .order_by('pk').values_list('pk', flat=True))
+        # All the old entries go first, as a product moving between two of
+        # these categories may still hold an entry in the other one.
+        CategoryLeaderboardEntry.objects.filter(category_id__in=category_ids).delete()
+        entries = []
+        for category_id in category_ids:
+            top = (
+                Product.objects.filter(product_category_id=category_id)
+                .order_by('-rank', 'id').values_list('id', 'rank')[:size]
+            )
+            entries += [
+                CategoryLeaderboardEntry(category_id=category_id, position=position, product_id=product_id, rank=rank)
+                for position, (product_id, rank) in enumerate(top, start=1)
+            ]
+        CategoryLeaderboardEntry.objects.bulk_create(entries)
+
+
+def categories_of(product_ids: Any) -> set[Any]:
+    """Return the categories whose leaderboard holds one of `product_ids` (ids or a subquery)."""
+    return set(
+        CategoryLeaderboardEntry.objects.filter(product_id__in=product_ids).values_list('category_id', flat=True))
+
+
+def product_saved(product: Product) -> None:
+    category_id = product.product_category_id
+    entries = CategoryLeaderboardEntry.objects.filter(Q(product_id=product.pk) | Q(category_id=category_id))
+    board = []
+    stale = set()
+    for entry_category_id, product_id, rank in entries.values_list('category_id', 'product_id', 'rank'):
+        if product_id == product.pk:
+            if entry_category_id == category_id and rank == product.rank:
+                # Still in place, only other fields changed.
+                return
+            stale.add(entry_category_id)
+        elif entry_category_id == category_id:
+            board.append((rank, -product_id))
+    if len(board) < get_size() or (product.rank, -product.pk) > min(board):
+        stale.add(category_id)
+    refresh(stale)
+
+
+def product_deleted(product: Product, origin: Any = None) -> None:
+    """
+    Refresh the leaderboard of a deleted product. `origin` is what delete()
+    was called on, a product deleted through anything else is part of a
+    cascade and its category is refreshed when the cascade commits.
+    """
+    category_id = product.product_category_id
+    if origin is not None and origin is not product:
+        categories = getattr(_cascaded, 'categories', None)
+        if categories is None:
+            categories = _cascaded.categories = set()
+        categories.add(category_id)
+        # Only the first callback to run has categories left to refresh.
+        transaction.on_commit(refresh_cascaded)
+        return
+    # The entry of the product went with it, which leaves a leaderboard
+    # that is not full: either a hole to fill or a category too small to
+    # fill it anyway.
+    if CategoryLeaderboardEntry.objects.filter(category_id=category_id).count() < get_size():
+        refresh([category_id])
+
+
+def refresh_cascaded() -> None:
+    # The categories deleted with the cascade are skipped by refresh().
+    categories = getattr(_cascaded, 'categories', None)
+    if categories:
+        _cascaded.categories = set()
+        refresh(categories)
+
+
+def rebuild() -> int:
+    """Recompute every leaderboard and return the number of entries."""
+    ranked = (
+        Product.objects.annotate(position=Window(
+            RowNumber(), partition_by=[F('product_category_id')], order_by=[F('rank').desc(), F('id').asc()]))
+        .filter(position__lte=get_size())
+        .values_list('product_category_id', 'position', 'id', 'rank')
+    )
+    count = 0
+    with transaction.atomic():
+        CategoryLeaderboardEntry.objects.all().delete()
+        batch = []
+        for category_id, position, product_id, rank in ranked.iterator(chunk_size=BATCH_SIZE):
+            batch.append(CategoryLeaderboardEntry(
+                category_id=category_id, position=position, product_id=product_id, rank=rank))
+            if len(batch) >= BATCH_SIZE:
+                count += len(CategoryLeaderboardEntry.objects.bulk_create(batch))
+                batch = []
+        count += len(CategoryLeaderboardEntry.objects.bulk_create(batch))
+    return count
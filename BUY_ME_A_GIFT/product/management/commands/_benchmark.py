@@ -0,0 +1,76 @@
+"""
+Helpers shared by the benchmark management commands.
+
+Modules starting with an underscore are not picked up as commands.
+"""
+
+import random
+import statistics
+from time import perf_counter
+from typing import Callable
+
+from django.db import connection
+
+from product import cache as product_cache
+from product import fx
+from product import leaderboards
+from product.models import Product, ProductCategory
+from user.models import User
+
+WORDS = (
+    'red', 'blue', 'green', 'black', 'white', 'silver', 'golden', 'wooden', 'leather', 'ceramic',
+    'wine', 'glass', 'teapot', 'mug', 'watch', 'wallet', 'scarf', 'candle', 'lamp', 'book',
+    'headphones', 'camera', 'backpack', 'necklace', 'bracelet', 'perfume', 'blanket', 'chess', 'puzzle', 'plant',
+)
+
+
+def seed_products(count: int, batch_size: int = 10000, categories: int = 50) -> None:
+    """Create `count` synthetic products owned by a dedicated benchmark user."""
+    rng = random.Random(count)
+    user, _ = User.objects.get_or_create(email='benchmark@example.com')
+    category_ids = list(ProductCategory.objects.filter(owner=user).values_list('id', flat=True))
+    if not category_ids:
+        ProductCategory.objects.bulk_create(
+            ProductCategory(name=f'{rng.choice(WORDS)} {i}', owner=user) for i in range(categories))
+        category_ids = list(ProductCategory.objects.filter(owner=user).values_list('id', flat=True))
+
+    for start in range(0, count, batch_size):
+        products = [
+            Product(
+                name=' '.join(rng.sample(WORDS, rng.randint(2, 4))),
+                price=round(rng.uniform(1, 1000), 2),
+                currency=rng.choice(('USD', 'EUR')),
+                rank=rng.randint(0, 1000),
+                product_category_id=rng.choice(category_ids),
+                owner=user,
+            )
+            for _ in range(min(batch_size, count - start))
+        ]
+        fx.set_base_prices(products)
+        Product.objects.bulk_create(products)
+    # bulk_create does not send post_save, drop the cached lists explicitly.
+    product_cache.invalidate_products([])
+    leaderboards.refresh(category_ids)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE product_product')
+
+
+def time_calls(func: Callable[[], object], repeat: int) -> list[float]:
+    """Return the duration of `repeat` calls to `func`, in milliseconds."""
+    durations = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        durations.append((perf_counter() - start) * 1000)
+    return durations
+
+
+def summarize(durations: list[float]) -> str:
+    ordered = sorted(durations)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    return (f'mean {statistics.fmean(ordered):.2f}ms, p50 {percentile(0.5):.2f}ms, '
+            f'p95 {percentile(0.95):.2f}ms, p99 {percentile(0.99):.2f}ms, max {ordered[-1]:.2f}ms')
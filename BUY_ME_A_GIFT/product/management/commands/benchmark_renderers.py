@@ -0,0 +1,51 @@
+"""
+Benchmark the response renderers on a product list payload.
+
+Usage:
+    python manage.py benchmark_renderers [--seed 10000] [--rows 10000] [--repeat 20]
+
+The payload is the product list representation of `--rows` products, as
+built by the product list endpoint; only its rendering to bytes is timed.
+"""
+
+import statistics
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from rest_framework.renderers import JSONRenderer
+
+from product.fastserializers import compile_plan, render_rows
+from product.models import Product
+from product.renderers import MessagePackRenderer, ORJSONRenderer
+from product.serializers import ProductListSerializer
+from ._benchmark import seed_products, summarize, time_calls
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the response renderers on a product list payload.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--seed', type=int, default=0, help='Create this many synthetic products first.')
+        parser.add_argument('--rows', type=int, default=10000, help='Number of products in the payload.')
+        parser.add_argument('--repeat', type=int, default=20, help='Number of timed renderings per renderer.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options['seed']:
+            self.stdout.write(f"Seeding {options['seed']} products...")
+            seed_products(options['seed'])
+
+        plan = compile_plan(ProductListSerializer())
+        assert plan is not None, 'ProductListSerializer has a field the fast plan can not reproduce.'
+        data = render_rows(plan, Product.objects.order_by('-created_time', '-id').values(*plan.paths)[:options['rows']])
+        self.stdout.write(f'Products in payload: {len(data)}')
+
+        baseline = JSONRenderer().render(data)
+        means = {}
+        for label, renderer in (('json', JSONRenderer()), ('orjson', ORJSONRenderer()), ('msgpack', MessagePackRenderer())):
+            content = renderer.render(data)
+            durations = time_calls(lambda: renderer.render(data), options['repeat'])
+            means[label] = statistics.fmean(durations)
+            self.stdout.write(f'{label}: {summarize(durations)}, {len(content)} bytes')
+        self.stdout.write(f"orjson output identical to json: {ORJSONRenderer().render(data) == baseline}")
+        for label in ('orjson', 'msgpack'):
+            self.stdout.write(f"{label} speedup: {means['json'] / max(means[label], 1e-9):.1f}x")
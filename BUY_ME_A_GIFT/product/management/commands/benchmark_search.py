@@ -0,0 +1,53 @@
+"""
+Benchmark the product search against the configured database.
+
+Usage:
+    python manage.py benchmark_search [--seed 1000000] [--queries 200] [--terms wine,teapot]
+
+Run it against a local PostgreSQL to exercise the GIN indexes, other
+backends only exercise the substring fallback.
+"""
+
+import random
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connection
+
+from product.models import Product
+from product.search import search_products
+from product.serializers import ProductListSerializer
+from product.optimizers import optimize_queryset
+from ._benchmark import WORDS, seed_products, summarize, time_calls
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the product search against the configured database.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--seed', type=int, default=0, help='Create this many synthetic products first.')
+        parser.add_argument('--queries', type=int, default=200, help='Number of timed queries per term kind.')
+        parser.add_argument('--limit', type=int, default=20, help='Page size of each query.')
+        parser.add_argument('--terms', default='', help='Comma separated search terms, defaults to a built-in vocabulary.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options['seed']:
+            self.stdout.write(f"Seeding {options['seed']} products...")
+            seed_products(options['seed'])
+
+        terms = [term for term in options['terms'].split(',') if term] or list(WORDS)
+        # Typos drop a character, which exercises the trigram fallback.
+        typos = [term[:1] + term[2:] for term in terms if len(term) > 4]
+        rng = random.Random(0)
+        queryset = optimize_queryset(Product.objects.all(), ProductListSerializer)
+
+        self.stdout.write(f'Backend: {connection.vendor}, products: {Product.objects.count()}')
+        for label, candidates in (('full-text', terms), ('typo', typos)):
+            if not candidates:
+                continue
+
+            def run() -> None:
+                list(search_products(queryset, rng.choice(candidates))[:options['limit']])
+
+            run()
+            self.stdout.write(f"{label}: {summarize(time_calls(run, options['queries']))}")
@@ -0,0 +1,45 @@
+"""
+Benchmark the name suggestions against the configured database.
+
+Usage:
+    python manage.py benchmark_suggest [--seed 1000000] [--queries 200] [--limit 10]
+
+Every prefix length from `settings.SUGGEST_MIN_LENGTH` to 6 characters is
+timed separately, uncached, the shortest ones matching the most products.
+Run it against a local PostgreSQL to exercise the prefix indexes.
+"""
+
+import random
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connection
+
+from product.models import Product
+from product.search import get_suggest_min_length, suggest_names
+from ._benchmark import WORDS, seed_products, summarize, time_calls
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the name suggestions against the configured database.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--seed', type=int, default=0, help='Create this many synthetic products first.')
+        parser.add_argument('--queries', type=int, default=200, help='Number of timed queries per prefix length.')
+        parser.add_argument('--limit', type=int, default=10, help='Completions of each kind per query.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options['seed']:
+            self.stdout.write(f"Seeding {options['seed']} products...")
+            seed_products(options['seed'])
+
+        rng = random.Random(0)
+        self.stdout.write(f'Backend: {connection.vendor}, products: {Product.objects.count()}')
+        for length in range(get_suggest_min_length(), 7):
+            prefixes = sorted({word[:length] for word in WORDS if len(word) >= length})
+
+            def run() -> None:
+                suggest_names(rng.choice(prefixes), options['limit'])
+
+            run()
+            self.stdout.write(f"{length} characters: {summarize(time_calls(run, options['queries']))}")
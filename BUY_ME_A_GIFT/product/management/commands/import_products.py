@@ -0,0 +1,202 @@
+"""
+Bulk import products from CSV or NDJSON files.
+
+Usage:
+    python manage.py import_products --owner owner@example.com products.csv [more.ndjson.gz ...]
+
+Every row needs `name`, `price`, `rank` and a category name in `category`
+(or `product_category__name`, as written by the catalog export); `currency`
+is optional. Files ending in `.gz` are decompressed on the fly.
+
+Rows are processed in chunks, each in its own transaction: the categories
+of the chunk are resolved with one query and the missing ones created with
+one bulk insert, then the products are loaded with COPY on PostgreSQL or
+with bulk_create on other backends. Invalid rows are skipped and reported.
+"""
+
+import csv
+import gzip
+import io
+import json
+import math
+import time
+from pathlib import Path
+from typing import IO, Any, Iterator
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection, transaction
+from django.utils import timezone
+
+from product import cache as product_cache
+from product import fx
+from product import leaderboards
+from product.models import Product, ProductCategory
+from user.models import User
+
+COPY_COLUMNS = ('name', 'price', 'price_base', 'currency', 'rank', 'created_time', 'updated_time', 'product_category_id', 'owner_id')
+CURRENCIES = {code for code, _ in Product.currency_choice}
+
+
+class RowError(ValueError):
+    pass
+
+
+def open_input(path: Path) -> IO[str]:
+    if path.suffix == '.gz':
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def read_rows(path: Path) -> Iterator[tuple[int, Any]]:
+    """Yield `(line number, raw row)` pairs from a CSV or NDJSON file."""
+    ndjson = '.ndjson' in path.suffixes or '.jsonl' in path.suffixes
+    with open_input(path) as source:
+        if not ndjson:
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for line_num, line in enumerate(source, start=1):
+            if line.strip():
+                try:
+                    yield line_num, json.loads(line)
+                except ValueError:
+                    yield line_num, line.strip()
+
+
+def clean_row(row: Any) -> dict[str, Any]:
+    if not isinstance(row, dict):
+        raise RowError('Row is not an object')
+    name = str(row.get('name') or '').strip()
+    if not name or len(name) > 128:
+        raise RowError('name must have between 1 and 128 characters')
+    category = str(row.get('category') or row.get('product_category__name') or '').strip()
+    if not category or len(category) > 128:
+        raise RowError('category must have between 1 and 128 characters')
+    try:
+        price = float(row['price'])
+        rank = int(row['rank'])
+    except (KeyError, TypeError, ValueError):
+        raise RowError('price must be a number and rank an integer')
+    if not math.isfinite(price):
+        raise RowError('price must be a finite number')
+    currency = row.get('currency') or None
+    if currency is not None and currency not in CURRENCIES:
+        raise RowError(f'currency must be one of {", ".join(sorted(CURRENCIES))}')
+    return {'name': name, 'price': price, 'currency': currency, 'rank': rank, 'category': category}
+
+
+class Command(BaseCommand):
+    help = 'Bulk import products from CSV or NDJSON files.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('files', nargs='+', type=Path)
+        parser.add_argument('--owner', required=True, help='Email of the user owning the imported products.')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows per chunk and transaction.')
+        parser.add_argument('--errors', type=Path, help='Write the rejected rows to this CSV file.')
+        parser.add_argument('--no-copy', action='store_true', help='Use bulk_create even on PostgreSQL.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        try:
+            self.owner = User.objects.get(email=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['owner']} does not exist")
+        self.use_copy = self.copy_supported() and not options['no_copy']
+        self.categories: dict[str, int] = {}
+        self.touched: set[int] = set()
+        batch_size = max(1, options['batch_size'])
+
+        error_file = open(options['errors'], 'w', newline='') if options['errors'] else None
+        errors = csv.writer(error_file) if error_file else None
+        if errors:
+            errors.writerow(['file', 'line', 'error', 'row'])
+
+        imported = rejected = 0
+        started = time.monotonic()
+        try:
+            for path in options['files']:
+                chunk: list[dict[str, Any]] = []
+                for line_num, raw in read_rows(path):
+                    try:
+                        chunk.append(clean_row(raw))
+                    except RowError as e:
+                        rejected += 1
+                        if errors:
+                            errors.writerow([path, line_num, str(e), json.dumps(raw, default=str)])
+                        elif rejected <= 20:
+                            self.stderr.write(f'{path}:{line_num}: {e}')
+                        continue
+                    if len(chunk) >= batch_size:
+                        imported += self.load_chunk(chunk)
+                        chunk = []
+                if chunk:
+                    imported += self.load_chunk(chunk)
+        finally:
+            if error_file:
+                error_file.close()
+            # COPY and bulk_create do not send post_save.
+            product_cache.invalidate_products([])
+            leaderboards.refresh(self.touched)
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f'Imported {imported} products, rejected {rejected} rows in {elapsed:.2f}s '
+            f'({imported / elapsed:.0f} rows/s, {"COPY" if self.use_copy else "bulk_create"}).'
+        )
+
+    def copy_supported(self) -> bool:
+        if connection.vendor != 'postgresql':
+            return False
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+        # copy_products() uses the psycopg2 COPY API.
+        return not is_psycopg3
+
+    @transaction.atomic
+    def load_chunk(self, chunk: list[dict[str, Any]]) -> int:
+        self.resolve_categories({row['category'] for row in chunk})
+        self.touched.update(self.categories[row['category']] for row in chunk)
+        now = timezone.now()
+        rates = fx.get_rates()
+        for row in chunk:
+            row['price_base'] = fx.to_base(row['price'], row['currency'], rates)
+        if self.use_copy:
+            self.copy_products(chunk, now)
+        else:
+            Product.objects.bulk_create(
+                Product(
+                    name=row['name'], price=row['price'], price_base=row['price_base'], currency=row['currency'],
+                    rank=row['rank'], product_category_id=self.categories[row['category']], owner=self.owner,
+                )
+                for row in chunk
+            )
+        return len(chunk)
+
+    def resolve_categories(self, names: set[str]) -> None:
+        missing = names - self.categories.keys()
+        if not missing:
+            return
+        existing = (
+            ProductCategory.objects.filter(owner=self.owner, name__in=missing)
+            .order_by('-id').values_list('name', 'id')
+        )
+        # Ordered by descending id, so the oldest of duplicate names wins.
+        self.categories.update(existing)
+        missing -= self.categories.keys()
+        if missing:
+            ProductCategory.objects.bulk_create(ProductCategory(name=name, owner=self.owner) for name in missing)
+            created = ProductCategory.objects.filter(owner=self.owner, name__in=missing).values_list('name', 'id')
+            self.categories.update(created)
+
+    def copy_products(self, chunk: list[dict[str, Any]], now: Any) -> None:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in chunk:
+            writer.writerow([
+                row['name'], repr(row['price']), repr(row['price_base']) if row['price_base'] is not None else '',
+                row['currency'] if row['currency'] is not None else '',
+                row['rank'], now.isoformat(), now.isoformat(), self.categories[row['category']], self.owner.pk,
+            ])
+        buffer.seek(0)
+        sql = f"COPY {Product._meta.db_table} ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(sql, buffer)
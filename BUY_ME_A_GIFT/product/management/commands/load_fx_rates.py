@@ -0,0 +1,48 @@
+"""
+Load the exchange rates from a JSON file.
+
+Usage:
+    python manage.py load_fx_rates [rates.json] [--recompute]
+
+The file holds `{"base": "USD", "rates": {"EUR": 1.08}}`, each rate being
+the value of one unit of the currency in the base currency, and defaults to
+`settings.FX_RATES_FILE`. Only the products priced in a currency whose rate
+changed are repriced, unless `--recompute` reprices every product.
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from product import fx
+from product.serializers import ExchangeRatesSerializer
+
+
+class Command(BaseCommand):
+    help = 'Load the exchange rates from a JSON file.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('file', nargs='?', type=Path, help='Rates file, settings.FX_RATES_FILE by default.')
+        parser.add_argument('--recompute', action='store_true',
+                            help='Reprice every product, not only those whose rate changed.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        path = options['file'] or Path(settings.FX_RATES_FILE)
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Can not read {path}: {e}')
+        serializer = ExchangeRatesSerializer(data=data)
+        if not serializer.is_valid():
+            raise CommandError(f'Invalid rates in {path}: {serializer.errors}')
+
+        started = time.monotonic()
+        updated = serializer.save()
+        if options['recompute']:
+            updated = fx.recompute()
+        self.stdout.write(f"Loaded {len(serializer.validated_data['rates'])} rates, "
+                          f'repriced {updated} products in {time.monotonic() - started:.2f}s.')
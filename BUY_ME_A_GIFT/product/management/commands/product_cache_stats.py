@@ -0,0 +1,28 @@
+"""
+Print the hit/miss counters of the product read cache.
+
+Usage:
+    python manage.py product_cache_stats [--reset]
+"""
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from product import cache as product_cache
+
+
+class Command(BaseCommand):
+    help = 'Print the hit/miss counters of the product read cache.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        for kind, stats in product_cache.get_stats().items():
+            self.stdout.write(
+                f"{kind}: {stats['hits']} hits, {stats['misses']} misses, {stats['ratio']:.1%} hit ratio"
+            )
+        if options['reset']:
+            product_cache.reset_stats()
+            self.stdout.write('Counters reset.')
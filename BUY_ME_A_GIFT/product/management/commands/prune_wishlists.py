@@ -0,0 +1,30 @@
+"""
+Delete the wishlists without products.
+
+Usage:
+    python manage.py prune_wishlists [--batch-size 1000]
+
+Reading a wishlist no longer creates its row, only the first add does, so
+this removes the empty rows created by the reads of earlier versions and
+those emptied since. It is safe to run while the site is up.
+"""
+
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from product import wishlists
+
+
+class Command(BaseCommand):
+    help = 'Delete the wishlists without products, in batches.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--batch-size', type=int, default=wishlists.PRUNE_BATCH_SIZE,
+                            help='Wishlists deleted per transaction.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        started = time.monotonic()
+        deleted = wishlists.prune_empty(max(1, options['batch_size']))
+        self.stdout.write(f'Deleted {deleted} empty wishlists in {time.monotonic() - started:.2f}s.')
@@ -0,0 +1,35 @@
+"""
+Recompute the category leaderboards from the products.
+
+Usage:
+    python manage.py rebuild_leaderboards [--category 12 --category 34]
+
+The leaderboards are maintained on every write, this is for recovering from
+writes that bypassed that, such as raw SQL, or after changing
+`settings.LEADERBOARD_SIZE`.
+"""
+
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from product import leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Recompute the category leaderboards from the products.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--category', type=int, action='append', default=[],
+                            help='Only rebuild the leaderboard of this category id (repeatable).')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        started = time.monotonic()
+        if options['category']:
+            leaderboards.refresh(options['category'])
+            self.stdout.write(f"Rebuilt {len(set(options['category']))} leaderboards "
+                              f'in {time.monotonic() - started:.2f}s.')
+            return
+        count = leaderboards.rebuild()
+        self.stdout.write(f'Rebuilt every leaderboard, {count} entries in {time.monotonic() - started:.2f}s.')
@@ -0,0 +1,37 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+
+
+def create_search_indexes(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    # GIN indexes only exist on PostgreSQL, see product.search.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS product_name_search_idx ON product_product "
+        "USING gin (to_tsvector('simple'::regconfig, COALESCE(name, '')))"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS product_name_trgm_idx ON product_product "
+        "USING gin (name gin_trgm_ops)"
+    )
+
+
+def drop_search_indexes(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS product_name_search_idx")
+    schema_editor.execute("DROP INDEX IF EXISTS product_name_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0004_product_keyset_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+
+
+def create_prefix_indexes(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    # Serve `name__istartswith`, which PostgreSQL compiles to
+    # `UPPER(name::text) LIKE UPPER(...)`, see product.search.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS product_name_prefix_idx ON product_product "
+        "(UPPER(name::text) text_pattern_ops)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS productcategory_name_prefix_idx ON product_productcategory "
+        "(UPPER(name::text) text_pattern_ops)"
+    )
+
+
+def drop_prefix_indexes(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS product_name_prefix_idx")
+    schema_editor.execute("DROP INDEX IF EXISTS productcategory_name_prefix_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0005_product_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2 on 2026-10-18 06:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+import django.db.models.deletion
+
+
+def populate(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    Product = apps.get_model('product', 'Product')
+    CategoryLeaderboardEntry = apps.get_model('product', 'CategoryLeaderboardEntry')
+    size = getattr(settings, 'LEADERBOARD_SIZE', 20)
+    ranked = (
+        Product.objects.annotate(position=Window(
+            RowNumber(), partition_by=[F('product_category_id')], order_by=[F('rank').desc(), F('id').asc()]))
+        .filter(position__lte=size)
+        .values_list('product_category_id', 'position', 'id', 'rank')
+    )
+    CategoryLeaderboardEntry.objects.bulk_create(
+        (CategoryLeaderboardEntry(category_id=category_id, position=position, product_id=product_id, rank=rank)
+         for category_id, position, product_id, rank in ranked.iterator(chunk_size=5000)),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0007_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryLeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('rank', models.IntegerField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['product_category', '-rank', 'id'], name='product_category_rank_idx'),
+        ),
+        migrations.AddField(
+            model_name='categoryleaderboardentry',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard', to='product.productcategory'),
+        ),
+        migrations.AddField(
+            model_name='categoryleaderboardentry',
+            name='product',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entry', to='product.product'),
+        ),
+        migrations.AddConstraint(
+            model_name='categoryleaderboardentry',
+            constraint=models.UniqueConstraint(fields=('category', 'position'), name='leaderboard_category_position_uniq'),
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2 on 2026-10-18 06:08
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+from django.db.models import F, Q
+
+
+def populate(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    # No rate is known yet, only the prices in the base currency convert.
+    Product = apps.get_model('product', 'Product')
+    base = getattr(settings, 'FX_BASE_CURRENCY', 'USD')
+    Product.objects.filter(Q(currency__isnull=True) | Q(currency=base)).update(price_base=F('price'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0008_category_leaderboard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('currency', models.CharField(choices=[('USD', 'US Dollar'), ('EUR', 'Euro')], max_length=64, primary_key=True, serialize=False)),
+                ('rate', models.FloatField()),
+                ('updated_time', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='price_base',
+            field=models.FloatField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price_base', 'id'], name='product_price_base_id_idx'),
+        ),
+    ]
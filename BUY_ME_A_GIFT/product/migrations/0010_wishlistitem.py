@@ -0,0 +1,57 @@
+# Generated by Django 4.2 on 2026-10-18 06:41
+
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+from django.db.models import Exists, OuterRef, Subquery
+import django.db.models.deletion
+
+
+def populate(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    Product = apps.get_model('product', 'Product')
+    WishListItem = apps.get_model('product', 'WishListItem')
+    WishListItem.objects.update(category_id=Subquery(
+        Product.objects.filter(pk=OuterRef('product_id')).values('product_category_id')[:1]))
+    # Concurrent adds could get past the old check, the first product of a
+    # category stays.
+    WishListItem.objects.filter(Exists(WishListItem.objects.filter(
+        wishlist_id=OuterRef('wishlist_id'), category_id=OuterRef('category_id'), id__lt=OuterRef('id')))).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0009_price_base'),
+    ]
+
+    operations = [
+        # The implicit through table of WishList.products becomes the
+        # WishListItem model, without touching the table.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='WishListItem',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='product.product')),
+                        ('wishlist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='product.wishlist')),
+                    ],
+                    options={
+                        'db_table': 'product_wishlist_products',
+                        'unique_together': {('wishlist', 'product')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='wishlist',
+                    name='products',
+                    field=models.ManyToManyField(related_name='whishlist_products', through='product.WishListItem', to='product.product'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='wishlistitem',
+            name='category',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='product.productcategory'),
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-18 06:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    # Separate from 0010, PostgreSQL can not alter a table with pending
+    # deferred constraint checks from the data migration.
+
+    dependencies = [
+        ('product', '0010_wishlistitem'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='wishlistitem',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='product.productcategory'),
+        ),
+        migrations.AddConstraint(
+            model_name='wishlistitem',
+            constraint=models.UniqueConstraint(fields=('wishlist', 'category'), name='wishlist_category_uniq'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2 on 2026-10-18 06:26
+
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def populate(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    # The past adds have no time, only the counts are known.
+    WishListItem = apps.get_model('product', 'WishListItem')
+    ProductPopularity = apps.get_model('product', 'ProductPopularity')
+    counts = WishListItem.objects.values('product_id').annotate(wished=Count('id')).order_by('product_id')
+    ProductPopularity.objects.bulk_create(
+        (ProductPopularity(product_id=row['product_id'], wished=row['wished']) for row in counts.iterator()),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0011_wishlistitem_category_uniq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPopularity',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='product.product')),
+                ('wished', models.IntegerField(default=0)),
+                ('score', models.FloatField(null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='productpopularity',
+            index=models.Index(fields=['wished', 'product'], name='popularity_wished_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productpopularity',
+            index=models.Index(fields=['score', 'product'], name='popularity_score_idx'),
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
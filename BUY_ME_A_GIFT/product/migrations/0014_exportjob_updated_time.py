@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-18 07:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0013_product_popularity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='updated_time',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
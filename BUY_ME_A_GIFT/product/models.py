@@ -1,4 +1,6 @@
 from django.db import models
+from django.utils import timezone
+import uuid
 # from User.models import User
 
 # Create your models here.
@@ -16,6 +18,8 @@ class Product(models.Model):
     )
     name = models.CharField(max_length=128)
     price = models.FloatField()
+    # The price in settings.FX_BASE_CURRENCY, see product.fx.
+    price_base = models.FloatField(null=True, editable=False)
     currency = models.CharField(max_length=64, null=True, choices=currency_choice)
     rank = models.IntegerField()
     created_time = models.DateTimeField(auto_now_add=True, editable=False)
@@ -24,8 +28,95 @@ class Product(models.Model):
         ProductCategory, on_delete=models.CASCADE, related_name='product_category')
     owner = models.ForeignKey('user.User', on_delete=models.CASCADE, related_name='owner')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+            models.Index(fields=['price_base', 'id'], name='product_price_base_id_idx'),
+            models.Index(fields=['created_time', 'id'], name='product_created_id_idx'),
+            models.Index(fields=['rank', 'id'], name='product_rank_id_idx'),
+            models.Index(fields=['product_category', '-rank', 'id'], name='product_category_rank_idx'),
+        ]
+
+class ExchangeRate(models.Model):
+    """The value of one unit of `currency` in the base currency, see `product.fx`."""
+    currency = models.CharField(max_length=64, primary_key=True, choices=Product.currency_choice)
+    rate = models.FloatField()
+    updated_time = models.DateTimeField(auto_now=True)
+
+class CategoryLeaderboardEntry(models.Model):
+    """A product among the top ranked of its category, see `product.leaderboards`."""
+    category = models.ForeignKey(ProductCategory, on_delete=models.CASCADE, related_name='leaderboard')
+    position = models.PositiveSmallIntegerField()
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='leaderboard_entry')
+    rank = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'position'], name='leaderboard_category_position_uniq'),
+        ]
+
+class ProductPopularity(models.Model):
+    """
+    How many wishlists hold `product`, and its time-decayed wishlist adds,
+    see `product.popularity`.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='popularity')
+    wished = models.IntegerField(default=0)
+    # Base 2 logarithm of the forward-decayed adds, NULL without adds.
+    score = models.FloatField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['wished', 'product'], name='popularity_wished_idx'),
+            models.Index(fields=['score', 'product'], name='popularity_score_idx'),
+        ]
+
 class WishList(models.Model):
     user = models.OneToOneField(
         'user.User', on_delete=models.CASCADE, related_name="wishlist")
     products = models.ManyToManyField(
-        Product, related_name='whishlist_products')
+        Product, related_name='whishlist_products', through='WishListItem')
+
+
+class WishListItem(models.Model):
+    """
+    A product of a wishlist. `category` is the category of the product, so
+    that the database holds a wishlist to one product per category, see
+    `product.wishlists`.
+    """
+    wishlist = models.ForeignKey(WishList, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    category = models.ForeignKey(ProductCategory, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        # The table of the implicit through model it replaces.
+        db_table = 'product_wishlist_products'
+        unique_together = [('wishlist', 'product')]
+        constraints = [
+            models.UniqueConstraint(fields=['wishlist', 'category'], name='wishlist_category_uniq'),
+        ]
+
+
+class ExportJob(models.Model):
+    format_choice = (
+        ('ndjson', 'NDJSON'),
+        ('csv', 'CSV'),
+    )
+    status_choice = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey('user.User', on_delete=models.CASCADE, related_name='export_jobs')
+    format = models.CharField(max_length=16, choices=format_choice, default='ndjson')
+    status = models.CharField(max_length=16, choices=status_choice, default='pending')
+    rows = models.BigIntegerField(default=0)
+    rows_per_second = models.FloatField(default=0)
+    file = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    created_time = models.DateTimeField(auto_now_add=True, editable=False)
+    finished_time = models.DateTimeField(null=True, blank=True)
+    # Set on every status or progress change, see product.exports.fail_if_stale().
+    updated_time = models.DateTimeField(default=timezone.now, editable=False)
@@ -0,0 +1,112 @@
+"""
+This module derives queryset optimizations from a DRF serializer.
+
+It walks the (possibly nested) serializer fields and applies the matching
+`select_related`, `prefetch_related` and `only()` calls, so that rendering a
+list runs a constant number of queries regardless of its size.
+"""
+
+from typing import Any
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Model, Prefetch
+from django.db.models.query import QuerySet
+from rest_framework import serializers
+
+
+def _get_fields(serializer: Any) -> dict:
+    if isinstance(serializer, type):
+        serializer = serializer()
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    fields: dict = serializer.fields
+    return fields
+
+
+def _collect(serializer: Any, model: type[Model], prefix: str,
+             select: list[str], prefetch: list[Prefetch], only: list[str]) -> bool:
+    """
+    Collect the relations and columns the serializer reads from `model`.
+
+    Returns False when a field reads something that is not a concrete model
+    field (a property, a method or the whole instance), in which case the
+    columns of this model can not be restricted with only().
+    """
+    restrictable = True
+    only.append(prefix + model._meta.pk.name)
+
+    for field in _get_fields(serializer).values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            restrictable = False
+            continue
+        name = field.source_attrs[0]
+        try:
+            model_field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            restrictable = False
+            continue
+
+        if isinstance(field, (serializers.ListSerializer, serializers.ManyRelatedField)):
+            if not model_field.is_relation:
+                continue
+            prefetch.append(Prefetch(prefix + name, queryset=_related_queryset(field, model_field)))
+        elif isinstance(field, serializers.BaseSerializer) and model_field.is_relation:
+            select.append(prefix + name)
+            only.append(prefix + name)
+            nested_only: list[str] = []
+            related_model: type[Model] = model_field.related_model  # type: ignore[assignment]
+            if _collect(field, related_model, prefix + name + '__', select, prefetch, nested_only):
+                only.extend(nested_only)
+        elif model_field.concrete:
+            only.append(prefix + name)
+
+    return restrictable
+
+
+def _related_queryset(field: Any, model_field: Any) -> QuerySet:
+    related_model = model_field.related_model
+    queryset: QuerySet = related_model._default_manager.all()
+    if isinstance(field, serializers.ManyRelatedField):
+        return queryset.only(related_model._meta.pk.name)
+    queryset = optimize_queryset(queryset, field.child)
+    if model_field.one_to_many:
+        # Reverse foreign keys are matched back to their parent through the
+        # foreign key column, which therefore has to stay loaded.
+        field_names, defer = queryset.query.deferred_loading
+        if not defer:
+            queryset = queryset.only(*field_names, model_field.field.name)
+    return queryset
+
+
+def optimize_queryset(queryset: QuerySet, serializer: Any) -> QuerySet:
+    """
+    Apply the select_related/prefetch_related/only() calls that `serializer`
+    (a serializer class or instance) needs to render `queryset`.
+    """
+    select: list[str] = []
+    prefetch: list[Prefetch] = []
+    only: list[str] = []
+    if _collect(serializer, queryset.model, '', select, prefetch, only):
+        queryset = queryset.only(*only)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class OptimizedQuerySetMixin:
+    """
+    View mixin that optimizes the view queryset for its serializer class.
+
+    It hooks into `filter_queryset`, which `list()` and `get_object()` both
+    call, so it also applies to views overriding `get_queryset()`. The
+    serializer is instantiated with the view context, so fields it prunes per
+    request are not fetched.
+    """
+
+    def filter_queryset(self, queryset: QuerySet) -> QuerySet:
+        queryset = super().filter_queryset(queryset)  # type: ignore[misc]
+        return optimize_queryset(queryset, self.get_serializer())  # type: ignore[attr-defined]
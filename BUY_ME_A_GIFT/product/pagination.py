@@ -0,0 +1,312 @@
+"""
+This module contains pagination classes for the product app.
+
+KeysetPagination pages over a `(sort fields..., id)` key instead of OFFSET,
+so every page is an index range scan and no COUNT(*) is issued.
+UncountedLimitOffsetPagination serves result sets that have no stable sort
+key, such as relevance ranked search results, without a COUNT(*) either.
+"""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from typing import Any, NamedTuple, cast
+
+from django.core.exceptions import ValidationError
+from django.db.models import Field, Model, Q
+from django.db.models.query import QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class Cursor(NamedTuple):
+    values: tuple
+    pk: Any
+    reverse: bool
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a stable `(fields..., id)` sort key.
+
+    Query parameters:
+        - ordering: comma separated `ordering_fields`, each optionally
+          prefixed with `-`, such as `rank,-created_time`
+        - page_size: number of items per page (bounded by `max_page_size`)
+        - cursor: opaque token taken from the `next`/`previous` links
+    """
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    ordering_fields: tuple[str, ...] = ('price', 'price_base', 'created_time', 'rank')
+    default_ordering = '-created_time'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(  # type: ignore[override]
+            self, queryset: QuerySet, request: Request, view: Any = None) -> list:
+        # Keyset pages filter and order a queryset, not a sequence.
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request)
+        self.fields = [key.lstrip('-') for key in self.ordering]
+        self.pk_name = queryset.model._meta.pk.attname
+        cursor = self.decode_cursor(request, queryset.model)
+        self.cursor = cursor
+
+        queryset = self.exclude_unsorted(self.ensure_loaded(queryset), self.fields)
+        reverse = cursor.reverse if cursor else False
+        keys = self.get_sort_keys(self.ordering, reverse)
+        queryset = queryset.order_by(*keys)
+
+        if cursor is not None:
+            queryset = queryset.filter(self.get_keyset_filter(cursor, keys))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        self.page = results
+        return results
+
+    def order_queryset(self, queryset: QuerySet, request: Request) -> QuerySet:
+        """Order the whole of `queryset` like its pages, for an unpaginated listing."""
+        ordering = self.get_ordering(request)
+        queryset = self.exclude_unsorted(queryset, [key.lstrip('-') for key in ordering])
+        return queryset.order_by(*self.get_sort_keys(ordering))
+
+    def exclude_unsorted(self, queryset: QuerySet, fields: list[str]) -> QuerySet:
+        for field in fields:
+            if queryset.model._meta.get_field(field).null:
+                # A row without a sort key has no position in the keyset.
+                queryset = queryset.filter(**{field + '__isnull': False})
+        return queryset
+
+    def get_sort_keys(self, ordering: list[str], reverse: bool = False) -> list[str]:
+        # The id breaks ties in the direction of the last key.
+        keys = [*ordering, ('-' if ordering[-1].startswith('-') else '') + 'pk']
+        if reverse:
+            keys = [key[1:] if key.startswith('-') else '-' + key for key in keys]
+        return keys
+
+    def get_paginated_response(self, data: Any) -> Response:
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view: Any) -> list[dict]:
+        return [
+            {'name': self.cursor_query_param, 'required': False, 'in': 'query',
+             'description': 'The pagination cursor value.', 'schema': {'type': 'string'}},
+            {'name': self.page_size_query_param, 'required': False, 'in': 'query',
+             'description': 'Number of results to return per page.', 'schema': {'type': 'integer'}},
+            {'name': self.ordering_query_param, 'required': False, 'in': 'query',
+             'description': 'Comma separated sort keys, among: ' + ', '.join(self.ordering_fields)
+                            + ' (prefix with - for descending).',
+             'schema': {'type': 'string'}},
+        ]
+
+    def get_page_size(self, request: Request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, request: Request) -> list[str]:
+        """Return the requested sort keys, or the default ones when they are invalid."""
+        ordering = self.parse_ordering(request.query_params.get(self.ordering_query_param, ''))
+        return ordering or self.parse_ordering(self.default_ordering)
+
+    def parse_ordering(self, value: str) -> list[str]:
+        keys = [key.strip() for key in value.split(',')]
+        fields = [key.lstrip('-') for key in keys]
+        if not all(field in self.ordering_fields for field in fields) or len(set(fields)) != len(fields):
+            return []
+        return keys
+
+    def ensure_loaded(self, queryset: QuerySet) -> QuerySet:
+        # The sort fields are read back from the last row to build the next
+        # cursor, so they must not be deferred by an only() restriction or
+        # left out of a values() selection. values() without fields selects
+        # every column and leaves `values_select` empty.
+        selected = queryset.query.values_select
+        if selected:
+            missing = [field for field in self.fields if field not in selected]
+            if missing:
+                queryset = queryset.values(*selected, *queryset.query.annotation_select, *missing)
+            return queryset
+        field_names, defer = queryset.query.deferred_loading
+        if not defer and not field_names.issuperset(self.fields):
+            queryset = queryset.only(*field_names, *self.fields)
+        return queryset
+
+    def get_keyset_filter(self, cursor: Cursor, keys: list[str]) -> Q:
+        """
+        Select the rows after `cursor` in the order of `keys`:
+        `a >= x AND (a > x OR (a = x AND b > y) OR (a = x AND b = y AND id > pk))`,
+        each comparison following the direction of its key. The leading
+        range lets the planner start the index range at `x` directly.
+        """
+        values = [*cursor.values, cursor.pk]
+        names = [key.lstrip('-') for key in keys]
+        after = Q()
+        equal = Q()
+        for name, key, value in zip(names, keys, values):
+            lookup = '__lt' if key.startswith('-') else '__gt'
+            after |= equal & Q(**{name + lookup: value})
+            equal &= Q(**{name: value})
+        first = names[0] + ('__lte' if keys[0].startswith('-') else '__gte')
+        return Q(**{first: values[0]}) & after
+
+    def decode_cursor(self, request: Request, model: type[Model]) -> Cursor | None:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values, pk, reverse = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            if len(values) != len(self.fields):
+                raise ValueError('The cursor does not match the ordering')
+            # The sort keys are concrete fields, among `ordering_fields`.
+            model_fields = [cast(Field, model._meta.get_field(field)) for field in self.fields]
+            values = tuple(model_field.to_python(value) for model_field, value in zip(model_fields, values))
+            return Cursor(values, int(pk), bool(reverse))
+        except (TypeError, ValueError, ValidationError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, cursor: Cursor) -> str:
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in cursor.values]
+        token = json.dumps([values, cursor.pk, int(cursor.reverse)], separators=(',', ':'))
+        return urlsafe_b64encode(token.encode('ascii')).decode('ascii')
+
+    def get_position(self, instance: Model | dict) -> tuple[tuple, Any]:
+        if isinstance(instance, dict):
+            return tuple(instance[field] for field in self.fields), instance[self.pk_name]
+        return tuple(getattr(instance, field) for field in self.fields), instance.pk
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next:
+            return None
+        if self.page:
+            values, pk = self.get_position(self.page[-1])
+        else:
+            # Only a page reached through a cursor can be empty.
+            cursor = cast(Cursor, self.cursor)
+            values, pk = cursor.values, cursor.pk
+        return self.build_link(Cursor(values, pk, False))
+
+    def get_previous_link(self) -> str | None:
+        if not self.has_previous:
+            return None
+        if self.page:
+            values, pk = self.get_position(self.page[0])
+        else:
+            # Only a page reached through a cursor can be empty.
+            cursor = cast(Cursor, self.cursor)
+            values, pk = cursor.values, cursor.pk
+        return self.build_link(Cursor(values, pk, True))
+
+    def build_link(self, cursor: Cursor) -> str:
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.ordering_query_param, ','.join(self.ordering))
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(cursor))
+
+
+class WishListPagination(KeysetPagination):
+    """
+    Keyset pagination of the public wishlists, sorted with `?order=`.
+
+    The `rank` and `created_time` parameters of the earlier API are still
+    understood when `order` is missing, rank first and each `asc` listing
+    the highest values first as it always did.
+
+    The rows of a wishlist are found through the (wishlist, product) index of
+    its items and sorted after the join, no Product index can serve an
+    ordering filtered on the wishlist. A wishlist holds at most one product
+    per category, so the sort is over a few rows whatever the key.
+    """
+    ordering_query_param = 'order'
+    ordering_fields = ('rank', 'created_time', 'price')
+    legacy_ordering_params = ('rank', 'created_time')
+
+    def get_ordering(self, request: Request) -> list[str]:
+        if self.ordering_query_param not in request.query_params:
+            legacy = [
+                ('-' if request.query_params[name] == 'asc' else '') + name
+                for name in self.legacy_ordering_params if request.query_params.get(name)
+            ]
+            if legacy:
+                return legacy
+        return super().get_ordering(request)
+
+
+class TrendingPagination(KeysetPagination):
+    """Keyset pagination of the product popularity, trending first by default."""
+    ordering_fields = ('score', 'wished')
+    default_ordering = '-score'
+
+
+class UncountedLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination that detects the next page by fetching one extra
+    row instead of counting the whole result set. Offsets are capped at
+    `max_offset` to bound the rows skipped by deep pages.
+    """
+    default_limit: int = 20
+    max_limit = 100
+    max_offset = 1000
+    template = None
+    # Set for the page being served, unlike the optional ones of the base class.
+    request: Request
+    limit: int
+    offset: int
+
+    def paginate_queryset(  # type: ignore[override]
+            self, queryset: QuerySet, request: Request, view: Any = None) -> list:
+        self.request = request
+        self.limit = self.get_limit(request) or self.default_limit
+        self.offset = min(self.get_offset(request), self.max_offset)
+        results = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(results) > self.limit and self.offset + self.limit <= self.max_offset
+        return results[:self.limit]
+
+    def get_paginated_response(self, data: Any) -> Response:
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        response_schema = super().get_paginated_response_schema(schema)
+        del response_schema['properties']['count']
+        return response_schema
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
@@ -0,0 +1,198 @@
+"""
+This module maintains the popularity of the products in the wishlists.
+
+Every product has a ProductPopularity row holding `wished`, the number of
+wishlists holding it, and `score`, its wishlist adds decayed exponentially
+with a half-life of `settings.POPULARITY_HALF_LIFE` seconds. The decay is
+applied forward: an add at time `t` weighs `2 ** ((t - EPOCH) / half_life)`,
+so the stored scores never need to be rewritten as time passes and keep the
+order of the decayed ones, which `decayed()` recovers. The score is stored
+as the base 2 logarithm of that sum, which grows linearly with time instead
+of overflowing, and is NULL for a product never added. Both columns are
+indexed, so the most wished-for and the trending products are index range
+scans. A removal only counts `wished` down, as it can not tell which add it
+undoes.
+
+The changes are recorded from the `m2m_changed` receiver in
+`product.signals` once their transaction commits, and coalesced per product
+in memory: the buffer of each process is flushed when it holds
+`settings.POPULARITY_FLUSH_SIZE` products or, checked on every change and
+every request, is `settings.POPULARITY_FLUSH_INTERVAL` seconds old, with a
+few statements per batch of products however many changes it coalesces, so
+a product wished for by many users at once is not a hot row. What is still
+buffered is flushed when the process exits. A failed flush is logged and
+its changes kept for the next one, the wishlist writes that recorded them
+having committed already. Only the changes of a process killed outright
+are lost; `rebuild()` then recounts `wished` exactly, their adds are
+missing from the scores.
+"""
+
+import atexit
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Any
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Product, ProductPopularity, WishListItem
+
+EPOCH = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+# Product id to the pending [wished delta, logarithmic score of the adds].
+_pending: dict[Any, list] = {}
+# When the oldest change of the buffer was recorded, or a failed flush retried.
+_since = time.monotonic()
+
+
+def get_half_life() -> float:
+    return getattr(settings, 'POPULARITY_HALF_LIFE', 7 * 24 * 3600)
+
+
+def log_weight(at: datetime | None = None) -> float:
+    """The logarithmic weight of an add at `at`, now by default."""
+    return ((at or timezone.now()) - EPOCH).total_seconds() / get_half_life()
+
+
+def log_add(a: float | None, b: float | None) -> float | None:
+    """`log2(2 ** a + 2 ** b)` without leaving the logarithms, None being no adds."""
+    if a is None or b is None:
+        return b if a is None else a
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def decayed(score: float | None, at: datetime | None = None) -> float:
+    """The value at `at`, now by default, of a stored score."""
+    if score is None:
+        return 0.0
+    return 2 ** (score - log_weight(at))
+
+
+def get_flush_interval() -> float:
+    return getattr(settings, 'POPULARITY_FLUSH_INTERVAL', 10)
+
+
+def record(changes: dict[Any, int], at: datetime | None = None) -> None:
+    """
+    Buffer `changes`, product ids to the number of wishlists they entered
+    (or left, when negative), and flush the buffer when it is due. A failed
+    flush is logged, not raised.
+    """
+    if not changes:
+        return
+    global _since
+    weight = log_weight(at)
+    with _lock:
+        if not _pending:
+            _since = time.monotonic()
+        for product_id, delta in changes.items():
+            pending = _pending.setdefault(product_id, [0, None])
+            pending[0] += delta
+            if delta > 0:
+                pending[1] = log_add(pending[1], weight + math.log2(delta))
+        due = len(_pending) >= getattr(settings, 'POPULARITY_FLUSH_SIZE', 500)
+    if due:
+        flush_logged()
+    else:
+        flush_if_due()
+
+
+def flush_if_due() -> None:
+    """Flush the buffer when its oldest change is older than the flush interval."""
+    if _pending and time.monotonic() - _since >= get_flush_interval():
+        flush_logged()
+
+
+def record_on_commit(changes: dict[Any, int]) -> None:
+    # A rolled back change is never counted, the weight is that of the change.
+    at = timezone.now()
+    transaction.on_commit(lambda: record(changes, at))
+
+
+def flush_logged() -> None:
+    try:
+        flush()
+    except Exception:
+        # Merged back into the buffer, the next flush retries them.
+        logger.exception('Could not flush the product popularity changes.')
+
+
+@atexit.register
+def flush_at_exit() -> None:
+    if _pending:
+        flush_logged()
+
+
+def flush() -> int:
+    """Write the buffered changes of this process, and return how many products were updated."""
+    global _since
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+    product_ids = sorted(pending)
+    updated = 0
+    try:
+        for start in range(0, len(product_ids), BATCH_SIZE):
+            batch = product_ids[start:start + BATCH_SIZE]
+            updated += apply({product_id: pending[product_id] for product_id in batch})
+            for product_id in batch:
+                del pending[product_id]
+    except Exception:
+        # Merged back, the flush is retried after another interval.
+        with _lock:
+            _since = time.monotonic()
+            for product_id, (wished, score) in pending.items():
+                current = _pending.setdefault(product_id, [0, None])
+                current[0] += wished
+                current[1] = log_add(current[1], score)
+        raise
+    return updated
+
+
+def apply(deltas: dict[Any, list]) -> int:
+    """Add `deltas` to the popularity rows with one UPDATE, creating the missing rows."""
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta[0] or delta[1] is not None}
+    if not deltas:
+        return 0
+    with transaction.atomic():
+        # The products deleted since the change have no row to update.
+        product_ids = list(Product.objects.filter(pk__in=deltas).values_list('pk', flat=True))
+        ProductPopularity.objects.bulk_create(
+            [ProductPopularity(product_id=product_id) for product_id in product_ids], ignore_conflicts=True)
+        # Locked in product order, so concurrent flushes can not deadlock.
+        rows = list(
+            ProductPopularity.objects.select_for_update().filter(product_id__in=product_ids).order_by('product_id'))
+        for row in rows:
+            wished, score = deltas[row.product_id]
+            row.wished = max(row.wished + wished, 0)
+            row.score = log_add(row.score, score)
+        ProductPopularity.objects.bulk_update(rows, ['wished', 'score'])
+    return len(rows)
+
+
+def rebuild() -> int:
+    """
+    Recount `wished` from the wishlists with one GROUP BY, for the changes
+    lost with a process or made without signals. The scores are kept, the
+    times of the past adds are not stored. Returns the number of rows.
+    """
+    counts = dict(
+        WishListItem.objects.values('product_id').annotate(wished=Count('id')).values_list('product_id', 'wished'))
+    with transaction.atomic():
+        ProductPopularity.objects.exclude(wished=0).exclude(
+            product_id__in=WishListItem.objects.values('product_id')).update(wished=0)
+        ProductPopularity.objects.bulk_create(
+            [ProductPopularity(product_id=product_id, wished=wished) for product_id, wished in counts.items()],
+            update_conflicts=True, unique_fields=['product'], update_fields=['wished'], batch_size=5000,
+        )
+    return len(counts)
@@ -0,0 +1,99 @@
+"""
+This module contains the orjson and MessagePack renderers and parsers.
+
+ORJSONRenderer produces the same bytes as DRF's JSONRenderer with the default
+settings, so clients can not tell them apart: every type orjson does not
+format the same way (datetimes, decimals, lazy strings...) goes through the
+DRF encoder, and the rare payloads holding a float that Python writes in
+exponent notation are rendered by JSONRenderer itself. Non compact, indented
+or ASCII only output is left to JSONRenderer as well. The one difference is
+that NaN and infinite floats are rendered as null instead of raising.
+"""
+
+import re
+from typing import Any, Mapping
+
+import msgpack
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+# A literal first character keeps the search fast; the digit before the
+# exponent is checked on the (rare) matches.
+EXPONENT = re.compile(rb'e[-0-9]')
+
+
+def differs_from_repr(content: bytes) -> bool:
+    """
+    Whether `content` may hold a float that repr() writes differently: orjson
+    writes floats below 1e-4 positionally and floats from 1e16 up with an
+    unsigned exponent, where repr() uses a signed two digit exponent.
+    """
+    if b'0.0000' in content:
+        return True
+    for match in EXPONENT.finditer(content):
+        if content[match.start() - 1:match.start()].isdigit():
+            return True
+    return False
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer drop-in backed by orjson."""
+
+    def render(self, data: Any, accepted_media_type: str | None = None,
+               renderer_context: Mapping[str, Any] | None = None) -> bytes:
+        if data is None:
+            return b''
+        if (self.get_indent(accepted_media_type or '', renderer_context or {}) is not None
+                or not self.compact or self.ensure_ascii or self.encoder_class is not JSONEncoder):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits, for example.
+            return super().render(data, accepted_media_type, renderer_context)
+        if differs_from_repr(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+        # JSONRenderer escapes the characters that are not valid in JavaScript strings.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser drop-in backed by orjson."""
+
+    def parse(self, stream: Any, media_type: str | None = None,
+              parser_context: Mapping[str, Any] | None = None) -> Any:
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            data = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                data = data.decode(encoding)
+            # orjson always rejects NaN and Infinity, like a strict JSONParser.
+            return orjson.loads(data)
+        except (ValueError, UnicodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders MessagePack for clients sending `Accept: application/msgpack`.
+    Values without a MessagePack type are converted as in the JSON output.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data: Any, accepted_media_type: str | None = None,
+               renderer_context: Mapping[str, Any] | None = None) -> bytes:
+        if data is None:
+            return b''
+        packed: bytes = msgpack.packb(data, default=JSONEncoder().default, use_bin_type=True)
+        return packed
@@ -0,0 +1,88 @@
+"""
+This module contains the product name search.
+
+On PostgreSQL, names are matched with `to_tsvector('simple', name)` against a
+websearch query, which is served by a GIN index. When the full-text query
+matches nothing (typically because of a typo) the search falls back to
+trigram similarity, served by a pg_trgm GIN index. Other database backends
+fall back to a case-insensitive substring match.
+
+Results are ordered by the text relevance boosted by the logarithm of
+Product.rank, so the rank orders matches of a similar relevance without
+overriding a clearly stronger match however high it grows.
+
+Name suggestions for typeahead are case-insensitive prefix matches, served on
+PostgreSQL by `UPPER(name) text_pattern_ops` indexes on the product and
+category tables. The matching product names are grouped to rank them, so
+prefixes shorter than `settings.SUGGEST_MIN_LENGTH` are not completed.
+"""
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.conf import settings
+from django.db import connections
+from django.db.models import ExpressionWrapper, F, FloatField, Max, Value
+from django.db.models.functions import Cast, Greatest, Ln
+from django.db.models.query import QuerySet
+
+from .models import Product, ProductCategory
+
+SEARCH_CONFIG = 'simple'
+# The relevance is multiplied by 1 + RANK_WEIGHT * ln(1 + rank): a rank of
+# 1000 boosts it by 70%, a rank of a million by 140%.
+RANK_WEIGHT = 0.1
+
+
+def search_vector() -> SearchVector:
+    # Must stay in sync with the expression indexed by product_name_search_idx.
+    return SearchVector('name', config=SEARCH_CONFIG)
+
+
+def search_products(queryset: QuerySet, query: str) -> QuerySet:
+    """Filter `queryset` on `query` and order it by descending score."""
+    if connections[queryset.db].vendor != 'postgresql':
+        queryset = queryset.filter(name__icontains=query).annotate(relevance=Value(1.0, output_field=FloatField()))
+    else:
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        matches = queryset.alias(search=search_vector()).filter(search=search_query)
+        if matches.exists():
+            queryset = matches.annotate(relevance=SearchRank(search_vector(), search_query))
+        else:
+            queryset = queryset.filter(name__trigram_similar=query).annotate(
+                relevance=TrigramSimilarity('name', query))
+
+    return order_by_score(queryset)
+
+
+def order_by_score(queryset: QuerySet) -> QuerySet:
+    """Order `queryset`, annotated with a text `relevance`, by descending score."""
+    rank = Cast(Greatest(F('rank'), Value(0)), FloatField())
+    boost = Value(1.0) + RANK_WEIGHT * Ln(rank + Value(1.0))
+    score = ExpressionWrapper(F('relevance') * boost, output_field=FloatField())
+    ranked: QuerySet = queryset.annotate(score=score).order_by('-score', 'id')
+    return ranked
+
+
+def get_suggest_min_length() -> int:
+    return getattr(settings, 'SUGGEST_MIN_LENGTH', 3)
+
+
+def suggest_names(prefix: str, limit: int) -> dict[str, list[str]]:
+    """
+    Return up to `limit` distinct product names starting with `prefix`, best
+    ranked first, and up to `limit` category names starting with `prefix`.
+    A prefix shorter than the minimum length has no completions.
+    """
+    if len(prefix) < get_suggest_min_length():
+        return {'products': [], 'categories': []}
+    products = (
+        Product.objects.filter(name__istartswith=prefix)
+        .values('name').annotate(best_rank=Max('rank')).order_by('-best_rank', 'name')[:limit]
+    )
+    categories = (
+        ProductCategory.objects.filter(name__istartswith=prefix)
+        .values_list('name', flat=True).distinct().order_by('name')[:limit]
+    )
+    return {
+        'products': [product['name'] for product in products],
+        'categories': list(categories),
+    }
@@ -1,6 +1,19 @@
 from rest_framework import serializers
-from .models import Product, ProductCategory, WishList
-from typing import Any
+from rest_framework.settings import api_settings
+from .models import Product, ProductCategory, WishList, WishListItem, ExportJob, CategoryLeaderboardEntry, ProductPopularity
+from django.db import transaction
+from django.db.models import F, FloatField, IntegerField, Max, Min, Value
+from django.db.models.functions import Cast, Round
+from django.db.models.query import QuerySet
+from django.urls import reverse
+from django.utils import timezone
+from typing import Any, cast
+import math
+from . import cache as product_cache
+from . import fx
+from . import leaderboards
+from . import popularity
+from . import wishlists
 
 class ProductCategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -11,13 +24,314 @@ class ProductCategoryCreateSerializer(serializers.ModelSerializer):
         model = ProductCategory
         fields = ['name']
 
+class OwnedCategoryField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key of a category owned by the requesting user.
+
+    When the root serializer prefetched the categories of a bulk payload,
+    they are looked up there instead of with one query per item.
+    """
+    def get_queryset(self) -> Any:
+        queryset = ProductCategory.objects.all()
+        request = self.context.get('request')
+        if request is not None and request.user.is_authenticated:
+            queryset = queryset.filter(owner=request.user)
+        return queryset
+
+    def to_internal_value(self, data: Any) -> ProductCategory:
+        categories = getattr(self.root, 'categories', None)
+        if categories is None:
+            category: ProductCategory = super().to_internal_value(data)
+            return category
+        try:
+            # Checked and converted like the pk lookup of the single item path.
+            if isinstance(data, bool):
+                raise TypeError
+            category = categories[ProductCategory._meta.pk.get_prep_value(data)]
+            return category
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+class CategoryPrefetchListSerializer(serializers.ListSerializer):
+    """
+    Validates the categories of every item with one IN query, for the
+    OwnedCategoryField of its child.
+    """
+    def to_internal_value(self, data: Any) -> list:
+        if isinstance(data, list):
+            ids = set()
+            for item in data:
+                try:
+                    ids.add(int(item['product_category']))
+                except (KeyError, TypeError, ValueError):
+                    continue
+            child: Any = self.child
+            self.categories = child.fields['product_category'].get_queryset().in_bulk(ids)
+        items: list = super().to_internal_value(data)
+        return items
+
+class ProductBulkCreateSerializer(CategoryPrefetchListSerializer):
+    """
+    Inserts all the products with one bulk_create.
+    """
+    def create(self, validated_data: list[dict]) -> list[Product]:
+        products = [Product(**attrs) for attrs in validated_data]
+        # bulk_create does not send pre_save nor post_save.
+        fx.set_base_prices(products)
+        products = Product.objects.bulk_create(products)
+        product_cache.invalidate_products([])
+        leaderboards.refresh({product.product_category_id for product in products})
+        return products
+
+class ProductBulkUpdateListSerializer(CategoryPrefetchListSerializer):
+    """
+    Applies per-id partial updates to the products of `instance` (a queryset)
+    with one locking SELECT and one bulk_update. Ids missing from the
+    queryset are ignored; later updates of a repeated id win.
+    """
+    batch_size = 500
+
+    def update(self, instance: QuerySet[Product], validated_data: list[dict]) -> list[Product]:
+        updates: dict[int, dict] = {}
+        for attrs in validated_data:
+            attrs = dict(attrs)
+            updates.setdefault(attrs.pop('id'), {}).update(attrs)
+        fields = sorted({name for attrs in updates.values() for name in attrs})
+        if not fields:
+            return []
+
+        now = timezone.now()
+        # The price in the base currency follows the price and the currency.
+        priced = 'price' in fields or 'currency' in fields
+        loaded = {*fields, 'price', 'currency'} if priced else set(fields)
+        with transaction.atomic():
+            products = list(instance.filter(id__in=updates).select_for_update().only(*loaded))
+            for product in products:
+                for name, value in updates[product.id].items():
+                    setattr(product, name, value)
+                # bulk_update bypasses auto_now.
+                product.updated_time = now
+            if priced:
+                fx.set_base_prices(products)
+            Product.objects.bulk_update(
+                products, [*fields, 'updated_time', *(['price_base'] if priced else [])], batch_size=self.batch_size)
+            product_cache.invalidate_products([product.id for product in products])
+            # The public wishlists embed the products, and their items follow the category.
+            wishlists.products_changed([product.id for product in products])
+            if 'rank' in fields or 'product_category' in fields:
+                leaderboards.refresh(
+                    leaderboards.categories_of([product.id for product in products])
+                    | {product.product_category_id for product in products})
+        return products
+
 class ProductCreateSerializer(serializers.ModelSerializer):
-    product_category = serializers.PrimaryKeyRelatedField(queryset=ProductCategory.objects.all())
+    product_category = OwnedCategoryField(queryset=ProductCategory.objects.all())
     class Meta: 
         model = Product
         fields = ['id', 'name', 'price', 'rank', 'created_time', 'updated_time', 'product_category']
+        list_serializer_class = ProductBulkCreateSerializer
+
+class ProductBulkUpdateSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField()
+    product_category = OwnedCategoryField(queryset=ProductCategory.objects.all(), required=False)
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'price', 'currency', 'rank', 'product_category']
+        list_serializer_class = ProductBulkUpdateListSerializer
+
+    def validate(self, attrs: dict) -> dict:
+        # Partial validation skips required fields, the id is required anyway.
+        if 'id' not in attrs:
+            raise serializers.ValidationError({'id': 'This field is required.'})
+        return attrs
+
+class ProductBulkFilterSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    product_category = serializers.IntegerField(required=False)
+    currency = serializers.ChoiceField(choices=Product.currency_choice, required=False)
+    price_gt = serializers.FloatField(required=False)
+    price_lt = serializers.FloatField(required=False)
+
+    def filter(self, queryset: QuerySet[Product], attrs: dict) -> QuerySet[Product]:
+        lookups = {
+            'ids': 'id__in', 'product_category': 'product_category_id', 'currency': 'currency',
+            'price_gt': 'price__gt', 'price_lt': 'price__lt',
+        }
+        return queryset.filter(**{lookups[name]: value for name, value in attrs.items()})
+
+class ProductBulkDeleteSerializer(ProductBulkFilterSerializer):
+    """
+    A filter whose matching products are deleted with set-based DELETEs,
+    instead of loading them for the deletion collector.
+    """
+    def validate(self, attrs: dict) -> dict:
+        if not attrs:
+            raise serializers.ValidationError('At least one filter is required.')
+        return attrs
+
+    def apply(self, queryset: QuerySet[Product]) -> int:
+        """Delete the matching products of `queryset` and return how many were deleted."""
+        products = self.filter(queryset, self.validated_data)
+        with transaction.atomic():
+            user_ids = list(
+                WishList.objects.filter(products__in=products.values('id')).values_list('user_id', flat=True).distinct())
+            WishListItem.objects.filter(product_id__in=products.values('id')).delete()
+            boards = leaderboards.categories_of(products.values('id'))
+            CategoryLeaderboardEntry.objects.filter(product_id__in=products.values('id')).delete()
+            ProductPopularity.objects.filter(product_id__in=products.values('id')).delete()
+            # A single DELETE, where delete() would load every product for the
+            # deletion collector and its signals. The private _raw_delete() is
+            # safe here because every table referencing Product is emptied of
+            # the products above, and a reference added later fails this
+            # DELETE on its foreign key rather than being orphaned. No receiver
+            # needs the deleted rows, the caches and leaderboards are updated below.
+            deleted = products._raw_delete(products.db)
+            leaderboards.refresh(boards)
+            if deleted:
+                product_cache.invalidate_all_products()
+            if user_ids:
+                product_cache.invalidate_wishlists(user_ids)
+        return deleted
+
+# The range of an IntegerField column, a 32-bit integer on PostgreSQL.
+INTEGER_RANGE = (-2 ** 31, 2 ** 31 - 1)
+
+class FieldExpressionSerializer(serializers.Serializer):
+    """
+    One of `set`, `add` or `multiply`, turned into an expression on a field.
+    """
+    set = serializers.FloatField(required=False)
+    add = serializers.FloatField(required=False)
+    multiply = serializers.FloatField(required=False)
+
+    def validate(self, attrs: dict) -> dict:
+        if len(attrs) != 1:
+            raise serializers.ValidationError('Exactly one of set, add or multiply is required.')
+        (operation, operand), = attrs.items()
+        if not math.isfinite(operand):
+            raise serializers.ValidationError({operation: ['A finite number is required.']})
+        return attrs
+
+    def result(self, attrs: dict, value: float) -> float:
+        """The new value of a field holding `value`."""
+        (operation, operand), = attrs.items()
+        operand = float(operand)
+        if operation == 'set':
+            return operand
+        return value + operand if operation == 'add' else value * operand
+
+    def expression(self, field: str, attrs: dict, integer: bool = False) -> Any:
+        (operation, operand), = attrs.items()
+        if operation == 'set':
+            return Value(round(operand) if integer else operand)
+        if operation == 'add':
+            expression = F(field) + Value(operand)
+        else:
+            expression = F(field) * Value(operand)
+        if integer:
+            return Cast(Round(expression), IntegerField())
+        return Cast(expression, FloatField())
+
+class ProductExpressionUpdateSerializer(serializers.Serializer):
+    """
+    A filter and expressions on price and rank, applied to every matching
+    product with one UPDATE.
+    """
+    filter = ProductBulkFilterSerializer(required=False)
+    price = FieldExpressionSerializer(required=False)
+    rank = FieldExpressionSerializer(required=False)
+
+    def validate(self, attrs: dict) -> dict:
+        if 'price' not in attrs and 'rank' not in attrs:
+            raise serializers.ValidationError('At least one of price or rank is required.')
+        return attrs
+
+    def check_ranges(self, queryset: QuerySet[Product]) -> None:
+        """
+        Reject the expressions taking a product of `queryset` out of the range
+        of its column. An add or a multiply moves the values monotonically, so
+        only the current lowest and highest ones are checked, with one query.
+        """
+        expressions = {name: self.validated_data[name] for name in ('price', 'rank') if name in self.validated_data}
+        relative = [name for name, attrs in expressions.items() if 'set' not in attrs]
+        bounds = queryset.aggregate(
+            **{f'{name}_{bound.__name__.lower()}': bound(name) for name in relative for bound in (Min, Max)}
+        ) if relative else {}
+        for name, attrs in expressions.items():
+            low, high = INTEGER_RANGE if name == 'rank' else (-math.inf, math.inf)
+            values = [bounds[f'{name}_min'], bounds[f'{name}_max']] if name in relative else [0.0]
+            for value in values:
+                if value is None:
+                    continue
+                result = cast(FieldExpressionSerializer, self.fields[name]).result(attrs, value)
+                if not (math.isfinite(result) and low <= result <= high):
+                    raise serializers.ValidationError({name: ['The result is out of range.']})
+
+    def apply(self, queryset: QuerySet[Product]) -> int:
+        """Update the products of `queryset` and return how many were changed."""
+        if 'filter' in self.validated_data:
+            queryset = cast(ProductBulkFilterSerializer, self.fields['filter']).filter(
+                queryset, self.validated_data['filter'])
+        self.check_ranges(queryset)
+        values = {
+            name: cast(FieldExpressionSerializer, self.fields[name]).expression(
+                name, self.validated_data[name], integer=(name == 'rank'))
+            for name in ('price', 'rank') if name in self.validated_data
+        }
+        if 'price' in values:
+            # Computed from the price before the update, like the new price.
+            values['price_base'] = fx.base_price(values['price'])
+        with transaction.atomic():
+            categories = set()
+            if 'rank' in values:
+                categories = set(queryset.values_list('product_category_id', flat=True).distinct())
+            # update() bypasses auto_now.
+            updated = queryset.update(**values, updated_time=timezone.now())
+            if updated:
+                product_cache.invalidate_all_products()
+                leaderboards.refresh(categories)
+        return updated
+
+def parse_field_names(value: str | None) -> set[str]:
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin for sparse fieldsets.
 
-class ProductListSerializer(serializers.ModelSerializer):
+    When the request has a `fields` query parameter, only the listed fields
+    are rendered, and the nested relations among them are rendered as primary
+    keys unless they are also listed in `expand`. Since the queryset
+    optimizer reads the pruned fields, unrequested columns and joins are not
+    fetched either. Unknown names are rejected with a 400.
+    """
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def get_fields(self) -> dict:
+        fields: dict = super().get_fields()  # type: ignore[misc]
+        request = self.context.get('request')  # type: ignore[attr-defined]
+        if request is None:
+            return fields
+        selected = parse_field_names(request.query_params.get(self.fields_query_param))
+        if not selected:
+            return fields
+        expand = parse_field_names(request.query_params.get(self.expand_query_param))
+        unknown = (selected | expand) - fields.keys()
+        if unknown:
+            raise serializers.ValidationError({self.fields_query_param: [f"Unknown fields: {', '.join(sorted(unknown))}"]})
+        for name in list(fields):
+            field = fields[name]
+            if name not in selected and name not in expand:
+                del fields[name]
+            elif name not in expand and isinstance(field, serializers.BaseSerializer) \
+                    and not isinstance(field, serializers.ListSerializer):
+                fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, source=field.source)
+        return fields
+
+class ProductListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product_category = ProductCategoryCreateSerializer()
     class Meta:
         model = Product
@@ -25,53 +339,148 @@ class ProductListSerializer(serializers.ModelSerializer):
 
 class WishListSerializer(serializers.ModelSerializer):
     products = ProductListSerializer(many=True)
+    total = serializers.SerializerMethodField()
 
     class Meta:
         model = WishList
-        fields = ['products']
+        fields = ['products', 'total']
+
+    def get_total(self, instance: WishList) -> dict:
+        """
+        The sum of the product prices, in the currency of the `currency`
+        query parameter or in the base currency. The view annotates the
+        sum in the base currency; products priced in a currency without a
+        rate are left out and make the total incomplete.
+        """
+        request = self.context.get('request')
+        currency = (request.query_params.get('currency') if request else None) or fx.get_base_currency()
+        amount = getattr(instance, 'price_base_total', None) or 0.0
+        try:
+            amount = fx.from_base(amount, currency)
+        except fx.RateError as e:
+            raise serializers.ValidationError({'currency': str(e)})
+        return {
+            'amount': round(amount, 2),
+            'currency': currency,
+            'complete': not getattr(instance, 'unpriced_count', 0),
+        }
     def to_representation(self, instance: WishList | None) -> Any:
         if instance is None:
             return {}
+        if instance.pk is None:
+            # The unsaved wishlist of a user who never added a product.
+            return {'products': [], 'total': self.get_total(instance)}
         return super().to_representation(instance)
     
+class WishListBulkCreateSerializer(serializers.ListSerializer):
+    """
+    Adds a list of products to the wishlist of the requesting user with one
+    INSERT, after validating them against each other and against the
+    wishlist with one query each.
+    """
+    def to_internal_value(self, data: Any) -> list:
+        if isinstance(data, list):
+            ids = set()
+            for item in data:
+                try:
+                    ids.add(int(item['product_id']))
+                except (KeyError, TypeError, ValueError):
+                    continue
+            # Looked up here by the product_id of every item.
+            self.products = Product.objects.only('id', 'product_category_id').in_bulk(ids)
+        return self.check_categories(super().to_internal_value(data))
+
+    def check_categories(self, attrs: list) -> list:
+        categories = {item['product_id'].product_category_id for item in attrs}
+        taken = set(
+            WishListItem.objects.filter(wishlist__user=self.context['request'].user, category_id__in=categories)
+            .values_list('category_id', flat=True)
+        )
+        errors = []
+        for item in attrs:
+            category_id = item['product_id'].product_category_id
+            errors.append({'product_id': [wishlists.CATEGORY_TAKEN]} if category_id in taken else {})
+            taken.add(category_id)
+        if any(errors):
+            # One entry per item, like the errors of the items themselves.
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def create(self, validated_data: list[dict]) -> list[dict]:
+        products = [item['product_id'] for item in validated_data]
+        wishlist = wishlists.get_or_create_wishlist(self.context['request'].user)
+        try:
+            wishlists.add_products(wishlist, products)
+        except wishlists.CategoryConflict as e:
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [str(e)]})
+        return [{"product_id": product.id} for product in products]
+
 class WishListCreateSerializer(serializers.Serializer):
     product_id = serializers.IntegerField() 
+
+    class Meta:
+        list_serializer_class = WishListBulkCreateSerializer
     
     def validate_product_id(self, value: int) -> Product|None:
+        products = getattr(self.root, 'products', None)
+        if products is not None:
+            if value not in products:
+                raise serializers.ValidationError("Invalid product id")
+            prefetched: Product = products[value]
+            return prefetched
         try:
-            product = Product.objects.get(id=value)
+            product = Product.objects.only('id', 'product_category_id').get(id=value)
             return product
         except Product.DoesNotExist:
             raise serializers.ValidationError("Invalid product id")
-        
-    def validate(self, attrs: dict) -> dict:
-        user = self.context.get('request').user
-        try:
-            wishlist = user.wishlist
-        except WishList.DoesNotExist:
-            wishlist = None
-
-        product = attrs['product_id']
-        if wishlist and product.product_category in [p.product_category for p in wishlist.products.all()]:
-            raise serializers.ValidationError('You can add only one product from each category to your wishlist')
-        
-        return attrs
-    
+
     def create(self, validated_data: dict) -> dict:
-        user = self.context.get('request').user
-        try:
-            wishlist = user.wishlist
-            print("get")
-        except WishList.DoesNotExist:
-            wishlist = WishList.objects.create(user=user)
-            print("create")
-            wishlist.save()
-        
+        # The one product per category rule is the (wishlist, category)
+        # unique constraint, checked by the insert itself.
+        user = self.context['request'].user
+        wishlist = wishlists.get_or_create_wishlist(user)
         product = validated_data['product_id']
-        wishlist.products.add(product)  
-        wishlist.save()
-        #wishlist.refresh_from_db()
+        try:
+            wishlists.add_products(wishlist, [product])
+        except wishlists.CategoryConflict as e:
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [str(e)]})
         return {"product_id": product.id}
+
+class WishListSyncSerializer(serializers.Serializer):
+    """
+    The full set of products the wishlist of the requesting user should
+    hold; the difference with its current products is applied in one
+    transaction.
+    """
+    product_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=True)
+
+    def validate_product_ids(self, value: list[int]) -> list[Product]:
+        ids = set(value)
+        products = Product.objects.only('id', 'product_category_id').in_bulk(ids)
+        missing = sorted(ids - products.keys())
+        if missing:
+            raise serializers.ValidationError(f"Invalid product ids: {', '.join(map(str, missing))}")
+        categories = [product.product_category_id for product in products.values()]
+        if len(set(categories)) != len(categories):
+            raise serializers.ValidationError(wishlists.CATEGORY_TAKEN)
+        return list(products.values())
+
+    def save(self, **kwargs: Any) -> dict:
+        user = self.context['request'].user
+        products = self.validated_data['product_ids']
+        if products:
+            wishlist = wishlists.get_or_create_wishlist(user)
+        else:
+            # Emptying a wishlist that does not exist is a no-op, not a write.
+            found = WishList.objects.filter(user=user).first()
+            if found is None:
+                return {'added': [], 'removed': []}
+            wishlist = found
+        try:
+            added, removed = wishlists.sync_products(wishlist, products)
+        except wishlists.CategoryConflict as e:
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [str(e)]})
+        return {'added': added, 'removed': removed}
     
 class WishListUnauthorizedSerializer(serializers.ModelSerializer):
     products = ProductListSerializer(many=True)
@@ -83,4 +492,56 @@ class WishListUnauthorizedSerializer(serializers.ModelSerializer):
         if instance is None:
             return {}
         return super().to_representation(instance)
-    
\ No newline at end of file
+
+class ProductPopularitySerializer(serializers.ModelSerializer):
+    """
+    A product with the number of wishlists holding it and its trending
+    score, its wishlist adds decayed to the time of the request.
+    """
+    product = ProductListSerializer()
+    score = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProductPopularity
+        fields = ['product', 'wished', 'score']
+
+    def get_score(self, instance: ProductPopularity) -> float:
+        return round(popularity.decayed(instance.score), 4)
+
+class ExchangeRatesSerializer(serializers.Serializer):
+    """
+    Exchange rates as `{"base": "USD", "rates": {"EUR": 1.08}}`, each rate
+    being the value of one unit of the currency in the base currency.
+    """
+    base = serializers.CharField(required=False)
+    rates = serializers.DictField(child=serializers.FloatField())
+
+    def validate_base(self, value: str) -> str:
+        if value != fx.get_base_currency():
+            raise serializers.ValidationError(f'The base currency is {fx.get_base_currency()}')
+        return value
+
+    def validate_rates(self, value: dict) -> dict:
+        try:
+            return fx.clean_rates(value)
+        except fx.RateError as e:
+            raise serializers.ValidationError(str(e))
+
+    def save(self, **kwargs: Any) -> int:
+        """Store the rates and return the number of repriced products."""
+        return fx.set_rates(self.validated_data['rates'])
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    download = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = ['id', 'format', 'status', 'rows', 'rows_per_second', 'error', 'created_time', 'finished_time', 'download']
+        read_only_fields = ['status', 'rows', 'rows_per_second', 'error', 'created_time', 'finished_time']
+
+    def get_download(self, instance: ExportJob) -> str | None:
+        if instance.status != 'done':
+            return None
+        url = reverse('export_download', kwargs={'id': instance.id})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
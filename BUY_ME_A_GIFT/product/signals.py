@@ -0,0 +1,130 @@
+"""
+This module contains the signal receivers of the product app.
+
+They keep the product read cache in `product.cache` and the category
+leaderboards in `product.leaderboards` consistent with the database whenever
+a Product or ProductCategory is saved or deleted, or a wishlist gains or
+loses products. They also convert the price of a product being saved to
+the base currency of `product.fx`, and invalidate the cached public
+wishlists holding a changed product, moving its wishlist items to its
+category, through `product.wishlists`, and count the wishlist changes in
+the product popularity of `product.popularity`, whose buffer is flushed
+when due at the start of every request.
+"""
+
+from typing import Any
+
+from django.core.signals import request_started
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import cache as product_cache
+from . import fx
+from . import leaderboards
+from . import popularity
+from . import wishlists
+from .models import Product, ProductCategory, WishList
+
+
+@receiver(pre_save, sender=Product)
+def set_price_base(sender: type[Product], instance: Product, raw: bool = False, **kwargs: Any) -> None:
+    if not raw:
+        instance.price_base = fx.to_base(instance.price, instance.currency)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product(sender: type[Product], instance: Product, **kwargs: Any) -> None:
+    product_cache.invalidate_products([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def update_leaderboard(sender: type[Product], instance: Product, raw: bool = False, **kwargs: Any) -> None:
+    if not raw:
+        leaderboards.product_saved(instance)
+
+
+@receiver(post_save, sender=Product)
+def update_wishlists(sender: type[Product], instance: Product, created: bool = False, raw: bool = False,
+                     **kwargs: Any) -> None:
+    # A new product is in no wishlist yet.
+    if not created and not raw:
+        wishlists.products_changed([instance.pk])
+
+
+@receiver(pre_delete, sender=Product)
+def update_wishlists_on_delete(sender: type[Product], instance: Product, **kwargs: Any) -> None:
+    # The items are gone by post_delete, the deletion cascades without m2m_changed.
+    wishlists.products_deleted([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def update_leaderboard_on_delete(sender: type[Product], instance: Product, origin: Any = None,
+                                 **kwargs: Any) -> None:
+    leaderboards.product_deleted(instance, origin)
+
+
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+def invalidate_category(sender: type[ProductCategory], instance: ProductCategory, **kwargs: Any) -> None:
+    if kwargs.get('created'):
+        # A new category has no products yet, only the name suggestions change.
+        product_ids = []
+    else:
+        product_ids = list(Product.objects.filter(product_category_id=instance.pk).values_list('id', flat=True))
+    product_cache.invalidate_products(product_ids)
+
+
+@receiver(post_save, sender=ProductCategory)
+def update_category_wishlists(sender: type[ProductCategory], instance: ProductCategory, created: bool = False,
+                              raw: bool = False, **kwargs: Any) -> None:
+    if not created and not raw:
+        wishlists.categories_changed([instance.pk])
+
+
+@receiver(m2m_changed, sender=WishList.products.through)
+def invalidate_wishlist_products(sender: Any, instance: WishList | Product, action: str, reverse: bool,
+                                 pk_set: set | None, **kwargs: Any) -> None:
+    if isinstance(instance, WishList):
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            product_cache.invalidate_wishlists([instance.user_id])
+        return
+    if action in ('post_add', 'post_remove') and pk_set:
+        user_ids = WishList.objects.filter(pk__in=pk_set).values_list('user_id', flat=True)
+    elif action == 'pre_clear':
+        user_ids = instance.whishlist_products.values_list('user_id', flat=True)
+    else:
+        return
+    product_cache.invalidate_wishlists(list(user_ids))
+
+
+@receiver(m2m_changed, sender=WishList.products.through)
+def count_wishlist_products(sender: Any, instance: WishList | Product, action: str, reverse: bool,
+                            pk_set: set | None, **kwargs: Any) -> None:
+    delta = {'post_add': 1, 'post_remove': -1}.get(action)
+    if delta and pk_set:
+        changes = {instance.pk: delta * len(pk_set)} if reverse else dict.fromkeys(pk_set, delta)
+    elif action == 'pre_clear' and isinstance(instance, Product):
+        changes = {instance.pk: -instance.whishlist_products.count()}
+    elif action == 'pre_clear' and isinstance(instance, WishList):
+        changes = dict.fromkeys(instance.products.values_list('pk', flat=True), -1)
+    else:
+        return
+    popularity.record_on_commit(changes)
+
+
+@receiver(pre_delete, sender=WishList)
+def count_deleted_wishlist(sender: type[WishList], instance: WishList, **kwargs: Any) -> None:
+    # The items cascade without m2m_changed.
+    popularity.record_on_commit(dict.fromkeys(instance.products.values_list('pk', flat=True), -1))
+
+
+@receiver(post_delete, sender=WishList)
+def invalidate_wishlist(sender: type[WishList], instance: WishList, **kwargs: Any) -> None:
+    product_cache.invalidate_wishlists([instance.user_id])
+
+
+@receiver(request_started)
+def flush_popularity(sender: Any, **kwargs: Any) -> None:
+    # The buffered wishlist changes are flushed when due even if no other change comes.
+    popularity.flush_if_due()
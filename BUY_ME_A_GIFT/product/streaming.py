@@ -0,0 +1,83 @@
+"""
+This module contains the streaming JSON mode of list endpoints.
+
+Instead of materializing the whole queryset and every serialized item before
+rendering, the list is written out as a JSON array while rows are read from
+`QuerySet.iterator()`, so memory stays bounded and the first byte is sent
+before the query has finished. A stream is always JSON: its content is
+negotiated against the JSON renderer alone, so a client accepting only
+MessagePack gets 406 Not Acceptable.
+"""
+
+from typing import Any, Callable, Iterable, Iterator
+
+from django.db.models.query import QuerySet
+from django.http import HttpResponseBase, StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.request import Request
+
+from .pagination import KeysetPagination
+from .renderers import ORJSONRenderer
+
+
+def stream_json_array(represent: Callable[[Any], Any], instances: Iterable[Any],
+                      buffer_size: int = 65536) -> Iterator[bytes]:
+    """
+    Yield `instances`, each converted by `represent`, as a JSON array in
+    chunks of about `buffer_size` bytes.
+    """
+    renderer = ORJSONRenderer()
+    # Sent before the first row is fetched.
+    yield b'['
+    buffer = bytearray()
+    separator = b''
+    for instance in instances:
+        buffer += separator
+        buffer += renderer.render(represent(instance))
+        separator = b','
+        if len(buffer) >= buffer_size:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b']'
+    yield bytes(buffer)
+
+
+class StreamingListMixin:
+    """
+    List view mixin streaming the unpaginated list when the client sends
+    `?stream=true`.
+    """
+    stream_query_param = 'stream'
+    stream_chunk_size = 1000
+
+    def is_streaming(self, request: Request) -> bool:
+        return request.query_params.get(self.stream_query_param) in ('1', 'true')
+
+    def get_renderers(self) -> list[BaseRenderer]:
+        # The negotiated media type, and so the ETag, is then that of the stream.
+        if self.is_streaming(self.request):  # type: ignore[attr-defined]
+            return [ORJSONRenderer()]
+        renderers: list[BaseRenderer] = super().get_renderers()  # type: ignore[misc]
+        return renderers
+
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        if self.is_streaming(request):
+            return self.stream(request)
+        response: HttpResponseBase = super().get(request, *args, **kwargs)  # type: ignore[misc]
+        return response
+
+    def stream(self, request: Request) -> StreamingHttpResponse:
+        queryset: QuerySet = self.filter_queryset(self.get_queryset())  # type: ignore[attr-defined]
+        paginator = self.paginator  # type: ignore[attr-defined]
+        if isinstance(paginator, KeysetPagination):
+            # In the order of the pages, `?ordering=` included.
+            queryset = paginator.order_queryset(queryset, request)
+        elif not queryset.ordered:
+            queryset = queryset.order_by('pk')
+        represent, instances = self.get_stream_items(queryset)
+        return StreamingHttpResponse(stream_json_array(represent, instances), content_type='application/json')
+
+    def get_stream_items(self, queryset: QuerySet) -> tuple[Callable[[Any], Any], Iterable[Any]]:
+        """Return the function representing each streamed item and the items."""
+        serializer = self.get_serializer()  # type: ignore[attr-defined]
+        return serializer.to_representation, queryset.iterator(chunk_size=self.stream_chunk_size)
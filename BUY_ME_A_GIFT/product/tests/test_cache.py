@@ -0,0 +1,233 @@
+"""
+This module contains test cases for the product read cache and conditional GET.
+
+It checks that:
+ - product details and product lists are served from the cache
+ - list keys do not depend on the order of the query parameters
+ - saving or deleting a product or a category invalidates the cache
+ - public wishlists are cached per user and sort option, and only dropped
+   when their products or the categories of these change
+ - hits and misses are counted
+ - read endpoints answer 304 when the If-None-Match ETag still matches
+"""
+
+from typing import Any
+from django.core.cache import cache
+from django.test import TestCase, RequestFactory
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from product import cache as product_cache
+from product.models import Product, ProductCategory, WishList
+from product import wishlists
+from product.serializers import ProductExpressionUpdateSerializer
+from product.views import ProductListView, ProductView, WishListUnauthorizedView
+from user.models import User
+
+
+class ProductCacheTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.product_category = ProductCategory.objects.create(name="test", owner=self.user)
+        self.product = Product.objects.create(
+            name='Product',
+            price=50.00,
+            currency='EUR',
+            rank=9,
+            owner=self.user,
+            product_category=self.product_category,
+        )
+
+    def get_product(self) -> Response:
+        request = self.factory.get(reverse('product', kwargs={'id': self.product.id}))
+        return ProductView.as_view()(request, id=self.product.id)
+
+    def get_products(self, query: str = '') -> Response:
+        return ProductListView.as_view()(self.factory.get(reverse('products') + query))
+
+    def test_product_detail_is_cached(self) -> None:
+        self.assertEqual(self.get_product()['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.get_product()
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['name'], 'Product')
+
+    def test_product_list_key_ignores_parameter_order(self) -> None:
+        self.assertEqual(self.get_products('?price_gt=10&price_lt=100')['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.get_products('?price_lt=100&price_gt=10')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_product_save_invalidates_detail_and_list(self) -> None:
+        self.get_product()
+        self.get_products()
+        self.product.name = 'Renamed'
+        self.product.save()
+
+        self.assertEqual(self.get_product().data['name'], 'Renamed')
+        self.assertEqual(self.get_products().data['results'][0]['name'], 'Renamed')
+
+    def test_product_delete_invalidates_list(self) -> None:
+        self.get_products()
+        self.product.delete()
+        self.assertEqual(self.get_products().data['results'], [])
+
+    def test_category_save_invalidates_products(self) -> None:
+        self.get_product()
+        self.get_products()
+        self.product_category.name = 'renamed'
+        self.product_category.save()
+
+        self.assertEqual(self.get_product().data['product_category']['name'], 'renamed')
+        self.assertEqual(self.get_products().data['results'][0]['product_category']['name'], 'renamed')
+
+    def test_hit_and_miss_counters(self) -> None:
+        self.get_product()
+        self.get_product()
+        self.get_products()
+        stats = product_cache.get_stats()
+        self.assertEqual(stats['detail'], {'hits': 1, 'misses': 1, 'ratio': 0.5})
+        self.assertEqual(stats['list'], {'hits': 0, 'misses': 1, 'ratio': 0.0})
+
+
+class PublicWishListCacheTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.categories = [ProductCategory.objects.create(name=f"test{i}", owner=self.user) for i in range(3)]
+        self.listed, self.other, self.unlisted = [
+            Product.objects.create(name=f'Product{i}', price=50.00, rank=i, owner=self.user,
+                                   product_category=category)
+            for i, category in enumerate(self.categories)
+        ]
+        self.wishlist = WishList.objects.create(user=self.user)
+        wishlists.add_products(self.wishlist, [self.listed, self.other])
+
+    def get(self, query: str = '') -> Response:
+        url = reverse('wish_list_unauthorized', kwargs={'uuid': self.user.id}) + query
+        return WishListUnauthorizedView.as_view()(self.factory.get(url), uuid=self.user.id)
+
+    def names(self, query: str = '') -> list[str]:
+        return [product['name'] for product in self.get(query).data['results']]
+
+    def test_cached_per_sort_option(self) -> None:
+        self.assertEqual(self.get()['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get()['X-Cache'], 'HIT')
+        self.assertEqual(self.get('?rank=asc')['X-Cache'], 'MISS')
+        self.assertEqual(self.names('?rank=asc'), ['Product1', 'Product0'])
+        self.assertEqual(self.names('?rank=desc'), ['Product0', 'Product1'])
+
+    def test_unlisted_product_changes_keep_the_cache(self) -> None:
+        self.get()
+        self.unlisted.name = 'Renamed'
+        self.unlisted.save()
+        self.categories[2].name = 'renamed'
+        self.categories[2].save()
+        self.unlisted.delete()
+        self.assertEqual(self.get()['X-Cache'], 'HIT')
+
+    def test_listed_product_changes_invalidate(self) -> None:
+        self.get()
+        self.listed.name = 'Renamed'
+        self.listed.save()
+        self.assertIn('Renamed', self.names())
+
+        self.categories[1].name = 'renamed'
+        self.categories[1].save()
+        categories = {product['id']: product['product_category']['name'] for product in self.get().data['results']}
+        self.assertEqual(categories[self.other.id], 'renamed')
+
+        self.other.delete()
+        self.assertEqual(self.names(), ['Renamed'])
+
+    def test_wishlist_and_set_based_changes_invalidate(self) -> None:
+        self.get()
+        wishlists.add_products(self.wishlist, [self.unlisted])
+        self.assertEqual(len(self.get().data['results']), 3)
+
+        serializer = ProductExpressionUpdateSerializer(data={'price': {'set': 1}})
+        serializer.is_valid(raise_exception=True)
+        serializer.apply(Product.objects.all())
+        self.assertEqual({product['price'] for product in self.get().data['results']}, {1})
+
+    def test_invalid_uuid(self) -> None:
+        url = reverse('wish_list_unauthorized', kwargs={'uuid': 'aead'})
+        with self.assertNumQueries(0):
+            response = WishListUnauthorizedView.as_view()(self.factory.get(url), uuid='aead')
+        self.assertEqual(response.data['results'], [])
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.product_category = ProductCategory.objects.create(name="test", owner=self.user)
+        self.product = Product.objects.create(
+            name='Product',
+            price=50.00,
+            currency='EUR',
+            rank=9,
+            owner=self.user,
+            product_category=self.product_category,
+        )
+        self.product2 = Product.objects.create(
+            name='Product2',
+            price=60.00,
+            currency='EUR',
+            rank=3,
+            owner=self.user,
+            product_category=ProductCategory.objects.create(name="test2", owner=self.user),
+        )
+        self.wishlist = WishList.objects.create(user=self.user)
+        wishlists.add_products(self.wishlist, [self.product])
+
+    def get(self, view: Any, url: str, etag: str | None = None, **kwargs: Any) -> Response:
+        headers: dict[str, Any] = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        response: Response = view(self.factory.get(url, **headers), **kwargs)
+        return response
+
+    def test_product_detail_not_modified(self) -> None:
+        url = reverse('product', kwargs={'id': self.product.id})
+        etag = self.get(ProductView.as_view(), url, id=self.product.id)['ETag']
+        response = self.get(ProductView.as_view(), url, etag, id=self.product.id)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response['Vary'], 'Accept')
+
+        self.product_category.name = 'renamed'
+        self.product_category.save()
+        response = self.get(ProductView.as_view(), url, etag, id=self.product.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_product_list_not_modified_without_queries(self) -> None:
+        url = reverse('products') + '?ordering=price'
+        etag = self.get(ProductListView.as_view(), url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.get(ProductListView.as_view(), url, etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.product.delete()
+        response = self.get(ProductListView.as_view(), url, etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_wishlist_not_modified_until_products_change(self) -> None:
+        url = reverse('wish_list_unauthorized', kwargs={'uuid': self.user.id})
+        view = WishListUnauthorizedView.as_view()
+        etag = self.get(view, url, uuid=self.user.id)['ETag']
+        self.assertEqual(self.get(view, url, etag, uuid=self.user.id).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        wishlists.add_products(self.wishlist, [self.product2])
+
+        response = self.get(view, url, etag, uuid=self.user.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+
+        etag = response['ETag']
+        self.product2.whishlist_products.clear()
+        self.assertEqual(self.get(view, url, etag, uuid=self.user.id).status_code, status.HTTP_200_OK)
@@ -0,0 +1,72 @@
+"""
+This module contains test cases for the management commands of the product app:
+ - import_products
+"""
+
+import csv
+import gzip
+import io
+import json
+import tempfile
+from pathlib import Path
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from product.models import Product, ProductCategory
+from user.models import User
+
+
+class ImportProductsCommandTest(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.product_category = ProductCategory.objects.create(name="kitchen", owner=self.user)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def import_products(self, *files: Path, **options: object) -> str:
+        out = io.StringIO()
+        call_command('import_products', *files, owner=self.user.email, stdout=out, stderr=io.StringIO(), **options)
+        return out.getvalue()
+
+    def test_import_csv(self) -> None:
+        path = self.path / 'products.csv'
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['name', 'price', 'currency', 'rank', 'category'])
+            writer.writerow(['Teapot', '20.5', 'EUR', '3', 'kitchen'])
+            writer.writerow(['Shovel', '15', '', '1', 'garden'])
+            writer.writerow(['Rake', 'cheap', 'USD', '1', 'garden'])
+            writer.writerow(['Hose', '30', 'USD', '2', 'garden'])
+
+        output = self.import_products(path, batch_size=2, errors=self.path / 'errors.csv')
+
+        self.assertIn('Imported 3 products, rejected 1 rows', output)
+        teapot = Product.objects.get(name='Teapot')
+        self.assertEqual(teapot.product_category, self.product_category)
+        self.assertEqual((teapot.price, teapot.currency, teapot.rank, teapot.owner), (20.5, 'EUR', 3, self.user))
+        self.assertIsNone(Product.objects.get(name='Shovel').currency)
+        garden = ProductCategory.objects.get(name='garden', owner=self.user)
+        self.assertEqual(garden.product_category.count(), 2)
+        with open(self.path / 'errors.csv') as f:
+            rejected = list(csv.DictReader(f))
+        self.assertEqual([row['line'] for row in rejected], ['4'])
+
+    def test_import_gzipped_ndjson(self) -> None:
+        path = self.path / 'products.ndjson.gz'
+        with gzip.open(path, 'wt') as f:
+            f.write(json.dumps({'name': 'Mug', 'price': 5, 'currency': 'USD', 'rank': 1,
+                                'product_category__name': 'kitchen'}) + '\n')
+            f.write('not json\n')
+            f.write(json.dumps({'name': 'Cup', 'price': 4, 'currency': 'GBP', 'rank': 1, 'category': 'kitchen'}) + '\n')
+
+        output = self.import_products(path)
+
+        self.assertIn('Imported 1 products, rejected 2 rows', output)
+        self.assertEqual(Product.objects.get().product_category, self.product_category)
+
+    def test_import_with_unknown_owner(self) -> None:
+        with self.assertRaises(CommandError):
+            call_command('import_products', self.path / 'products.csv', owner='nobody@example.com')
@@ -0,0 +1,125 @@
+"""
+This module contains test cases for the response compression middleware.
+
+It checks that:
+ - the encoding follows the client preferences in Accept-Encoding
+ - small and already compressed bodies are left alone
+ - streamed bodies are compressed chunk by chunk
+ - views can override the compression levels
+ - a 304 carries the ETag and Vary of the compressed response
+"""
+
+import gzip
+import zlib
+from typing import Iterator
+
+import brotli
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import reverse
+from product.compression import CompressionMiddleware, Compressor, choose_encoding, compress_sequence
+from product.models import Product, ProductCategory
+from product.views import ProductListView, ProductSuggestView
+from user.models import User
+
+
+class ChooseEncodingTest(TestCase):
+    def test_client_preferences(self) -> None:
+        self.assertEqual(choose_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(choose_encoding('gzip;q=1.0, br;q=0.5'), 'gzip')
+        self.assertEqual(choose_encoding('br;q=0, gzip'), 'gzip')
+        self.assertEqual(choose_encoding('*'), 'br')
+        self.assertIsNone(choose_encoding('identity'))
+        self.assertIsNone(choose_encoding(''))
+
+
+class CompressSequenceTest(TestCase):
+    def test_chunks_are_flushed_as_they_come(self) -> None:
+        pulled = []
+
+        def chunks() -> Iterator[bytes]:
+            for i in range(3):
+                pulled.append(i)
+                yield b'{"name": "product %d"}' % i * 100
+
+        for encoding in ('gzip', 'br'):
+            with self.subTest(encoding=encoding):
+                pulled.clear()
+                stream = compress_sequence(Compressor(encoding, 5), chunks())
+                first = next(stream)
+                # Only the first chunk was read, and it decodes on its own.
+                self.assertEqual(pulled, [0])
+                if encoding == 'gzip':
+                    decoder = zlib.decompressobj(31)
+                    self.assertEqual(decoder.decompress(first), b'{"name": "product 0"}' * 100)
+                    self.assertEqual(decoder.decompress(b''.join(stream)), b''.join(
+                        b'{"name": "product %d"}' % i * 100 for i in (1, 2)))
+                else:
+                    self.assertEqual(brotli.decompress(first + b''.join(stream)), b''.join(
+                        b'{"name": "product %d"}' % i * 100 for i in range(3)))
+
+
+@override_settings(COMPRESSION_MIN_LENGTH=200)
+class CompressionMiddlewareTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        user = User.objects.create(email="test@example.com", password="123456")
+        category = ProductCategory.objects.create(name="category", owner=user)
+        for i in range(20):
+            Product.objects.create(name=f'Product {i}', price=i, rank=i, owner=user, product_category=category)
+
+    def test_gzip(self) -> None:
+        plain = self.client.get(reverse('products'))
+        response = self.client.get(reverse('products'), HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    def test_brotli(self) -> None:
+        plain = self.client.get(reverse('products'))
+        response = self.client.get(reverse('products'), HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+
+    def test_small_body_is_not_compressed(self) -> None:
+        response = self.client.get(reverse('product_suggest'), HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.json(), {'products': [], 'categories': []})
+
+    def test_streamed_body(self) -> None:
+        plain = self.client.get(reverse('products') + '?stream=true')
+        response = self.client.get(reverse('products') + '?stream=true', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        self.assertEqual(gzip.decompress(b''.join(response)), b''.join(plain))
+
+    def test_not_modified_matches_the_compressed_response(self) -> None:
+        compressed = self.client.get(reverse('products'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+
+        response = self.client.get(
+            reverse('products'), HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=compressed['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], compressed['ETag'])
+        self.assertEqual(response['Vary'], compressed['Vary'])
+
+    def test_view_compression_levels(self) -> None:
+        middleware = CompressionMiddleware(lambda request: HttpResponse())
+        request = RequestFactory().get('/')
+        middleware.process_view(request, ProductSuggestView.as_view(), (), {})
+        self.assertEqual(middleware.get_level(request, 'br'), 1)
+
+        middleware.process_view(request, ProductListView.as_view(), (), {})
+        self.assertEqual(middleware.get_level(request, 'br'), 5)
+
+        with override_settings(COMPRESSION_LEVELS={'gzip': 9}):
+            middleware.process_view(request, lambda request: None, (), {})
+            self.assertEqual(middleware.get_level(request, 'gzip'), 9)
+            self.assertEqual(middleware.get_level(request, 'br'), 4)
@@ -0,0 +1,117 @@
+"""
+This module contains the golden output tests of the fast serializer path.
+
+Every endpoint using the fast path is rendered with and without it, and the
+responses must be byte for byte identical, including:
+ - nested relations and sparse fieldsets
+ - datetimes with microseconds, in a non UTC current timezone
+ - keyset pages and streamed lists
+"""
+
+from datetime import datetime, timezone as dt_timezone
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from django.core.cache import cache
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from product.fastserializers import compile_plan, render_rows
+from product.models import Product, ProductCategory, WishList
+from product import wishlists
+from product.serializers import ExportJobSerializer, ProductListSerializer, WishListSerializer
+from product.views import ProductListView, ProductView, WishListUnauthorizedView
+from user.models import User
+
+
+class CompilePlanTest(TestCase):
+    def test_product_list_serializer_plan(self) -> None:
+        plan = compile_plan(ProductListSerializer())
+        assert plan is not None
+        self.assertEqual(
+            plan.paths, ['id', 'name', 'price', 'created_time', 'product_category__id', 'product_category__name'])
+
+    def test_unsupported_serializers(self) -> None:
+        self.assertIsNone(compile_plan(WishListSerializer()))
+        self.assertIsNone(compile_plan(ExportJobSerializer()))
+
+    def test_rows_match_serializer(self) -> None:
+        user = User.objects.create(email="test@example.com", password="123456")
+        category = ProductCategory.objects.create(name="category", owner=user)
+        Product.objects.create(name='Product', price=1.25, rank=1, owner=user, product_category=category)
+
+        plan = compile_plan(ProductListSerializer())
+        assert plan is not None
+        self.assertEqual(
+            render_rows(plan, Product.objects.values(*plan.paths)),
+            ProductListSerializer(Product.objects.all(), many=True).data,
+        )
+
+
+class GoldenOutputTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.wishlist = WishList.objects.create(user=self.user)
+        for i in range(7):
+            category = ProductCategory.objects.create(name=f"category {i % 3} é", owner=self.user)
+            product = Product.objects.create(
+                name=f'Product "{i}"', price=i * 10.5 + 0.1, currency='EUR', rank=i % 4,
+                owner=self.user, product_category=category)
+            if i % 2:
+                wishlists.add_products(self.wishlist, [product])
+
+        # Microseconds, and a timestamp on a DST boundary of the test timezone.
+        Product.objects.filter(rank=0).update(created_time=datetime(2023, 3, 26, 1, 30, 0, 123456, dt_timezone.utc))
+
+    def render_both(self, view: Any, url: str, **kwargs: Any) -> bytes:
+        contents = []
+        for fast in (False, True):
+            cache.clear()
+            with override_settings(PRODUCT_FAST_SERIALIZER=fast):
+                response = view.as_view()(self.factory.get(url), **kwargs)
+                if hasattr(response, 'render'):
+                    response.render()
+                content = b''.join(response) if response.streaming else response.content
+            self.assertEqual(response.status_code, status.HTTP_200_OK, content)
+            contents.append(content)
+        self.assertEqual(contents[0], contents[1])
+        return contents[1]
+
+    def test_product_list(self) -> None:
+        for query in ('', '?ordering=price&page_size=3', '?ordering=-rank&page_size=2', '?fields=id,product_category',
+                      '?fields=name,created_time&expand=product_category', '?price_gt=20&facets=1', '?stream=true'):
+            with self.subTest(query=query):
+                self.render_both(ProductListView, reverse('products') + query)
+
+    def test_product_list_next_page(self) -> None:
+        url = reverse('products') + '?ordering=rank&page_size=3&fields=name'
+        with override_settings(PRODUCT_FAST_SERIALIZER=True):
+            next_url = ProductListView.as_view()(self.factory.get(url)).data['next']
+        self.render_both(ProductListView, next_url)
+
+    def test_product_detail(self) -> None:
+        product = Product.objects.filter(rank=0).first()
+        assert product is not None
+        for query in ('', '?fields=id,price,product_category'):
+            with self.subTest(query=query):
+                url = reverse('product', kwargs={'id': product.id}) + query
+                self.render_both(ProductView, url, id=product.id)
+
+    def test_wishlist(self) -> None:
+        url = reverse('wish_list_unauthorized', kwargs={'uuid': self.user.id})
+        for query in ('', '?rank=asc', '?fields=id,name', '?stream=1'):
+            with self.subTest(query=query):
+                self.render_both(WishListUnauthorizedView, url + query, uuid=self.user.id)
+
+    def test_non_utc_timezone(self) -> None:
+        with timezone.override(ZoneInfo('Europe/Rome')):
+            content = self.render_both(ProductListView, reverse('products'))
+        self.assertIn(b'2023-03-26T03:30:00.123456+02:00', content)
+
+    def test_missing_product(self) -> None:
+        with override_settings(PRODUCT_FAST_SERIALIZER=True):
+            response = ProductView.as_view()(self.factory.get(reverse('product', kwargs={'id': 0})), id=0)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
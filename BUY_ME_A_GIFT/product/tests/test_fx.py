@@ -0,0 +1,211 @@
+"""
+This module contains test cases for the exchange rates and the prices in
+the base currency.
+
+It checks that:
+ - saves and bulk writes keep `price_base` in the base currency
+ - rate updates reprice the products of the changed currencies, in batches
+ - the product list filters and sorts across currencies
+ - the wishlist total is summed in the requested currency
+ - the rates endpoint is read-only for non admins
+ - the load_fx_rates command loads a rates file
+"""
+
+import io
+import json
+import tempfile
+from typing import Any
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import force_authenticate
+from product import fx
+from product.models import ExchangeRate, Product, ProductCategory, WishList
+from product import wishlists
+from product.serializers import ProductExpressionUpdateSerializer
+from product.views import ExchangeRateView, ProductListView, WishListView
+from user.models import User
+
+
+class FXTestCase(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.category = ProductCategory.objects.create(name="category", owner=self.user)
+        fx.set_rates({'EUR': 2.0})
+
+    def create(self, price: float, currency: str | None, **kwargs: Any) -> Product:
+        return Product.objects.create(
+            name=f'{price} {currency}', price=price, currency=currency, rank=1, owner=self.user,
+            product_category=self.category, **kwargs)
+
+
+class PriceBaseTest(FXTestCase):
+    def test_save(self) -> None:
+        self.assertEqual(self.create(10, 'EUR').price_base, 20)
+        self.assertEqual(self.create(10, 'USD').price_base, 10)
+        self.assertEqual(self.create(10, None).price_base, 10)
+
+        product = Product.objects.get(currency='EUR')
+        product.currency = 'USD'
+        product.save()
+        product.refresh_from_db()
+        self.assertEqual(product.price_base, 10)
+
+    def test_unknown_rate(self) -> None:
+        ExchangeRate.objects.all().delete()
+        cache.clear()
+        self.assertIsNone(self.create(10, 'EUR').price_base)
+
+    def test_bulk_writes(self) -> None:
+        eur, usd = self.create(10, 'EUR'), self.create(10, 'USD')
+        serializer = ProductExpressionUpdateSerializer(data={'price': {'add': 5}})
+        serializer.is_valid(raise_exception=True)
+        serializer.apply(Product.objects.all())
+
+        self.assertEqual(dict(Product.objects.values_list('id', 'price_base')), {eur.id: 30, usd.id: 15})
+
+    def test_rate_update_reprices_in_batches(self) -> None:
+        products = [self.create(i, 'EUR') for i in range(1, 6)]
+        usd = self.create(10, 'USD')
+
+        with mock.patch.object(fx, 'BATCH_SIZE', 2):
+            updated = fx.set_rates({'EUR': 3.0, 'USD': 1})
+
+        self.assertEqual(updated, 5)
+        self.assertEqual(
+            list(Product.objects.filter(currency='EUR').order_by('id').values_list('price_base', flat=True)),
+            [p.price * 3 for p in products])
+        usd.refresh_from_db()
+        self.assertEqual(usd.price_base, 10)
+        # Nothing changed, nothing is repriced.
+        self.assertEqual(fx.set_rates({'EUR': 3.0}), 0)
+
+    def test_cached_rates_expire(self) -> None:
+        cache.clear()
+        with override_settings(FX_RATES_CACHE_TIMEOUT=30), mock.patch.object(fx.cache, 'set') as cache_set:
+            fx.get_rates()
+        cache_set.assert_called_once_with(fx.RATES_KEY, {'EUR': 2.0, 'USD': 1.0}, 30)
+
+    def test_invalid_rates(self) -> None:
+        for rates in ({'GBP': 1.0}, {'EUR': 0}, {'EUR': 'x'}, {'USD': 2.0}):
+            with self.subTest(rates=rates), self.assertRaises(fx.RateError):
+                fx.set_rates(rates)
+
+
+class CurrencyAwareListTest(FXTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.eur = self.create(10, 'EUR')
+        self.usd = self.create(15, 'USD')
+        self.cheap = self.create(5, 'USD')
+
+    def get(self, query: str) -> Any:
+        response = ProductListView.as_view()(self.factory.get(reverse('products') + query))
+        response.render()
+        return response
+
+    def ids(self, query: str) -> list[int]:
+        return [product['id'] for product in json.loads(self.get(query).content)['results']]
+
+    def test_range_filter_in_another_currency(self) -> None:
+        # 10 EUR is 20 USD, 15 USD is 7.5 EUR.
+        self.assertEqual(set(self.ids('?price_currency=EUR&price_gt=5')), {self.eur.id, self.usd.id})
+        self.assertEqual(self.ids('?price_currency=USD&price_gt=16'), [self.eur.id])
+        self.assertEqual(self.ids('?price_currency=USD&price_lt=16&price_gt=6'), [self.usd.id])
+        # Without a currency the raw prices are compared.
+        self.assertEqual(set(self.ids('?price_gt=9')), {self.eur.id, self.usd.id})
+
+    def test_invalid_filters(self) -> None:
+        self.assertEqual(self.get('?price_currency=GBP&price_gt=1').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get('?price_currency=EUR&price_gt=x').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sort_by_base_price(self) -> None:
+        self.assertEqual(self.ids('?ordering=-price_base'), [self.eur.id, self.usd.id, self.cheap.id])
+        # The next page starts after the cursor.
+        first = json.loads(self.get('?ordering=price_base&page_size=2').content)
+        self.assertEqual([p['id'] for p in first['results']], [self.cheap.id, self.usd.id])
+        response = ProductListView.as_view()(self.factory.get(first['next']))
+        response.render()
+        self.assertEqual([p['id'] for p in json.loads(response.content)['results']], [self.eur.id])
+
+    def test_rate_update_invalidates_cached_lists(self) -> None:
+        self.assertEqual(self.ids('?price_currency=USD&price_gt=16'), [self.eur.id])
+        fx.set_rates({'EUR': 1.0})
+        self.assertEqual(self.ids('?price_currency=USD&price_gt=16'), [])
+
+
+class WishListTotalTest(FXTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        wishlist = WishList.objects.create(user=self.user)
+        usd = self.create(5, 'USD')
+        usd.product_category = ProductCategory.objects.create(name="category2", owner=self.user)
+        usd.save()
+        wishlists.add_products(wishlist, [self.create(10, 'EUR'), usd])
+
+    def get(self, query: str = '') -> Any:
+        request = self.factory.get(reverse('wishlist') + query)
+        force_authenticate(request, self.user)
+        return WishListView.as_view()(request)
+
+    def test_total(self) -> None:
+        self.assertEqual(self.get().data['total'], {'amount': 25.0, 'currency': 'USD', 'complete': True})
+        self.assertEqual(self.get('?currency=EUR').data['total'], {'amount': 12.5, 'currency': 'EUR', 'complete': True})
+
+    def test_total_is_summed_in_sql(self) -> None:
+        # The wishlist with its total, then its products.
+        with self.assertNumQueries(2):
+            self.get()
+
+    def test_unknown_currency(self) -> None:
+        self.assertEqual(self.get('?currency=GBP').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExchangeRateViewTest(FXTestCase):
+    def put(self, data: Any, user: User) -> Any:
+        request = self.factory.put(reverse('fx_rates'), data=json.dumps(data), content_type='application/json')
+        force_authenticate(request, user)
+        return ExchangeRateView.as_view()(request)
+
+    def test_get(self) -> None:
+        response = ExchangeRateView.as_view()(self.factory.get(reverse('fx_rates')))
+        self.assertEqual(response.data, {'base': 'USD', 'rates': {'EUR': 2.0}})
+
+    def test_put_requires_admin(self) -> None:
+        self.assertEqual(self.put({'rates': {'EUR': 1.5}}, self.user).status_code, status.HTTP_403_FORBIDDEN)
+
+        admin = User.objects.create_superuser(email="admin@example.com", password="123456")
+        self.create(10, 'EUR')
+        response = self.put({'base': 'USD', 'rates': {'EUR': 1.5}}, admin)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'base': 'USD', 'rates': {'EUR': 1.5}, 'updated': 1})
+        self.assertEqual(Product.objects.get().price_base, 15)
+
+        self.assertEqual(self.put({'base': 'EUR', 'rates': {}}, admin).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class LoadFXRatesCommandTest(FXTestCase):
+    def test_load(self) -> None:
+        product = self.create(10, 'EUR')
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as rates:
+            json.dump({'base': 'USD', 'rates': {'EUR': 1.25}}, rates)
+            rates.flush()
+            out = io.StringIO()
+            call_command('load_fx_rates', rates.name, stdout=out)
+
+        self.assertIn('repriced 1 products', out.getvalue())
+        product.refresh_from_db()
+        self.assertEqual(product.price_base, 12.5)
+
+    def test_invalid_file(self) -> None:
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as rates:
+            json.dump({'rates': {'GBP': 1}}, rates)
+            rates.flush()
+            with self.assertRaises(CommandError):
+                call_command('load_fx_rates', rates.name, stdout=io.StringIO())
@@ -0,0 +1,146 @@
+"""
+This module contains test cases for the per-category leaderboards.
+
+It checks that:
+ - saves, rank changes, category moves and deletes keep the leaderboards
+   equal to the top ranked products of each category
+ - a cascade refreshes the leaderboards once, not once per product
+ - bulk writes, which send no signals, refresh them as well
+ - the leaderboard endpoint lists the products best first
+ - the rebuild_leaderboards command recomputes them
+"""
+
+import io
+from typing import Any
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from product import leaderboards
+from product.models import CategoryLeaderboardEntry, Product, ProductCategory
+from product.serializers import ProductBulkDeleteSerializer, ProductExpressionUpdateSerializer
+from user.models import User
+
+
+@override_settings(LEADERBOARD_SIZE=3)
+class LeaderboardTestCase(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.category = ProductCategory.objects.create(name="category", owner=self.user)
+        self.category2 = ProductCategory.objects.create(name="category2", owner=self.user)
+        self.products = [
+            Product.objects.create(name=f'Product {i}', price=10, rank=i, owner=self.user, product_category=self.category)
+            for i in range(5)
+        ]
+
+    def board(self, category: ProductCategory) -> list[Any]:
+        return list(
+            CategoryLeaderboardEntry.objects.filter(category=category).order_by('position').values_list('product_id', flat=True))
+
+    def expected(self, category: ProductCategory) -> list[Any]:
+        return list(
+            Product.objects.filter(product_category=category).order_by('-rank', 'id').values_list('id', flat=True)[:3])
+
+
+class LeaderboardMaintenanceTest(LeaderboardTestCase):
+    def test_products_are_ranked_on_create(self) -> None:
+        self.assertEqual(self.board(self.category), [p.id for p in self.products[4:1:-1]])
+
+    def test_rank_change(self) -> None:
+        product = self.products[0]
+        product.rank = 10
+        product.save()
+        self.assertEqual(self.board(self.category), [product.id, self.products[4].id, self.products[3].id])
+
+        product.rank = -1
+        product.save()
+        self.assertEqual(self.board(self.category), self.expected(self.category))
+
+    def test_save_without_rank_change_skips_the_refresh(self) -> None:
+        product = self.products[4]
+        product.name = 'renamed'
+        with self.assertNumQueries(3):
+            # The update, the leaderboard lookup and the wishlist items check.
+            product.save()
+
+    def test_category_move(self) -> None:
+        product = self.products[4]
+        product.product_category = self.category2
+        product.save()
+
+        self.assertEqual(self.board(self.category), self.expected(self.category))
+        self.assertEqual(self.board(self.category2), [product.id])
+
+    def test_delete(self) -> None:
+        self.products[4].delete()
+        self.assertEqual(self.board(self.category), [p.id for p in self.products[3:0:-1]])
+
+    def test_category_delete_refreshes_once(self) -> None:
+        other = Product.objects.create(name='Other', price=10, rank=1, owner=self.user, product_category=self.category2)
+        category_id = self.category.id
+        with mock.patch.object(leaderboards, 'refresh', wraps=leaderboards.refresh) as refresh, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.category.delete()
+        refresh.assert_called_once_with({category_id})
+        self.assertFalse(CategoryLeaderboardEntry.objects.filter(category_id=category_id).exists())
+        self.assertEqual(self.board(self.category2), [other.id])
+
+    def test_owner_delete_refreshes_the_other_categories(self) -> None:
+        owner = User.objects.create(email="owner@example.com", password="123456")
+        top = Product.objects.create(name='Top', price=10, rank=100, owner=owner, product_category=self.category)
+        self.assertEqual(self.board(self.category)[0], top.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            owner.delete()
+        self.assertEqual(self.board(self.category), self.expected(self.category))
+
+    def test_bulk_writes(self) -> None:
+        serializer = ProductExpressionUpdateSerializer(data={
+            'filter': {'ids': [self.products[0].id]}, 'rank': {'set': 100}})
+        serializer.is_valid(raise_exception=True)
+        serializer.apply(Product.objects.filter(owner=self.user))
+        self.assertEqual(self.board(self.category), self.expected(self.category))
+        self.assertEqual(self.board(self.category)[0], self.products[0].id)
+
+        delete = ProductBulkDeleteSerializer(data={'ids': [self.products[0].id, self.products[4].id]})
+        delete.is_valid(raise_exception=True)
+        delete.apply(Product.objects.filter(owner=self.user))
+        self.assertEqual(self.board(self.category), self.expected(self.category))
+
+
+class CategoryLeaderboardViewTest(LeaderboardTestCase):
+    def test_lists_the_top_products(self) -> None:
+        response = self.client.get(reverse('category_top', args=[self.category.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([product['id'] for product in response.json()], self.expected(self.category))
+
+    def test_empty_category(self) -> None:
+        response = self.client.get(reverse('category_top', args=[self.category2.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+
+
+class RebuildLeaderboardsCommandTest(LeaderboardTestCase):
+    def test_rebuild(self) -> None:
+        # A write that bypassed the maintenance.
+        Product.objects.filter(pk=self.products[0].pk).update(rank=100, product_category=self.category2)
+        CategoryLeaderboardEntry.objects.filter(product=self.products[1]).delete()
+
+        out = io.StringIO()
+        call_command('rebuild_leaderboards', stdout=out)
+
+        self.assertIn('4 entries', out.getvalue())
+        self.assertEqual(self.board(self.category), self.expected(self.category))
+        self.assertEqual(self.board(self.category2), [self.products[0].id])
+
+    def test_rebuild_one_category(self) -> None:
+        Product.objects.filter(pk=self.products[0].pk).update(rank=100)
+
+        call_command('rebuild_leaderboards', category=[self.category.id], stdout=io.StringIO())
+
+        self.assertEqual(self.board(self.category)[0], self.products[0].id)
@@ -28,6 +28,7 @@ Methods:
 from django.test import TestCase
 from user.models import User
 from product.models import ProductCategory, Product, WishList
+from product import wishlists
 
 
 class ProductCategoryModelTestCase(TestCase):
@@ -82,7 +83,8 @@ class WishListModelTestCase(TestCase):
         self.wishlist = WishList.objects.create(user=self.user)
 
     def test_wishlist_add_product(self) -> None:
-        self.wishlist.products.add(self.product)
+        wishlists.add_products(self.wishlist, [self.product])
+
         self.assertEqual(self.wishlist.products.count(), 1)
         self.assertEqual(self.wishlist.products.first(), self.product)
 
@@ -0,0 +1,156 @@
+"""
+This module contains test cases for the serializer driven queryset optimizer.
+
+It checks that:
+ - nested serializers are turned into select_related/prefetch_related calls
+ - only the columns read by the serializers are loaded
+ - the product and wishlist list endpoints run a constant number of queries
+ - sparse fieldsets narrow both the loaded columns and the rendered fields
+"""
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import force_authenticate
+from rest_framework import status
+from product.models import Product, ProductCategory, WishList
+from product import wishlists
+from product.optimizers import optimize_queryset
+from product.serializers import ProductListSerializer, WishListSerializer
+from product.views import ProductListView, ProductView, WishListView, WishListUnauthorizedView
+from user.models import User
+
+
+class OptimizeQuerySetTest(TestCase):
+    def test_nested_serializer_is_select_related(self) -> None:
+        queryset = optimize_queryset(Product.objects.all(), ProductListSerializer)
+        self.assertEqual(queryset.query.select_related, {'product_category': {}})
+        field_names, defer = queryset.query.deferred_loading
+        self.assertFalse(defer)
+        self.assertEqual(
+            set(field_names),
+            {'id', 'name', 'price', 'created_time', 'product_category', 'product_category__id', 'product_category__name'}
+        )
+
+    def test_many_nested_serializer_is_prefetched(self) -> None:
+        queryset = optimize_queryset(WishList.objects.all(), WishListSerializer)
+        lookups = queryset._prefetch_related_lookups  # type: ignore[attr-defined]
+        self.assertEqual([lookup.prefetch_to for lookup in lookups], ['products'])
+        self.assertEqual(lookups[0].queryset.query.select_related, {'product_category': {}})
+
+
+class ConstantQueryCountTest(TestCase):
+    def setUp(self) -> None:
+        self.factory = RequestFactory()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.wishlist = WishList.objects.create(user=self.user)
+
+    def add_products(self, count: int) -> None:
+        for i in range(count):
+            category = ProductCategory.objects.create(name=f"category{i}", owner=self.user)
+            product = Product.objects.create(
+                name=f'Product{i}',
+                price=10 + i,
+                currency='EUR',
+                rank=i,
+                owner=self.user,
+                product_category=category,
+            )
+            wishlists.add_products(self.wishlist, [product])
+
+    def test_product_list_view(self) -> None:
+        self.add_products(5)
+        with self.assertNumQueries(1):
+            response = ProductListView.as_view()(self.factory.get(reverse('products')))
+            response.render()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['product_category']['name'], 'category4')
+
+    def test_wishlist_unauthorized_view(self) -> None:
+        self.add_products(5)
+        url = reverse('wish_list_unauthorized', kwargs={'uuid': self.user.id})
+        # The products, filtered on the user id without looking the user up.
+        with self.assertNumQueries(1):
+            response = WishListUnauthorizedView.as_view()(self.factory.get(url), uuid=self.user.id)
+            response.render()
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_wishlist_view(self) -> None:
+        self.add_products(5)
+        request = self.factory.get(reverse('wishlist'))
+        force_authenticate(request, self.user)
+        with self.assertNumQueries(2):
+            response = WishListView.as_view()(request)
+            response.render()
+        self.assertEqual(len(response.data['products']), 5)
+
+
+class SparseFieldsetTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.category = ProductCategory.objects.create(name="category", owner=self.user)
+        self.product = Product.objects.create(
+            name='Product', price=10, currency='EUR', rank=1, owner=self.user, product_category=self.category)
+        self.wishlist = WishList.objects.create(user=self.user)
+        wishlists.add_products(self.wishlist, [self.product])
+
+    def get_list(self, query: str) -> tuple:
+        with CaptureQueriesContext(connection) as queries:
+            response = ProductListView.as_view()(self.factory.get(reverse('products') + query))
+        return response, queries[0]['sql']
+
+    def test_fields_narrow_columns_and_output(self) -> None:
+        response, sql = self.get_list('?fields=id,name,price')
+
+        self.assertEqual(response.data['results'], [{'id': self.product.id, 'name': 'Product', 'price': 10.0}])
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('"updated_time"', sql)
+        self.assertNotIn('"rank"', sql)
+
+    def test_unexpanded_relation_is_rendered_as_primary_key(self) -> None:
+        response, sql = self.get_list('?fields=id,product_category')
+
+        self.assertEqual(response.data['results'], [{'id': self.product.id, 'product_category': self.category.id}])
+        self.assertNotIn('JOIN', sql)
+
+    def test_expanded_relation_is_nested(self) -> None:
+        response, sql = self.get_list('?fields=id&expand=product_category')
+
+        self.assertEqual(response.data['results'], [{'id': self.product.id, 'product_category': {'name': 'category'}}])
+        self.assertIn('JOIN', sql)
+
+    def test_unknown_fields_are_rejected(self) -> None:
+        url = reverse('products') + '?fields=id,foo&expand=bar'
+        for query, fast in (('', False), ('', True), ('&stream=1', False)):
+            with self.subTest(query=query, fast=fast), override_settings(PRODUCT_FAST_SERIALIZER=fast):
+                response = ProductListView.as_view()(self.factory.get(url + query))
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(response.data, {'fields': ['Unknown fields: bar, foo']})
+
+        url = reverse('product', kwargs={'id': self.product.id}) + '?fields=foo'
+        response = ProductView.as_view()(self.factory.get(url), id=self.product.id)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_product_detail_caches_each_fieldset(self) -> None:
+        url = reverse('product', kwargs={'id': self.product.id})
+        full = ProductView.as_view()(self.factory.get(url), id=self.product.id)
+        sparse = ProductView.as_view()(self.factory.get(url + '?fields=name'), id=self.product.id)
+
+        self.assertEqual(sparse['X-Cache'], 'MISS')
+        self.assertEqual(sparse.data, {'name': 'Product'})
+        self.assertIn('created_time', full.data)
+        self.assertNotEqual(full['ETag'], sparse['ETag'])
+
+    def test_wishlist_fields_apply_to_products(self) -> None:
+        request = self.factory.get(reverse('wishlist') + '?fields=id')
+        force_authenticate(request, self.user)
+        response = WishListView.as_view()(request)
+        self.assertEqual(response.data['products'], [{'id': self.product.id}])
+
+        url = reverse('wish_list_unauthorized', kwargs={'uuid': self.user.id}) + '?fields=id,price'
+        response = WishListUnauthorizedView.as_view()(self.factory.get(url), uuid=self.user.id)
+        self.assertEqual(response.data['results'], [{'id': self.product.id, 'price': 10.0}])
@@ -0,0 +1,156 @@
+"""
+This module contains test cases for the keyset pagination of the product
+list and of the public wishlists.
+
+It checks that:
+ - pages follow the requested `(fields..., id)` order without gaps or
+   duplicates, keys of mixed directions included
+ - previous links walk back to the same pages
+ - the `price_gt`/`price_lt` filters are applied together with the cursor
+ - no COUNT(*) or OFFSET query is issued
+ - the public wishlist combines its sort keys, the legacy ones included
+"""
+
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.request import Request
+from product import wishlists
+from product.models import Product, ProductCategory, WishList
+from product.pagination import KeysetPagination
+from product.views import ProductListView, WishListUnauthorizedView
+from user.models import User
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self) -> None:
+        self.factory = RequestFactory()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.product_category = ProductCategory.objects.create(name="test", owner=self.user)
+        prices = [10, 20, 20, 20, 30, 40, 50]
+        self.products = [
+            Product.objects.create(
+                name=f'Product{i}',
+                price=price,
+                currency='EUR',
+                rank=i % 3,
+                owner=self.user,
+                product_category=self.product_category,
+            )
+            for i, price in enumerate(prices)
+        ]
+
+    def get(self, url: str) -> dict:
+        response = ProductListView.as_view()(self.factory.get(url))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data: dict = response.data
+        return data
+
+    def walk(self, url: str) -> list[int]:
+        ids = []
+        while url:
+            data = self.get(url)
+            ids += [item['id'] for item in data['results']]
+            url = data['next']
+        return ids
+
+    def test_pages_follow_price_order(self) -> None:
+        ids = self.walk(reverse('products') + '?ordering=price&page_size=2')
+        expected = [p.id for p in sorted(self.products, key=lambda p: (p.price, p.id))]
+        self.assertEqual(ids, expected)
+
+    def test_pages_follow_descending_rank_order(self) -> None:
+        ids = self.walk(reverse('products') + '?ordering=-rank&page_size=3')
+        expected = [p.id for p in sorted(self.products, key=lambda p: (p.rank, p.id), reverse=True)]
+        self.assertEqual(ids, expected)
+
+    def test_pages_follow_composite_order(self) -> None:
+        ids = self.walk(reverse('products') + '?ordering=rank,-price&page_size=2')
+        expected = [p.id for p in sorted(self.products, key=lambda p: (p.rank, -p.price, -p.id))]
+        self.assertEqual(ids, expected)
+
+        first = self.get(reverse('products') + '?ordering=rank,-price&page_size=3')
+        back = self.get(self.get(first['next'])['previous'])
+        self.assertEqual(back['results'], first['results'])
+
+    def test_invalid_ordering_falls_back_to_the_default(self) -> None:
+        for ordering in ('name', 'rank,rank', 'rank,'):
+            with self.subTest(ordering=ordering):
+                first = self.get(reverse('products') + f'?ordering={ordering}')
+                expected = [p.id for p in sorted(self.products, key=lambda p: (p.created_time, p.id), reverse=True)]
+                self.assertEqual([item['id'] for item in first['results']], expected)
+
+    def test_sort_keys_are_added_to_a_values_selection(self) -> None:
+        paginator = KeysetPagination()
+        request = Request(self.factory.get(reverse('products') + '?ordering=price&page_size=2'))
+        queryset = Product.objects.annotate(double=F('rank') * 2).values('id', 'double')
+        page = paginator.paginate_queryset(queryset, request)
+        self.assertEqual(set(page[0]), {'id', 'double', 'price'})
+        self.assertIsNotNone(paginator.get_next_link())
+
+    def test_previous_link_returns_previous_page(self) -> None:
+        first = self.get(reverse('products') + '?ordering=price&page_size=2')
+        second = self.get(first['next'])
+        back = self.get(second['previous'])
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(first['previous'])
+
+    def test_pagination_with_price_filter(self) -> None:
+        ids = self.walk(reverse('products') + '?ordering=price&page_size=2&price_gt=15&price_lt=45')
+        expected = [p.id for p in sorted(self.products, key=lambda p: (p.price, p.id)) if 15 < p.price < 45]
+        self.assertEqual(ids, expected)
+
+    def test_invalid_cursor(self) -> None:
+        response = ProductListView.as_view()(self.factory.get(reverse('products') + '?cursor=garbage'))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # A cursor of another ordering.
+        url = self.get(reverse('products') + '?ordering=price&page_size=2')['next']
+        response = ProductListView.as_view()(self.factory.get(url.replace('ordering=price', 'ordering=rank,price')))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_no_count_or_offset_query(self) -> None:
+        first = self.get(reverse('products') + '?ordering=created_time&page_size=2')
+        with CaptureQueriesContext(connection) as queries:
+            self.get(first['next'])
+        sql = ' '.join(q['sql'].upper() for q in queries.captured_queries)
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+
+class WishListPaginationTest(TestCase):
+    def setUp(self) -> None:
+        self.factory = RequestFactory()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.products = [
+            Product.objects.create(
+                name=f'Product{i}', price=10 * i, rank=i % 2, owner=self.user,
+                product_category=ProductCategory.objects.create(name=f"category{i}", owner=self.user),
+            )
+            for i in range(5)
+        ]
+        wishlists.add_products(WishList.objects.create(user=self.user), self.products)
+
+    def walk(self, query: str) -> list[int]:
+        url = reverse('wish_list_unauthorized', kwargs={'uuid': self.user.id}) + query
+        ids = []
+        while url:
+            response = WishListUnauthorizedView.as_view()(self.factory.get(url), uuid=self.user.id)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [item['id'] for item in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_composite_order(self) -> None:
+        expected = [p.id for p in sorted(self.products, key=lambda p: (p.rank, -p.created_time.timestamp(), -p.id))]
+        self.assertEqual(self.walk('?order=rank,-created_time&page_size=2'), expected)
+
+    def test_legacy_parameters_are_combined(self) -> None:
+        # `asc` has always listed the highest values first.
+        expected = [p.id for p in sorted(self.products, key=lambda p: (-p.rank, p.created_time, p.id))]
+        self.assertEqual(self.walk('?rank=asc&created_time=desc&page_size=2'), expected)
+        # An explicit order wins over them.
+        self.assertEqual(self.walk('?rank=asc&order=price'), [p.id for p in self.products])
@@ -0,0 +1,166 @@
+"""
+This module contains test cases for the product popularity counters.
+
+It checks that:
+ - committed wishlist changes are coalesced in memory and flushed in batches
+ - the buffer is flushed when due, on requests and at exit, and a failed
+   flush on commit is logged with its changes kept
+ - removals and deleted wishlists are counted down
+ - the trending score decays with the configured half-life
+ - the trending endpoint pages through the products by score or by count
+ - the rebuild_popularity command recounts the wishlists
+"""
+
+import io
+from datetime import timedelta
+from typing import Any
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from product import popularity
+from product import wishlists
+from product.models import Product, ProductCategory, ProductPopularity, WishList
+from product.views import ProductTrendingView
+from user.models import User
+
+HALF_LIFE = 3600
+
+
+@override_settings(POPULARITY_HALF_LIFE=HALF_LIFE, POPULARITY_FLUSH_SIZE=1000, POPULARITY_FLUSH_INTERVAL=3600)
+class PopularityTestCase(TestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch.dict(popularity._pending, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.products = [
+            Product.objects.create(name=f'Product{i}', price=10, rank=1, owner=self.user,
+                                   product_category=ProductCategory.objects.create(name=f"category{i}", owner=self.user))
+            for i in range(3)
+        ]
+        self.wishlists = [
+            WishList.objects.create(user=User.objects.create(email=f"user{i}@example.com", password="123456"))
+            for i in range(3)
+        ]
+
+    def popularity(self) -> dict[int, int]:
+        return dict(ProductPopularity.objects.values_list('product_id', 'wished'))
+
+    def ago(self, half_lives: float) -> Any:
+        return timezone.now() - timedelta(seconds=half_lives * HALF_LIFE)
+
+
+class PopularityCountersTest(PopularityTestCase):
+    def test_changes_are_coalesced_until_flushed(self) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            for wishlist in self.wishlists:
+                wishlists.add_products(wishlist, self.products[:2])
+        self.assertEqual(self.popularity(), {})
+
+        # The products, the missing rows, the lock and the update, in a savepoint.
+        with self.assertNumQueries(6):
+            self.assertEqual(popularity.flush(), 2)
+        self.assertEqual(self.popularity(), {self.products[0].id: 3, self.products[1].id: 3})
+
+    def test_flush_when_the_buffer_is_full(self) -> None:
+        with override_settings(POPULARITY_FLUSH_SIZE=2), self.captureOnCommitCallbacks(execute=True):
+            wishlists.add_products(self.wishlists[0], self.products[:1])
+            self.assertEqual(self.popularity(), {})
+            wishlists.add_products(self.wishlists[0], self.products[1:2])
+        self.assertEqual(self.popularity(), {self.products[0].id: 1, self.products[1].id: 1})
+
+    def test_flush_when_the_buffer_is_old(self) -> None:
+        popularity.record({self.products[0].id: 1})
+        self.assertEqual(self.popularity(), {})
+        with override_settings(POPULARITY_FLUSH_INTERVAL=0):
+            self.client.get(reverse('product_trending'))
+        self.assertEqual(self.popularity(), {self.products[0].id: 1})
+
+    def test_flush_at_exit(self) -> None:
+        popularity.record({self.products[0].id: 1})
+        popularity.flush_at_exit()
+        self.assertEqual(self.popularity(), {self.products[0].id: 1})
+
+    def test_failed_flush_on_commit_is_logged(self) -> None:
+        with override_settings(POPULARITY_FLUSH_SIZE=1), \
+                mock.patch.object(popularity, 'apply', side_effect=DatabaseError), \
+                self.assertLogs('product.popularity', 'ERROR'), \
+                self.captureOnCommitCallbacks(execute=True):
+            wishlists.add_products(self.wishlists[0], self.products[:1])
+        self.assertEqual(popularity._pending, {self.products[0].id: [1, mock.ANY]})
+        self.assertEqual(popularity.flush(), 1)
+        self.assertEqual(self.popularity(), {self.products[0].id: 1})
+
+    def test_removals_and_deleted_wishlists(self) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            for wishlist in self.wishlists:
+                wishlists.add_products(wishlist, self.products[:1])
+        popularity.flush()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            wishlists.sync_products(self.wishlists[0], [])
+            self.wishlists[1].delete()
+        popularity.flush()
+        self.assertEqual(self.popularity(), {self.products[0].id: 1})
+
+    def test_deleted_products_are_skipped(self) -> None:
+        popularity.record({self.products[0].id: 1, self.products[1].id: 1})
+        self.products[0].delete()
+        self.assertEqual(popularity.flush(), 1)
+        self.assertEqual(self.popularity(), {self.products[1].id: 1})
+
+    def test_score_decays(self) -> None:
+        popularity.record({self.products[0].id: 2}, at=self.ago(1))
+        popularity.record({self.products[0].id: 1}, at=self.ago(2))
+        popularity.flush()
+
+        score = ProductPopularity.objects.get().score
+        self.assertAlmostEqual(popularity.decayed(score), 1.25, places=3)
+        self.assertAlmostEqual(popularity.decayed(score, at=self.ago(-1)), 0.625, places=3)
+
+
+class ProductTrendingViewTest(PopularityTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        # Wished for by more users, but long ago.
+        popularity.record({self.products[0].id: 3}, at=self.ago(3))
+        popularity.record({self.products[1].id: 1})
+        popularity.flush()
+
+    def get(self, url: str) -> Any:
+        response = ProductTrendingView.as_view()(self.factory.get(url))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_trending_first(self) -> None:
+        data = self.get(reverse('product_trending'))
+        self.assertEqual([item['product']['id'] for item in data['results']],
+                         [self.products[1].id, self.products[0].id])
+        self.assertEqual(data['results'][0]['wished'], 1)
+        self.assertAlmostEqual(data['results'][0]['score'], 1, places=3)
+
+    def test_most_wished_for_pages(self) -> None:
+        first = self.get(reverse('product_trending') + '?ordering=-wished&page_size=1')
+        second = self.get(first['next'])
+        self.assertEqual([item['product']['id'] for item in first['results'] + second['results']],
+                         [self.products[0].id, self.products[1].id])
+        self.assertIsNone(second['next'])
+
+
+class RebuildPopularityCommandTest(PopularityTestCase):
+    def test_rebuild(self) -> None:
+        wishlists.add_products(self.wishlists[0], self.products[:2])
+        ProductPopularity.objects.create(product=self.products[2], wished=5, score=1)
+
+        out = io.StringIO()
+        call_command('rebuild_popularity', stdout=out)
+
+        self.assertIn('2 products', out.getvalue())
+        self.assertEqual(self.popularity(), {self.products[0].id: 1, self.products[1].id: 1, self.products[2].id: 0})
+        self.assertEqual(ProductPopularity.objects.get(product=self.products[2]).score, 1)
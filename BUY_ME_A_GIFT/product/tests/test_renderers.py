@@ -0,0 +1,111 @@
+"""
+This module contains test cases for the orjson and MessagePack renderers.
+
+It checks that:
+ - ORJSONRenderer output is byte for byte the JSONRenderer output
+ - ORJSONParser accepts and rejects the same documents as JSONParser
+ - the renderer is picked from the Accept header
+"""
+
+import datetime
+import decimal
+import io
+import json
+import uuid
+from collections import OrderedDict
+
+import msgpack
+from django.test import TestCase, RequestFactory
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from product.models import Product, ProductCategory
+from product.renderers import MessagePackRenderer, ORJSONParser, ORJSONRenderer
+from product.views import ProductListView
+from user.models import User
+
+
+class ORJSONRendererTest(TestCase):
+    def assertSameBytes(self, data: object, accepted_media_type: str | None = None) -> None:
+        expected = JSONRenderer().render(data, accepted_media_type)
+        self.assertEqual(ORJSONRenderer().render(data, accepted_media_type), expected)
+
+    def test_scalars_and_containers(self) -> None:
+        self.assertSameBytes({
+            'int': 1, 'big': 2 ** 70, 'none': None, 'bool': True, 'text': 'é "quoted" \\ \n',
+            'list': [1, (2, 3)], 'ordered': OrderedDict([('b', 1), ('a', 2)]), 1: 'int key',
+        })
+        self.assertSameBytes(None)
+        self.assertSameBytes([])
+
+    def test_floats(self) -> None:
+        for value in (0.0, -0.0, 1.0, 10.5, 0.1, 0.30000000000000004, 1e-4, 1e-5, 123456.789, 1e15, 1e16, 1e300):
+            with self.subTest(value=value):
+                self.assertSameBytes({'price': value})
+
+    def test_dates_and_other_types(self) -> None:
+        aware = datetime.datetime(2023, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc)
+        self.assertSameBytes({
+            'aware': aware, 'whole_second': aware.replace(microsecond=0),
+            'offset': aware.astimezone(datetime.timezone(datetime.timedelta(hours=2))),
+            'naive': aware.replace(tzinfo=None), 'date': aware.date(), 'time': aware.time(),
+            'delta': datetime.timedelta(hours=1), 'decimal': decimal.Decimal('10.50'),
+            'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'), 'lazy': gettext_lazy('Invalid cursor'),
+            'bytes': b'raw',
+        })
+
+    def test_javascript_line_separators_are_escaped(self) -> None:
+        self.assertSameBytes({'name': 'a\u2028b\u2029c'})
+
+    def test_indented_output(self) -> None:
+        self.assertSameBytes({'a': [1, 2]}, 'application/json; indent=4')
+
+
+class ORJSONParserTest(TestCase):
+    def parse(self, parser: JSONParser, content: bytes) -> object:
+        return parser.parse(io.BytesIO(content), 'application/json', {'encoding': 'utf-8'})
+
+    def test_same_documents(self) -> None:
+        content = json.dumps({'name': 'é', 'price': 1.5, 'ids': [1, 2], 'nested': {'a': None}}).encode()
+        self.assertEqual(self.parse(ORJSONParser(), content), self.parse(JSONParser(), content))
+
+    def test_invalid_documents(self) -> None:
+        for content in (b'', b'{"a": ', b'{"price": NaN}', b'{"price": Infinity}'):
+            with self.subTest(content=content):
+                with self.assertRaises(ParseError):
+                    self.parse(JSONParser(), content)
+                with self.assertRaises(ParseError):
+                    self.parse(ORJSONParser(), content)
+
+
+class ContentNegotiationTest(TestCase):
+    def setUp(self) -> None:
+        self.factory = RequestFactory()
+        user = User.objects.create(email="test@example.com", password="123456")
+        category = ProductCategory.objects.create(name="category", owner=user)
+        Product.objects.create(name='Product', price=10.5, rank=1, owner=user, product_category=category)
+
+    def test_json_by_default(self) -> None:
+        response = ProductListView.as_view()(self.factory.get(reverse('products')))
+        response.render()
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_msgpack(self) -> None:
+        response = ProductListView.as_view()(self.factory.get(reverse('products'), HTTP_ACCEPT='application/msgpack'))
+        response.render()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), json.loads(JSONRenderer().render(response.data)))
+
+    def test_msgpack_converts_like_json(self) -> None:
+        moment = datetime.datetime(2023, 1, 2, tzinfo=datetime.timezone.utc)
+        data = msgpack.unpackb(MessagePackRenderer().render({'at': moment, 'amount': decimal.Decimal('1.5')}))
+        self.assertEqual(data, {'at': '2023-01-02T00:00:00Z', 'amount': 1.5})
+
+    def test_registered_in_settings(self) -> None:
+        self.assertIs(ProductListView.renderer_classes[0], ORJSONRenderer)
+        self.assertIs(ProductListView.parser_classes[0], ORJSONParser)
@@ -14,6 +14,7 @@ It includes the following serializers:
 
 from django.test import TestCase
 from product.models import ProductCategory, Product, WishList
+from product import wishlists
 from product.serializers import (
     ProductCategorySerializer,
     ProductCategoryCreateSerializer,
@@ -176,7 +177,7 @@ class WishListSerializerTestCase(TestCase):
             owner=self.user
         )
         self.wishlist = WishList.objects.create(user=self.user)
-        self.wishlist.products.add(self.product)
+        wishlists.add_products(self.wishlist, [self.product])
 
     def test_wishlist_serializer(self) -> None:
         """
@@ -258,7 +259,7 @@ class WishListUnauthorizedSerializerTestCase(TestCase):
             owner=self.user
         )
         self.wishlist = WishList.objects.create(user=self.user)
-        self.wishlist.products.add(self.product)
+        wishlists.add_products(self.wishlist, [self.product])
 
     def test_wishlist_unauthorized_serializer(self)  -> None:
         """
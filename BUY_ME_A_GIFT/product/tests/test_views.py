@@ -2,7 +2,9 @@
 This module contains test cases for testing:
  - Product creation
  - Product update
+ - Bulk and expression based product update
  - Product deletion
+ - Bulk product deletion
  - product listing
  - Product Category creation
  - Product category deletion
@@ -10,27 +12,55 @@ This module contains test cases for testing:
  - Wishlist creation
  - Wishlist deletion
  - Wishlist product listing
+ - Product search
+ - Product and category name suggestions
+ - Product list facets
+ - Streamed product and wishlist listings
+ - Catalog export jobs
 
 It contains testing enpoints having the above listed functionalities
 """
 
-from django.test import TestCase, RequestFactory
+import csv
+import gzip
+import io
+import tempfile
+from datetime import timedelta
+from typing import Any
+from unittest import skipUnless
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, FloatField, Value, When
+from django.test import TestCase, RequestFactory, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import force_authenticate
 from rest_framework import status
-from product.models import Product, ProductCategory, WishList
+from product.models import CategoryLeaderboardEntry, Product, ProductCategory, ProductPopularity, WishList, ExportJob
+from product import wishlists
+from product import cache as product_cache
+from product.exports import export_path, run_export
+from product.facets import compute_facets
+from product.search import order_by_score
 from product.views import (
     ProductView,
     ProductCreateView,
     ProductUpdateView,
+    ProductBulkUpdateView,
     ProductDeleteView,
+    ProductBulkDeleteView,
     ProductListView,
     CategoryCreateView,
     CategoryDeleteView,
     CategoryListView,
     WishCreateView,
     WishListView,
-    WishListUnauthorizedView
+    WishListUnauthorizedView,
+    ProductSearchView,
+    ProductSuggestView,
+    ExportCreateView,
+    ExportJobView,
+    ExportDownloadView,
 )
 from user.models import User
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -93,6 +123,7 @@ class ProductCreateViewTest(TestCase):
     
     """
     def setUp(self)  -> None:
+        cache.clear()
         self.factory = RequestFactory()
         self.user = User.objects.create(email="test@example.com", password="123456")
         self.product_category = ProductCategory.objects.create(name="test", owner=self.user)
@@ -179,6 +210,55 @@ class ProductCreateViewTest(TestCase):
         self.assertEqual(response.data[0]['name'], product[0]['name'])
         self.assertEqual(Product.objects.count(), 2)
 
+    def bulk_create(self, products: list[dict], user: User) -> Any:
+        request = self.factory.post(reverse('product_create'), data=json.dumps(products), content_type='application/json')
+        force_authenticate(request, user)
+        return ProductCreateView.as_view()(request)
+
+    def test_product_bulk_create_runs_constant_queries(self) -> None:
+        products = [{
+            'name': f'test{i}',
+            'price': i,
+            'rank': i,
+            'product_category': (self.product_category, self.product_category2)[i % 2].id
+        } for i in range(20)]
+
+        # The categories, the exchange rates, the insert and the refresh of the two leaderboards.
+        with self.assertNumQueries(10):
+            response = self.bulk_create(products, self.user)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [item['id'] for item in response.data],
+            list(Product.objects.order_by('id').values_list('id', flat=True))
+        )
+        self.assertEqual(Product.objects.filter(owner=self.user, product_category=self.product_category2).count(), 10)
+
+    def test_product_bulk_create_with_category_of_another_user(self) -> None:
+        user2 = User.objects.create(email="test2@example.com", password="123456")
+        products = [
+            {'name': 'test', 'price': 1, 'rank': 1, 'product_category': self.product_category.id},
+            {'name': 'test2', 'price': 1, 'rank': 1, 'product_category': self.product_category.id},
+        ]
+        response = self.bulk_create(products, user2)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('product_category', response.data[0])
+        self.assertEqual(Product.objects.count(), 0)
+
+    def test_product_bulk_create_validates_categories_like_single_create(self) -> None:
+        category_id = self.product_category.id
+        for value in (True, category_id + 0.9, str(category_id + 0.9), 'abc', str(category_id), None):
+            with self.subTest(value=value):
+                product = {'name': 'test', 'price': 1, 'rank': 1, 'product_category': value}
+                single = self.bulk_create(product, self.user)  # type: ignore[arg-type]
+                bulk = self.bulk_create([product, product], self.user)
+                self.assertEqual(bulk.status_code, single.status_code)
+                if single.status_code == status.HTTP_400_BAD_REQUEST:
+                    self.assertEqual(bulk.data[0]['product_category'], single.data['product_category'])
+        self.assertEqual(self.bulk_create([{'name': 'test', 'price': 1, 'rank': 1, 'product_category': True}],
+                                          self.user).status_code, status.HTTP_400_BAD_REQUEST)
+
 class ProductUpdateViewTest(TestCase):
 
     def setUp(self) -> None:
@@ -225,6 +305,114 @@ class ProductUpdateViewTest(TestCase):
       
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+class ProductBulkUpdateViewTest(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.user2 = User.objects.create(email="test2@example.com", password="123456")
+        self.category = ProductCategory.objects.create(name="test", owner=self.user)
+        self.category2 = ProductCategory.objects.create(name="test2", owner=self.user)
+        self.products = [
+            Product.objects.create(name=f'Product{i}', price=10.0 * (i + 1), currency='EUR', rank=i,
+                                   owner=self.user, product_category=(self.category, self.category2)[i % 2])
+            for i in range(4)
+        ]
+        self.other = Product.objects.create(name='Other', price=10.0, rank=1, owner=self.user2,
+                                            product_category=ProductCategory.objects.create(name='x', owner=self.user2))
+
+    def bulk_update(self, data: Any, user: User) -> Any:
+        request = self.factory.patch(reverse('product_bulk_update'), data=json.dumps(data), content_type='application/json')
+        force_authenticate(request, user)
+        return ProductBulkUpdateView.as_view()(request)
+
+    def test_per_id_updates(self) -> None:
+        first, second = self.products[:2]
+        updated_time = first.updated_time
+        # The update, then the refresh of the leaderboards the second product
+        # left and entered and the check of its wishlist items.
+        with self.assertNumQueries(14):
+            response = self.bulk_update([
+                {'id': first.id, 'price': 1.5},
+                {'id': second.id, 'name': 'renamed', 'product_category': self.category.id},
+                {'id': self.other.id, 'price': 0},
+            ], self.user)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 2)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((first.price, first.name), (1.5, 'Product0'))
+        self.assertEqual((second.name, second.price, second.product_category), ('renamed', 20.0, self.category))
+        self.assertEqual(self.other.price, 10.0)
+        self.assertGreater(first.updated_time, updated_time)
+
+    def test_per_id_updates_require_id_and_owned_category(self) -> None:
+        other_category = self.other.product_category
+        response = self.bulk_update([{'price': 1}, {'id': self.products[0].id, 'product_category': other_category.id}], self.user)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', response.data[0])
+        self.assertIn('product_category', response.data[1])
+
+    def test_expression_update(self) -> None:
+        # The range check, the update, then the refresh of the leaderboard of the category.
+        with self.assertNumQueries(11):
+            response = self.bulk_update({
+                'filter': {'product_category': self.category.id},
+                'price': {'multiply': 0.9},
+                'rank': {'add': 10},
+            }, self.user)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(
+            list(Product.objects.filter(owner=self.user).order_by('id').values_list('price', 'rank')),
+            [(9.0, 10), (20.0, 1), (27.0, 12), (40.0, 3)],
+        )
+        self.assertEqual(Product.objects.get(id=self.other.id).price, 10.0)
+
+    def test_expression_update_is_owner_scoped(self) -> None:
+        response = self.bulk_update({'filter': {'ids': [self.other.id]}, 'price': {'set': 1}}, self.user)
+
+        self.assertEqual(response.data['updated'], 0)
+        self.assertEqual(Product.objects.get(id=self.other.id).price, 10.0)
+
+    def test_expression_update_invalidates_cached_details(self) -> None:
+        product = self.products[0]
+        request = self.factory.get(reverse('product', kwargs={'id': product.id}))
+        ProductView.as_view()(request, id=product.id)
+        self.bulk_update({'price': {'add': 5}}, self.user)
+
+        response = ProductView.as_view()(self.factory.get(reverse('product', kwargs={'id': product.id})), id=product.id)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['price'], 15.0)
+
+    def test_invalid_expression(self) -> None:
+        response = self.bulk_update({'price': {'add': 1, 'multiply': 2}}, self.user)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.bulk_update({'filter': {'currency': 'EUR'}}, self.user)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_non_finite_operand(self) -> None:
+        for operand in ('nan', 'inf', '-inf'):
+            response = self.bulk_update({'price': {'multiply': operand}}, self.user)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('multiply', response.data['price'])
+
+    def test_out_of_range_result(self) -> None:
+        for data in ({'price': {'multiply': 1e308}}, {'price': {'multiply': -1e308}},
+                     {'rank': {'add': 1e300}}, {'rank': {'multiply': -1e9}}, {'rank': {'set': 2 ** 31}}):
+            response = self.bulk_update(data, self.user)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, data)
+            self.assertIn(next(iter(data)), response.data)
+        self.assertEqual(
+            list(Product.objects.filter(owner=self.user).order_by('id').values_list('price', 'rank')),
+            [(10.0, 0), (20.0, 1), (30.0, 2), (40.0, 3)],
+        )
+
 class ProductDeleteViewTest(TestCase):
     def setUp(self) -> None:
         self.factory = RequestFactory()
@@ -258,6 +446,70 @@ class ProductDeleteViewTest(TestCase):
     
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+class ProductBulkDeleteViewTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.user2 = User.objects.create(email="test2@example.com", password="123456")
+        self.category = ProductCategory.objects.create(name="test", owner=self.user)
+        self.category2 = ProductCategory.objects.create(name="test2", owner=self.user)
+        self.products = [
+            Product.objects.create(name=f'Product{i}', price=i, rank=i, owner=self.user,
+                                   product_category=(self.category, self.category2)[i % 2])
+            for i in range(6)
+        ]
+        self.other = Product.objects.create(name='Other', price=1, rank=1, owner=self.user2,
+                                            product_category=ProductCategory.objects.create(name='x', owner=self.user2))
+        self.wishlist = WishList.objects.create(user=self.user2)
+        wishlists.add_products(self.wishlist, [self.products[0], self.other])
+
+    def bulk_delete(self, data: Any, user: User) -> Any:
+        request = self.factory.delete(reverse('product_bulk_delete'), data=json.dumps(data), content_type='application/json')
+        force_authenticate(request, user)
+        return ProductBulkDeleteView.as_view()(request)
+
+    def test_delete_by_ids(self) -> None:
+        ids = [self.products[0].id, self.products[1].id, self.other.id]
+        response = self.bulk_delete({'ids': ids}, self.user)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertEqual(Product.objects.filter(id__in=ids).get(), self.other)
+        self.assertEqual(list(self.wishlist.products.all()), [self.other])
+
+    def test_delete_by_filter_runs_constant_queries(self) -> None:
+        # The delete with the popularity rows, then the refresh of the leaderboard of the category.
+        with self.assertNumQueries(13):
+            response = self.bulk_delete({'product_category': self.category.id}, self.user)
+
+        self.assertEqual(response.data['deleted'], 3)
+        self.assertEqual(Product.objects.filter(owner=self.user).count(), 3)
+        self.assertFalse(Product.objects.filter(product_category=self.category).exists())
+
+    def test_every_reference_is_deleted_first(self) -> None:
+        # The products are deleted without the collector, each table referencing them is emptied explicitly.
+        self.assertEqual(
+            {relation.related_model for relation in Product._meta.related_objects if not relation.many_to_many},
+            {WishList.products.through, CategoryLeaderboardEntry, ProductPopularity})
+
+    def test_delete_invalidates_wishlist_cache(self) -> None:
+        version = product_cache.get_wishlist_version(self.user2.id)
+        self.bulk_delete({'ids': [self.products[0].id]}, self.user)
+        self.assertNotEqual(product_cache.get_wishlist_version(self.user2.id), version)
+
+    def test_delete_of_another_user(self) -> None:
+        response = self.bulk_delete({'ids': [self.other.id]}, self.user)
+
+        self.assertEqual(response.data['deleted'], 0)
+        self.assertTrue(Product.objects.filter(id=self.other.id).exists())
+
+    def test_delete_requires_a_filter(self) -> None:
+        response = self.bulk_delete({}, self.user)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Product.objects.count(), 7)
+
 class ProductListViewTest(TestCase):
     def setUp(self) -> None:
         self.factory = RequestFactory()
@@ -285,7 +537,8 @@ class ProductListViewTest(TestCase):
         request = self.factory.get(reverse('products'))
         response = ProductListView.as_view()(request)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['next'])
 
 class CategoryCreateViewTest(TestCase):
     def setUp(self) -> None:
@@ -449,7 +702,7 @@ class WishListViewTest(TestCase):
             product_category = self.product_category,
         )
         self.wishlist = WishList.objects.create(user=self.user)
-        self.wishlist.products.add(self.product)
+        wishlists.add_products(self.wishlist, [self.product])
 
     def test_wishlist_view(self) -> None:
         request = self.factory.get(reverse('wishlist'))
@@ -475,8 +728,8 @@ class WishListUnauthTest(TestCase):
             product_category = self.product_category,
         )
         self.wishlist = WishList.objects.create(user=self.user)
-        self.wishlist.products.add(self.product)
-    
+        wishlists.add_products(self.wishlist, [self.product])
+
     def test_wishlist_any_access_view(self) -> None:
         request = self.factory.get(reverse('wish_list_unauthorized', kwargs={'uuid': self.user.id}))
         
@@ -489,4 +742,321 @@ class WishListUnauthTest(TestCase):
         request = self.factory.get(reverse('wish_list_unauthorized', kwargs={'uuid': 'aead'}))
         
         response = WishListUnauthorizedView.as_view()(request, uuid=self.user.id)
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+class ProductSearchViewTest(TestCase):
+    def setUp(self) -> None:
+        self.factory = RequestFactory()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.product_category = ProductCategory.objects.create(name="test", owner=self.user)
+        for name, rank in (('Red wine glass', 1), ('White wine glass', 5), ('Blue teapot', 9)):
+            Product.objects.create(
+                name=name,
+                price=50.00,
+                currency='EUR',
+                rank=rank,
+                owner=self.user,
+                product_category=self.product_category,
+            )
+
+    def search(self, query: str) -> list[str]:
+        request = self.factory.get(reverse('product_search') + query)
+        response = ProductSearchView.as_view()(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [product['name'] for product in response.data['results']]
+
+    def test_search_blends_relevance_with_rank(self) -> None:
+        self.assertEqual(self.search('?q=wine'), ['White wine glass', 'Red wine glass'])
+
+    def test_stronger_match_beats_higher_rank(self) -> None:
+        Product.objects.filter(name='Red wine glass').update(rank=1000)
+        relevance = Case(When(name='White wine glass', then=Value(0.6)), default=Value(0.3), output_field=FloatField())
+        queryset = order_by_score(Product.objects.filter(name__contains='wine').annotate(relevance=relevance))
+        self.assertEqual(list(queryset.values_list('name', flat=True)), ['White wine glass', 'Red wine glass'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Full-text relevance requires PostgreSQL')
+    def test_search_stronger_match_beats_higher_rank(self) -> None:
+        Product.objects.create(name='Wine wine', price=1, rank=5, owner=self.user,
+                               product_category=self.product_category)
+        Product.objects.filter(name='White wine glass').update(rank=6)
+        self.assertEqual(self.search('?q=wine')[:2], ['Wine wine', 'White wine glass'])
+
+    def test_search_pagination(self) -> None:
+        request = self.factory.get(reverse('product_search') + '?q=glass&limit=1')
+        response = ProductSearchView.as_view()(request)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIn('offset=1', response.data['next'])
+        self.assertNotIn('count', response.data)
+
+    def test_search_without_query(self) -> None:
+        self.assertEqual(self.search(''), [])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Trigram fallback requires PostgreSQL')
+    def test_search_with_typo(self) -> None:
+        self.assertEqual(self.search('?q=teapto'), ['Blue teapot'])
+
+
+class ProductSuggestViewTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.product_category = ProductCategory.objects.create(name="Wine accessories", owner=self.user)
+        for name, rank in (('Wine glass', 1), ('Wine opener', 5), ('Wine glass', 7), ('Red wine', 9)):
+            Product.objects.create(
+                name=name,
+                price=50.00,
+                currency='EUR',
+                rank=rank,
+                owner=self.user,
+                product_category=self.product_category,
+            )
+
+    def suggest(self, query: str) -> dict:
+        request = self.factory.get(reverse('product_suggest') + query)
+        response = ProductSuggestView.as_view()(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data: dict = response.data
+        return data
+
+    def test_suggest_prefix_by_rank(self) -> None:
+        data = self.suggest('?q=win')
+        self.assertEqual(data['products'], ['Wine glass', 'Wine opener'])
+        self.assertEqual(data['categories'], ['Wine accessories'])
+
+    def test_suggest_limit(self) -> None:
+        self.assertEqual(self.suggest('?q=WINE&limit=1')['products'], ['Wine glass'])
+
+    def test_suggest_is_invalidated_by_new_product(self) -> None:
+        self.suggest('?q=wine')
+        Product.objects.create(
+            name='Wine rack',
+            price=50.00,
+            currency='EUR',
+            rank=100,
+            owner=self.user,
+            product_category=self.product_category,
+        )
+        self.assertEqual(self.suggest('?q=wine')['products'][0], 'Wine rack')
+
+    def test_suggest_without_query(self) -> None:
+        self.assertEqual(self.suggest(''), {'products': [], 'categories': []})
+
+    def test_suggest_short_prefix(self) -> None:
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('?q=wi'), {'products': [], 'categories': []})
+        with override_settings(SUGGEST_MIN_LENGTH=1):
+            self.assertEqual(self.suggest('?q=w')['products'], ['Wine glass', 'Wine opener'])
+
+
+class ProductFacetsTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.category = ProductCategory.objects.create(name="kitchen", owner=self.user)
+        self.category2 = ProductCategory.objects.create(name="garden", owner=self.user)
+        for price, currency, category in ((10, 'EUR', self.category), (40, 'USD', self.category),
+                                          (120, 'EUR', self.category), (130, 'EUR', self.category2)):
+            Product.objects.create(
+                name='Product',
+                price=price,
+                currency=currency,
+                rank=1,
+                owner=self.user,
+                product_category=category,
+            )
+
+    def get(self, query: str) -> dict:
+        response = ProductListView.as_view()(self.factory.get(reverse('products') + query))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data: dict = response.data
+        return data
+
+    def test_facets_with_price_filter(self) -> None:
+        data = self.get('?facets=1&price_bucket=50&price_gt=20')
+        self.assertEqual(len(data['results']), 3)
+        self.assertEqual(data['facets'], {
+            'product_category': [
+                {'id': self.category.id, 'name': 'kitchen', 'count': 2},
+                {'id': self.category2.id, 'name': 'garden', 'count': 1},
+            ],
+            'currency': [{'value': 'EUR', 'count': 2}, {'value': 'USD', 'count': 1}],
+            'price': [{'min': 0.0, 'max': 50.0, 'count': 1}, {'min': 100.0, 'max': 150.0, 'count': 2}],
+        })
+
+    def test_facets_are_computed_in_one_query(self) -> None:
+        with self.assertNumQueries(1):
+            compute_facets(Product.objects.all())
+
+    def test_facets_are_cached_across_pages(self) -> None:
+        first = self.get('?facets=1&page_size=2')
+        with self.assertNumQueries(1):
+            second = self.get(first['next'][first['next'].index('?'):])
+        self.assertEqual(second['facets'], first['facets'])
+
+    def test_no_facets_by_default(self) -> None:
+        self.assertNotIn('facets', self.get(''))
+
+    def test_invalid_bucket_size(self) -> None:
+        for value in ('nan', 'inf', '-inf', '0', '-5', 'abc'):
+            with self.subTest(value=value):
+                response = ProductListView.as_view()(
+                    self.factory.get(reverse('products') + f'?facets=1&price_bucket={value}'))
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn('price_bucket', response.data)
+
+
+class StreamingListTest(TestCase):
+    def setUp(self) -> None:
+        self.factory = RequestFactory()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.product_category = ProductCategory.objects.create(name="test", owner=self.user)
+        self.wishlist = WishList.objects.create(user=self.user)
+        for i in range(5):
+            product = Product.objects.create(
+                name=f'Product{i}',
+                price=10.5 * i,
+                currency='EUR',
+                rank=i,
+                owner=self.user,
+                product_category=ProductCategory.objects.create(name=f"test{i}", owner=self.user),
+            )
+            wishlists.add_products(self.wishlist, [product])
+
+    def test_product_list_stream(self) -> None:
+        response = ProductListView.as_view()(self.factory.get(reverse('products') + '?stream=true&price_gt=20'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        streamed = json.loads(b''.join(response))
+
+        response = ProductListView.as_view()(self.factory.get(reverse('products') + '?price_gt=20'))
+        response.render()
+        self.assertEqual(streamed, json.loads(response.content)['results'])
+
+    def test_product_list_stream_ordering(self) -> None:
+        url = reverse('products') + '?ordering=-price'
+        response = ProductListView.as_view()(self.factory.get(url + '&stream=true'))
+        streamed = [item['price'] for item in json.loads(b''.join(response))]
+
+        response = ProductListView.as_view()(self.factory.get(url))
+        self.assertEqual(streamed, [item['price'] for item in response.data['results']])
+        self.assertEqual(streamed, sorted(streamed, reverse=True))
+
+    def test_wishlist_stream(self) -> None:
+        url = reverse('wish_list_unauthorized', kwargs={'uuid': self.user.id})
+        response = WishListUnauthorizedView.as_view()(self.factory.get(url + '?stream=1&rank=asc'), uuid=self.user.id)
+        self.assertTrue(response.streaming)
+        streamed = json.loads(b''.join(response))
+        self.assertEqual([item['name'] for item in streamed], [f'Product{i}' for i in reversed(range(5))])
+
+    def test_stream_is_json_only(self) -> None:
+        url = reverse('products') + '?stream=true'
+        response = ProductListView.as_view()(self.factory.get(url, HTTP_ACCEPT='application/msgpack'))
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+
+        json_etag = ProductListView.as_view()(self.factory.get(url))['ETag']
+        response = ProductListView.as_view()(self.factory.get(url, HTTP_ACCEPT='text/html,*/*;q=0.8'))
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response['ETag'], json_etag)
+
+    def test_empty_stream(self) -> None:
+        response = ProductListView.as_view()(self.factory.get(reverse('products') + '?stream=true&price_gt=1000'))
+        self.assertEqual(b''.join(response), b'[]')
+
+
+class ExportViewTest(TestCase):
+    def setUp(self) -> None:
+        self.export_root = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(EXPORT_ROOT=self.export_root.name)
+        self.settings_override.enable()
+        self.factory = RequestFactory()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.user2 = User.objects.create(email="test2@example.com", password="123456")
+        self.product_category = ProductCategory.objects.create(name="test", owner=self.user)
+        self.products = [
+            Product.objects.create(
+                name=f'Product{i}',
+                price=10.5 * i,
+                currency='EUR',
+                rank=i,
+                owner=self.user,
+                product_category=self.product_category,
+            )
+            for i in range(3)
+        ]
+        Product.objects.create(
+            name='Other', price=1, currency='EUR', rank=1, owner=self.user2,
+            product_category=ProductCategory.objects.create(name="other", owner=self.user2),
+        )
+        wishlist = WishList.objects.create(user=self.user2)
+        wishlists.add_products(wishlist, [self.products[1]])
+
+    def tearDown(self) -> None:
+        self.settings_override.disable()
+        self.export_root.cleanup()
+
+    def start(self, export_format: str) -> ExportJob:
+        request = self.factory.post(reverse('export_create'), data={'format': export_format}, format='json')
+        force_authenticate(request, self.user)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = ExportCreateView.as_view()(request)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertEqual(len(callbacks), 1)
+        run_export(response.data['id'])
+        return ExportJob.objects.get(id=response.data['id'])
+
+    def download(self, job: ExportJob, user: User) -> Any:
+        request = self.factory.get(reverse('export_download', kwargs={'id': job.id}))
+        force_authenticate(request, user)
+        return ExportDownloadView.as_view()(request, id=job.id)
+
+    def test_ndjson_export(self) -> None:
+        job = self.start('ndjson')
+        request = self.factory.get(reverse('export', kwargs={'id': job.id}))
+        force_authenticate(request, self.user)
+        response = ExportJobView.as_view()(request, id=job.id)
+        self.assertEqual(response.data['status'], 'done')
+        self.assertEqual(response.data['rows'], 3)
+        self.assertTrue(response.data['download'].endswith(reverse('export_download', kwargs={'id': job.id})))
+
+        content = gzip.decompress(b''.join(self.download(job, self.user).streaming_content))
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual([row['name'] for row in rows], ['Product0', 'Product1', 'Product2'])
+        self.assertEqual([row['wishlist_count'] for row in rows], [0, 1, 0])
+        self.assertEqual(rows[0]['product_category__name'], 'test')
+
+    def test_csv_export(self) -> None:
+        job = self.start('csv')
+        content = gzip.decompress(b''.join(self.download(job, self.user).streaming_content))
+        rows = list(csv.DictReader(io.StringIO(content.decode())))
+        self.assertEqual([row['name'] for row in rows], ['Product0', 'Product1', 'Product2'])
+        self.assertEqual(rows[1]['wishlist_count'], '1')
+
+    def test_export_from_another_user(self) -> None:
+        job = self.start('csv')
+        self.assertEqual(self.download(job, self.user2).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_download_of_a_removed_file(self) -> None:
+        job = self.start('csv')
+        export_path(job).unlink()
+        self.assertEqual(self.download(job, self.user).status_code, status.HTTP_404_NOT_FOUND)
+
+    def poll(self, job: ExportJob) -> Any:
+        request = self.factory.get(reverse('export', kwargs={'id': job.id}))
+        force_authenticate(request, self.user)
+        return ExportJobView.as_view()(request, id=job.id).data
+
+    def test_stale_job_is_failed_when_polled(self) -> None:
+        stale = ExportJob.objects.create(owner=self.user, status='running')
+        ExportJob.objects.filter(pk=stale.pk).update(updated_time=timezone.now() - timedelta(hours=2))
+        recent = ExportJob.objects.create(owner=self.user)
+
+        self.assertEqual(self.poll(recent)['status'], 'pending')
+        data = self.poll(stale)
+        self.assertEqual(data['status'], 'failed')
+        self.assertEqual(data['error'], 'The export was interrupted.')
+        with override_settings(EXPORT_STALE_AFTER=0):
+            self.assertEqual(self.download(recent, self.user).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(ExportJob.objects.get(pk=recent.pk).status, 'failed')
@@ -0,0 +1,275 @@
+"""
+This module contains test cases for the wishlist writes.
+
+It checks that:
+ - the one product per category rule is enforced by the database
+ - adding a product runs the same queries whatever the wishlist size
+ - the first add creates the wishlist
+ - a list of products is validated and added with set-based queries
+ - the wishlist sync applies the minimal difference
+ - wishlist items follow their product to another category, unless the
+   wishlist already holds a product of it
+ - the cached wishlists are invalidated on every change
+ - reading a wishlist never writes, and the empty wishlists are pruned
+"""
+
+import io
+import json
+from typing import Any
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import force_authenticate
+from product import cache as product_cache
+from product import wishlists
+from product.models import Product, ProductCategory, WishList, WishListItem
+from product.views import WishCreateView, WishListView
+from user.models import User
+
+
+class WishListTestCase(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create(email="test@example.com", password="123456")
+        self.categories = [ProductCategory.objects.create(name=f"category{i}", owner=self.user) for i in range(3)]
+        self.products = [
+            Product.objects.create(name=f'Product{i}', price=10, rank=i, owner=self.user,
+                                   product_category=self.categories[i % 3])
+            for i in range(6)
+        ]
+
+    def add(self, product: Product) -> Any:
+        request = self.factory.post(reverse('wishlist_create'), data={'product_id': product.id}, format='json')
+        force_authenticate(request, self.user)
+        return WishCreateView.as_view()(request)
+
+    def bulk_add(self, product_ids: list[int]) -> Any:
+        data = json.dumps([{'product_id': product_id} for product_id in product_ids])
+        request = self.factory.post(reverse('wishlist_create'), data=data, content_type='application/json')
+        force_authenticate(request, self.user)
+        return WishCreateView.as_view()(request)
+
+    def sync(self, product_ids: list[int]) -> Any:
+        data = json.dumps({'product_ids': product_ids})
+        request = self.factory.put(reverse('wishlist'), data=data, content_type='application/json')
+        force_authenticate(request, self.user)
+        return WishListView.as_view()(request)
+
+    def items(self) -> dict[int, int]:
+        return dict(WishListItem.objects.filter(wishlist__user=self.user).values_list('product_id', 'category_id'))
+
+
+class WishListAddTest(WishListTestCase):
+    def test_first_add_creates_the_wishlist(self) -> None:
+        self.assertEqual(self.add(self.products[0]).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(WishList.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(self.items(), {self.products[0].id: self.categories[0].id})
+
+    def test_wishlist_upsert(self) -> None:
+        wishlist = wishlists.get_or_create_wishlist(self.user)
+        self.assertEqual(wishlists.get_or_create_wishlist(self.user), wishlist)
+        self.assertEqual(WishList.objects.filter(user=self.user).count(), 1)
+
+    def test_one_product_per_category(self) -> None:
+        self.add(self.products[0])
+        for product in (self.products[3], self.products[0]):
+            response = self.add(product)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data['non_field_errors'],
+                             ['You can add only one product from each category to your wishlist'])
+        self.assertEqual(self.items(), {self.products[0].id: self.categories[0].id})
+
+    def test_constraint(self) -> None:
+        wishlist = WishList.objects.create(user=self.user)
+        WishListItem.objects.create(wishlist=wishlist, product=self.products[0], category=self.categories[0])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            WishListItem.objects.create(wishlist=wishlist, product=self.products[3], category=self.categories[0])
+
+    def test_other_integrity_errors_are_raised(self) -> None:
+        wishlist = WishList.objects.create(user=self.user)
+        error = IntegrityError('FOREIGN KEY constraint failed')
+        with mock.patch.object(WishListItem.objects, 'bulk_create', side_effect=error):
+            with self.assertRaisesMessage(IntegrityError, 'FOREIGN KEY'):
+                wishlists.add_products(wishlist, [self.products[0]])
+
+    def test_add_queries_do_not_depend_on_the_wishlist_size(self) -> None:
+        self.add(self.products[0])
+        self.add(self.products[1])
+        for i in range(20):
+            category = ProductCategory.objects.create(name=f"more{i}", owner=self.user)
+            self.add(Product.objects.create(name=f'More{i}', price=1, rank=1, owner=self.user, product_category=category))
+
+        # The product, the wishlist and the insert in its savepoint.
+        with self.assertNumQueries(5):
+            self.assertEqual(self.add(self.products[2]).status_code, status.HTTP_201_CREATED)
+
+    def test_add_invalidates_the_cached_wishlist(self) -> None:
+        self.add(self.products[0])
+        version = product_cache.get_wishlist_version(self.user.id)
+        self.add(self.products[1])
+        self.assertNotEqual(product_cache.get_wishlist_version(self.user.id), version)
+
+
+class WishListBulkAddTest(WishListTestCase):
+    def test_bulk_add(self) -> None:
+        response = self.bulk_add([p.id for p in self.products[:3]])
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, [{'product_id': p.id} for p in self.products[:3]])
+        self.assertEqual(self.items(), {p.id: p.product_category_id for p in self.products[:3]})
+
+    def test_bulk_add_runs_constant_queries(self) -> None:
+        wishlists.add_products(wishlists.get_or_create_wishlist(self.user), [self.products[0]])
+        categories = [ProductCategory.objects.create(name=f"more{i}", owner=self.user) for i in range(20)]
+        products = [
+            Product.objects.create(name=f'More{i}', price=1, rank=1, owner=self.user, product_category=category)
+            for i, category in enumerate(categories)
+        ]
+        # The products, the taken categories, the wishlist and the insert in its savepoint.
+        with self.assertNumQueries(6):
+            response = self.bulk_add([p.id for p in products])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_conflicts_within_the_list_and_with_the_wishlist(self) -> None:
+        self.add(self.products[0])
+        # products[3] shares the category of products[0], products[4] that of products[1].
+        response = self.bulk_add([self.products[1].id, self.products[3].id, self.products[4].id])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('product_id', response.data[1])
+        self.assertIn('product_id', response.data[2])
+        self.assertEqual(self.items(), {self.products[0].id: self.categories[0].id})
+
+    def test_invalid_product(self) -> None:
+        response = self.bulk_add([self.products[1].id, 0])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[1], {'product_id': ['Invalid product id']})
+        self.assertEqual(self.items(), {})
+
+
+class WishListSyncTest(WishListTestCase):
+    def test_sync_applies_the_difference(self) -> None:
+        self.bulk_add([self.products[0].id, self.products[1].id])
+        version = product_cache.get_wishlist_version(self.user.id)
+
+        # products[3] replaces products[0] in its category.
+        response = self.sync([self.products[1].id, self.products[3].id, self.products[2].id])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'added': [self.products[2].id, self.products[3].id], 'removed': [self.products[0].id]})
+        self.assertEqual(set(self.items()), {self.products[1].id, self.products[2].id, self.products[3].id})
+        self.assertNotEqual(product_cache.get_wishlist_version(self.user.id), version)
+
+    def test_sync_without_changes(self) -> None:
+        self.bulk_add([self.products[0].id])
+        response = self.sync([self.products[0].id])
+        self.assertEqual(response.data, {'added': [], 'removed': []})
+
+        response = self.sync([])
+        self.assertEqual(response.data, {'added': [], 'removed': [self.products[0].id]})
+        self.assertEqual(self.items(), {})
+
+    def test_invalid_sync(self) -> None:
+        self.bulk_add([self.products[0].id])
+        for product_ids in ([self.products[1].id, self.products[4].id], [self.products[1].id, 0]):
+            with self.subTest(product_ids=product_ids):
+                response = self.sync(product_ids)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn('product_ids', response.data)
+        self.assertEqual(self.items(), {self.products[0].id: self.categories[0].id})
+
+
+class WishListCategorySyncTest(WishListTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.wishlist = WishList.objects.create(user=self.user)
+        wishlists.add_products(self.wishlist, self.products[:2])
+
+    def test_item_follows_its_product(self) -> None:
+        product = self.products[0]
+        product.product_category = self.categories[2]
+        product.save()
+        self.assertEqual(self.items(), {product.id: self.categories[2].id, self.products[1].id: self.categories[1].id})
+
+    def test_move_to_a_category_of_the_wishlist_keeps_the_item(self) -> None:
+        version = product_cache.get_wishlist_version(self.user.id)
+        product = self.products[0]
+        product.product_category = self.categories[1]
+        with self.assertLogs('product.wishlists', 'WARNING'):
+            product.save()
+
+        self.assertEqual(self.items(), {product.id: self.categories[0].id, self.products[1].id: self.categories[1].id})
+        self.assertNotEqual(product_cache.get_wishlist_version(self.user.id), version)
+
+    def test_item_left_in_place_blocks_the_move_to_its_category(self) -> None:
+        wishlists.add_products(self.wishlist, self.products[2:3])
+        first, second = self.products[:2]
+        Product.objects.filter(pk=first.pk).update(product_category=self.categories[1])
+        Product.objects.filter(pk=second.pk).update(product_category=self.categories[2])
+        with self.assertLogs('product.wishlists', 'WARNING'):
+            conflicts = wishlists.products_changed([first.pk, second.pk])
+
+        self.assertEqual(sorted(conflicts), [(first.id, self.wishlist.id), (second.id, self.wishlist.id)])
+        self.assertEqual(self.items(), {first.id: self.categories[0].id, second.id: self.categories[1].id,
+                                        self.products[2].id: self.categories[2].id})
+
+    def test_products_swapping_categories(self) -> None:
+        first, second = self.products[:2]
+        Product.objects.filter(pk=first.pk).update(product_category=self.categories[1])
+        Product.objects.filter(pk=second.pk).update(product_category=self.categories[0])
+        wishlists.products_changed([first.pk, second.pk])
+
+        self.assertEqual(self.items(), {first.id: self.categories[1].id, second.id: self.categories[0].id})
+
+
+class WishListReadTest(WishListTestCase):
+    def get(self) -> Any:
+        request = self.factory.get(reverse('wishlist'))
+        force_authenticate(request, self.user)
+        return WishListView.as_view()(request)
+
+    def test_read_without_a_wishlist_does_not_write(self) -> None:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'products': [], 'total': {'amount': 0.0, 'currency': 'USD', 'complete': True}})
+        self.assertTrue(all(query['sql'].startswith('SELECT') for query in queries.captured_queries))
+        self.assertFalse(WishList.objects.exists())
+
+    def test_emptying_a_missing_wishlist_does_not_create_it(self) -> None:
+        self.assertEqual(self.sync([]).data, {'added': [], 'removed': []})
+        self.assertFalse(WishList.objects.exists())
+
+
+class PruneWishListsTest(WishListTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.kept = WishList.objects.create(user=self.user)
+        wishlists.add_products(self.kept, [self.products[0]])
+        for i in range(5):
+            WishList.objects.create(user=User.objects.create(email=f"empty{i}@example.com", password="123456"))
+
+    def test_prunes_the_empty_wishlists_in_batches(self) -> None:
+        self.assertEqual(wishlists.prune_empty(batch_size=2), 5)
+        self.assertEqual(list(WishList.objects.all()), [self.kept])
+        self.assertEqual(self.items(), {self.products[0].id: self.categories[0].id})
+
+    def test_items_are_the_only_reference(self) -> None:
+        # The wishlists are deleted without the collector, a new reference must be handled by prune_empty().
+        self.assertEqual({relation.related_model for relation in WishList._meta.related_objects}, {WishListItem})
+
+    def test_command(self) -> None:
+        out = io.StringIO()
+        call_command('prune_wishlists', batch_size=2, stdout=out)
+        self.assertIn('Deleted 5 empty wishlists', out.getvalue())
+        self.assertEqual(WishList.objects.count(), 1)
@@ -1,17 +1,27 @@
 from django.urls import path
-from .views import ProductListView, ProductCreateView, CategoryListView, CategoryCreateView, ProductUpdateView, CategoryDeleteView,WishListView, WishCreateView, WishListUnauthorizedView, ProductDeleteView, ProductView
+from .views import ProductListView, ProductCreateView, CategoryListView, CategoryCreateView, ProductUpdateView, CategoryDeleteView,WishListView, WishCreateView, WishListUnauthorizedView, ProductDeleteView, ProductView, ProductSearchView, ProductSuggestView, ExportCreateView, ExportJobView, ExportDownloadView, ProductBulkUpdateView, ProductBulkDeleteView, CategoryLeaderboardView, ExchangeRateView, ProductTrendingView
 
 urlpatterns = [
     path('products', ProductListView.as_view(), name='products'),
+    path('products/search', ProductSearchView.as_view(), name='product_search'),
+    path('products/suggest', ProductSuggestView.as_view(), name='product_suggest'),
+    path('products/trending', ProductTrendingView.as_view(), name='product_trending'),
     path('products/add', ProductCreateView.as_view(), name='product_create'),
+    path('products/edit', ProductBulkUpdateView.as_view(), name='product_bulk_update'),
     path('products/edit/<int:id>', ProductUpdateView.as_view(), name='product_update'),
+    path('products/delete', ProductBulkDeleteView.as_view(), name='product_bulk_delete'),
     path('products/delete/<int:id>', ProductDeleteView.as_view(), name='product_delete'),
     path('products/<int:id>', ProductView.as_view(), name='product'),
     path('categories', CategoryListView.as_view(), name='categories'),
     path('categories/add', CategoryCreateView.as_view(), name='categories_create'),
     path('categories/delete/<int:id>', CategoryDeleteView.as_view(), name='category_delete'),
+    path('categories/<int:id>/top', CategoryLeaderboardView.as_view(), name='category_top'),
     path('wishlist', WishListView.as_view(), name='wishlist'),
     path('wishlist/add', WishCreateView.as_view(), name='wishlist_create'),
     path('wishlist/<uuid>', WishListUnauthorizedView.as_view(), name='wish_list_unauthorized'),
+    path('fx-rates', ExchangeRateView.as_view(), name='fx_rates'),
+    path('exports', ExportCreateView.as_view(), name='export_create'),
+    path('exports/<uuid:id>', ExportJobView.as_view(), name='export'),
+    path('exports/<uuid:id>/download', ExportDownloadView.as_view(), name='export_download'),
 
 ]
@@ -1,17 +1,34 @@
 from django.shortcuts import render
-from rest_framework.generics import CreateAPIView, UpdateAPIView, ListAPIView, RetrieveAPIView, DestroyAPIView
+from rest_framework.generics import CreateAPIView, UpdateAPIView, ListAPIView, RetrieveAPIView, DestroyAPIView, GenericAPIView
 from rest_framework.permissions import IsAuthenticated, BasePermission, AllowAny
-from .models import Product, ProductCategory, WishList
-from .serializers import ProductCreateSerializer, ProductListSerializer, ProductCategorySerializer, ProductCategoryCreateSerializer, WishListSerializer, WishListCreateSerializer, WishListUnauthorizedSerializer
+from .models import Product, ProductCategory, ProductPopularity, WishList, ExportJob
+from .serializers import ProductCreateSerializer, ProductListSerializer, ProductCategorySerializer, ProductCategoryCreateSerializer, WishListSerializer, WishListCreateSerializer, WishListUnauthorizedSerializer, ExportJobSerializer, ProductBulkUpdateSerializer, ProductExpressionUpdateSerializer, ProductBulkDeleteSerializer, ExchangeRatesSerializer, WishListSyncSerializer, ProductPopularitySerializer
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.response import Response
 from uuid import uuid4
-from user.models import User
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.request import Request
-from typing import Any
+from typing import Any, cast
+from django.db.models import Count, Q, Sum
 from django.db.models.query import QuerySet
+from .pagination import KeysetPagination, TrendingPagination, UncountedLimitOffsetPagination, WishListPagination
+from .optimizers import OptimizedQuerySetMixin
+from . import cache as product_cache
+from .conditional import ConditionalGetMixin, make_etag
+from .search import get_suggest_min_length, search_products, suggest_names
+from .facets import DEFAULT_BUCKET_SIZE, MIN_BUCKET_SIZE, compute_facets
+from .streaming import StreamingListMixin
+from .fastserializers import FastSerializerMixin
+from .exports import export_path, fail_if_stale, start_export
+from . import fx
+from django.db import transaction
+from django.http import FileResponse, Http404, HttpResponseBase
+from rest_framework.views import APIView
+from uuid import UUID
+from user.models import User
+import math
 
 # Create your views here.
 
@@ -20,15 +37,33 @@ class ISAuthorized(BasePermission):
         if obj.owner == request.user:
             return True
         return False
+class IsAdmin(BasePermission):
+    def has_permission(self, request: Request, view: Any) -> bool:
+        return bool(request.user and request.user.is_authenticated and getattr(request.user, 'is_admin', False))
 @swagger_auto_schema(security=[])    
-class ProductView(RetrieveAPIView):
+class ProductView(ConditionalGetMixin, FastSerializerMixin, OptimizedQuerySetMixin, RetrieveAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductListSerializer
     permission_classes = [AllowAny]
     lookup_field = 'id'
 
+    def get_etag(self, request: Request, *args: Any, **kwargs: Any) -> str | None:
+        return make_etag(
+            request, kwargs['id'], product_cache.get_product_version(kwargs['id']), product_cache.query_signature(request))
+
+    def retrieve(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        # Sparse fieldsets are cached as variants of the product.
+        variant = product_cache.query_signature(request)
+        data = product_cache.get_product(kwargs['id'], variant)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+        response = super().retrieve(request, *args, **kwargs)
+        product_cache.set_product(kwargs['id'], response.data, variant)
+        response['X-Cache'] = 'MISS'
+        return response
+
     @swagger_auto_schema(security=[])
-    def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
         return super().get(request, *args, **kwargs)
 class ProductCreateView(CreateAPIView):
     queryset = Product.objects.all()
@@ -52,25 +87,192 @@ class ProductUpdateView(UpdateAPIView):
     serializer_class = ProductCreateSerializer
     permission_classes=[IsAuthenticated & ISAuthorized]
     lookup_field = 'id'
-class ProductListView(ListAPIView):
+
+class ProductBulkUpdateView(GenericAPIView):
+    """
+    Update many products of the requesting user at once.
+
+    The request data is either:
+        - a list of partial updates, each with the `id` of the product to
+          update, applied with one bulk_update
+        - an object with an optional `filter` (ids, product_category, currency,
+          price_gt, price_lt) and a `price` and/or `rank` expression, each one
+          of {"set": x}, {"add": x} or {"multiply": x}, applied with one UPDATE
+
+    Returns the number of updated products.
+    """
+    authentication_classes = [JWTAuthentication]
+    serializer_class = ProductBulkUpdateSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self) -> QuerySet[Product]:
+        return Product.objects.filter(owner=cast(User, self.request.user))
+
+    def patch(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        if isinstance(request.data, list):
+            serializer = self.get_serializer(self.get_queryset(), data=request.data, many=True, partial=True)
+            serializer.is_valid(raise_exception=True)
+            products = serializer.save()
+            return Response({'updated': len(products), 'ids': [product.id for product in products]})
+        serializer = ProductExpressionUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({'updated': serializer.apply(self.get_queryset())})
+
+class ProductListView(ConditionalGetMixin, FastSerializerMixin, StreamingListMixin, OptimizedQuerySetMixin, ListAPIView):
     serializer_class = ProductListSerializer
     permission_classes = [AllowAny]
+    pagination_class = KeysetPagination
+    # The largest responses, worth more CPU per byte saved.
+    compression_levels = {'br': 5, 'gzip': 6}
     def get_queryset(self) -> QuerySet[Product]:
         queryset = Product.objects.all()
         price_gt = self.request.query_params.get('price_gt', None)
         price_lt = self.request.query_params.get('price_lt', None)
+        price_currency = self.request.query_params.get('price_currency', None)
 
+        if price_currency:
+            # The bounds are in `price_currency` and compared with the prices
+            # of every currency, through their value in the base currency.
+            return self.filter_price_base(queryset, price_gt, price_lt, price_currency)
         if price_gt:
             queryset = queryset.filter(price__gt=price_gt)
         if price_lt:
             queryset = queryset.filter(price__lt=price_lt)
         
         return queryset
+
+    def filter_price_base(self, queryset: QuerySet[Product], price_gt: str | None, price_lt: str | None,
+                          currency: str) -> QuerySet[Product]:
+        rates = fx.get_rates()
+        if currency not in rates:
+            raise ValidationError({'price_currency': f'No exchange rate for {currency}'})
+        for lookup, value in (('price_base__gt', price_gt), ('price_base__lt', price_lt)):
+            if not value:
+                continue
+            try:
+                queryset = queryset.filter(**{lookup: fx.to_base(float(value), currency, rates)})
+            except ValueError:
+                raise ValidationError({lookup.replace('price_base', 'price'): 'A number is required.'})
+        return queryset
+
+    def get_etag(self, request: Request, *args: Any, **kwargs: Any) -> str | None:
+        return make_etag(request, product_cache.list_key(request))
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        key = product_cache.list_key(request)
+        data = product_cache.get_list(key)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get('facets') in ('1', 'true'):
+            response.data['facets'] = self.get_facets(request)
+        product_cache.set_list(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def get_facets(self, request: Request) -> dict:
+        """
+        Facet counts of the filtered products, cached per filter signature so
+        that paging through the results does not recompute them.
+        """
+        paginator = cast(KeysetPagination, self.paginator)
+        key = product_cache.facets_key(request, exclude=(
+            'facets', paginator.cursor_query_param, paginator.ordering_query_param, paginator.page_size_query_param))
+        facets: dict | None = product_cache.get_list(key, kind='facets')
+        if facets is None:
+            facets = compute_facets(self.get_queryset(), self.get_bucket_size(request))
+            product_cache.set_list(key, facets)
+        return facets
+
+    def get_bucket_size(self, request: Request) -> float:
+        value = request.query_params.get('price_bucket')
+        if value is None:
+            return DEFAULT_BUCKET_SIZE
+        try:
+            bucket_size = float(value)
+        except ValueError:
+            bucket_size = math.nan
+        # float() also accepts 'nan' and 'inf', which can not size a bucket.
+        if not math.isfinite(bucket_size) or bucket_size <= 0:
+            raise ValidationError({'price_bucket': 'A positive number is required.'})
+        return max(bucket_size, MIN_BUCKET_SIZE)
     
     @swagger_auto_schema(security=[])
-    def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
         return super().get(request, *args, **kwargs)
     
+class ProductSearchView(OptimizedQuerySetMixin, ListAPIView):
+    serializer_class = ProductListSerializer
+    permission_classes = [AllowAny]
+    pagination_class = UncountedLimitOffsetPagination
+
+    def get_queryset(self) -> QuerySet[Product]:
+        query = self.request.query_params.get('q', '').strip()
+        if not query:
+            return Product.objects.none()
+        return search_products(Product.objects.all(), query)
+
+    @swagger_auto_schema(security=[])
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        return super().get(request, *args, **kwargs)
+
+class ProductSuggestView(APIView):
+    """
+    Typeahead completions for product and category names.
+
+    Query parameters:
+        - q: the prefix typed so far, completed from `settings.SUGGEST_MIN_LENGTH`
+          characters on
+        - limit: maximum number of completions of each kind
+    """
+    permission_classes = [AllowAny]
+    default_limit = 10
+    max_limit = 20
+    # Called on every keystroke, latency matters more than bytes.
+    compression_levels = {'br': 1, 'gzip': 1}
+
+    @swagger_auto_schema(security=[])
+    def get(self, request: Request) -> Response:
+        prefix = request.query_params.get('q', '').strip()
+        if len(prefix) < get_suggest_min_length():
+            return Response({'products': [], 'categories': []})
+        try:
+            limit = max(1, min(int(request.query_params['limit']), self.max_limit))
+        except (KeyError, ValueError):
+            limit = self.default_limit
+
+        key = product_cache.suggest_key(prefix, limit)
+        data = product_cache.get_list(key, kind='suggest')
+        if data is None:
+            data = suggest_names(prefix, limit)
+            product_cache.set_list(key, data)
+        return Response(data)
+
+class ProductTrendingView(OptimizedQuerySetMixin, ListAPIView):
+    """
+    The products most added to wishlists lately, from the counters of
+    `product.popularity`.
+
+    Query parameters:
+        - ordering: `-score` (trending, the default) or `-wished` (most
+          wished-for), see TrendingPagination
+    """
+    serializer_class = ProductPopularitySerializer
+    permission_classes = [AllowAny]
+    pagination_class = TrendingPagination
+
+    def get_queryset(self) -> QuerySet[ProductPopularity]:
+        # The paginator skips the products never added, whose score is NULL,
+        # and the products in no wishlist anymore are left out of the counts.
+        queryset = ProductPopularity.objects.all()
+        if cast(TrendingPagination, self.paginator).get_ordering(self.request)[0].lstrip('-') == 'wished':
+            queryset = queryset.filter(wished__gt=0)
+        return queryset
+
+    @swagger_auto_schema(security=[])
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        return super().get(request, *args, **kwargs)
+
 class ProductDeleteView(DestroyAPIView):
     serializer_class = ProductListSerializer
     queryset = Product.objects.all()
@@ -82,12 +284,53 @@ class ProductDeleteView(DestroyAPIView):
         self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-class CategoryListView(ListAPIView):
+class ProductBulkDeleteView(GenericAPIView):
+    """
+    Delete many products of the requesting user at once.
+
+    Request data, at least one of:
+        - ids: list of product ids
+        - product_category, currency, price_gt, price_lt: product filters
+
+    The products are removed from every wishlist as well. Returns the number
+    of deleted products.
+    """
+    authentication_classes = [JWTAuthentication]
+    serializer_class = ProductBulkDeleteSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self) -> QuerySet[Product]:
+        return Product.objects.filter(owner=cast(User, self.request.user))
+
+    def delete(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        serializer = ProductBulkDeleteSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        return Response({'deleted': serializer.apply(self.get_queryset())})
+
+class CategoryListView(OptimizedQuerySetMixin, ListAPIView):
     queryset = ProductCategory.objects.all()
     serializer_class = ProductCategorySerializer
     permission_classes = [IsAuthenticated, ISAuthorized]
 
 
+class CategoryLeaderboardView(ConditionalGetMixin, FastSerializerMixin, OptimizedQuerySetMixin, ListAPIView):
+    """
+    The top ranked products of a category, best first, read from the
+    materialized leaderboard.
+    """
+    serializer_class = ProductListSerializer
+    permission_classes = [AllowAny]
+
+    def get_queryset(self) -> QuerySet[Product]:
+        return Product.objects.filter(leaderboard_entry__category_id=self.kwargs['id']).order_by('leaderboard_entry__position')
+
+    def get_etag(self, request: Request, *args: Any, **kwargs: Any) -> str | None:
+        return make_etag(request, kwargs['id'], product_cache.list_key(request))
+
+    @swagger_auto_schema(security=[])
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        return super().get(request, *args, **kwargs)
+
 class CategoryCreateView(CreateAPIView):
     queryset = ProductCategory.objects.all()
     authentication_classes = [JWTAuthentication]
@@ -107,50 +350,184 @@ class CategoryDeleteView(DestroyAPIView):
         instance = self.get_object()
         self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
-class WishListView(RetrieveAPIView):
+class WishListView(OptimizedQuerySetMixin, RetrieveAPIView):
+    """
+    The wishlist of the requesting user and the total of its prices. PUT
+    replaces its products, see WishListSyncSerializer.
+
+    Query parameters:
+        - currency: currency of the total, the base currency by default
+    """
     serializer_class = WishListSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_queryset(self) -> QuerySet[WishList]:
+        # The total is summed in SQL from the prices in the base currency.
+        return WishList.objects.annotate(
+            price_base_total=Sum('products__price_base'),
+            unpriced_count=Count('products', filter=Q(products__price_base__isnull=True)),
+        )
+
     def get_object(self) -> WishList:
-        user = self.request.user
-        wishlist, _ = WishList.objects.prefetch_related('products').get_or_create(user=user)
-        return wishlist
+        # Read-only: a user who never added a product gets an unsaved empty
+        # wishlist, the row is created by the first add.
+        user = cast(User, self.request.user)
+        try:
+            wishlist: WishList = self.filter_queryset(self.get_queryset()).get(user=user)
+            return wishlist
+        except WishList.DoesNotExist:
+            return WishList(user=user)
+
+    @swagger_auto_schema(request_body=WishListSyncSerializer)
+    def put(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """
+        Replace the products of the wishlist with `product_ids`, and return
+        the ids of the added and removed products.
+        """
+        serializer = WishListSyncSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.save())
 
 class WishCreateView(CreateAPIView):
+    """
+    Add a product to the wishlist of the requesting user, or a list of
+    products at once when the request data is a list.
+    """
     serializer_class = WishListCreateSerializer
     permission_classes = [IsAuthenticated]
 
     def get_serializer_context(self) -> dict:
         return {'request': self.request}
 
-class WishListUnauthorizedView(ListAPIView):
+    def create(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        serializer = self.get_serializer(data=request.data, many=isinstance(request.data, list))
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+class WishListUnauthorizedView(ConditionalGetMixin, FastSerializerMixin, StreamingListMixin, OptimizedQuerySetMixin, ListAPIView):
     serializer_class = ProductListSerializer
     permission_classes = [AllowAny]
+    pagination_class = WishListPagination
+    compression_levels = {'br': 5, 'gzip': 6}
 
-    def get_queryset(self) -> QuerySet[Product]:
+    def get_user_id(self) -> UUID | None:
         try:
-            user = User.objects.get(id=self.kwargs['uuid'])
-        except User.DoesNotExist:
-            user = None
+            return UUID(str(self.kwargs['uuid']))
+        except ValueError:
+            return None
+
+    def get_queryset(self) -> QuerySet[Product]:
+        # Filtered on the wishlist user id, an unknown user simply has no products.
+        user_id = self.get_user_id()
+        if user_id is None:
+            return Product.objects.none()
         
-        created_time = self.request.query_params.get('created_time', None)
-        rank = self.request.query_params.get('rank', None)
-
-        queryset = Product.objects.filter(whishlist_products__user = user)
-
-        if created_time:
-            if created_time == 'asc':
-                queryset = queryset.order_by('-created_time')
-            else:
-                queryset = queryset.order_by('created_time')
-        if rank:
-            if rank == 'asc':
-                queryset = queryset.order_by('-rank')
-            else:
-                queryset = queryset.order_by('rank')
+        queryset = Product.objects.filter(whishlist_products__user_id = user_id)
+        # One ORDER BY over every requested key, the paginator adds the id and the keyset.
+        return queryset.order_by(*cast(WishListPagination, self.paginator).get_ordering(self.request))
 
-        return queryset
+    def get_etag(self, request: Request, *args: Any, **kwargs: Any) -> str | None:
+        user_id = self.get_user_id()
+        if user_id is None:
+            return None
+        return make_etag(request, product_cache.wishlist_key(request, user_id))
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        user_id = self.get_user_id()
+        if user_id is None:
+            return super().list(request, *args, **kwargs)
+        # Rendered once per user and query, sort option included.
+        key = product_cache.wishlist_key(request, user_id)
+        data = product_cache.get_list(key, kind='wishlist')
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+        response = super().list(request, *args, **kwargs)
+        product_cache.set_list(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
     
+    @swagger_auto_schema(security=[])
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        return super().get(request, *args, **kwargs)
+
+class ExchangeRateView(GenericAPIView):
+    """
+    The exchange rates used to compare prices across currencies.
+
+    GET returns `{"base": "USD", "rates": {"EUR": 1.08}}`, each rate being
+    the value of one unit of the currency in the base currency. PUT, for
+    admins, takes the same object, stores the rates and reprices the
+    products of the currencies whose rate changed.
+    """
+    serializer_class = ExchangeRatesSerializer
+
+    def get_permissions(self) -> list[BasePermission]:
+        if self.request.method == 'GET':
+            return [AllowAny()]
+        return [IsAuthenticated(), IsAdmin()]
+
+    def get_rates(self) -> dict:
+        base = fx.get_base_currency()
+        rates = {currency: rate for currency, rate in sorted(fx.get_rates().items()) if currency != base}
+        return {'base': base, 'rates': rates}
+
     @swagger_auto_schema(security=[])
     def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
-        return super().get(request, *args, **kwargs)
\ No newline at end of file
+        return Response(self.get_rates())
+
+    def put(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated = serializer.save()
+        return Response({**self.get_rates(), 'updated': updated})
+
+class ExportCreateView(CreateAPIView):
+    """
+    Start a background export of the owner's catalog.
+
+    Required fields in request data:
+        - format: ndjson or csv
+
+    Returns the export job, whose status can be polled until the file can be
+    downloaded.
+    """
+    serializer_class = ExportJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def perform_create(self, serializer: Any) -> None:
+        job = serializer.save(owner=self.request.user)
+        transaction.on_commit(lambda: start_export(job.pk))
+
+    def create(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+class ExportJobView(RetrieveAPIView):
+    serializer_class = ExportJobSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_field = 'id'
+
+    def get_queryset(self) -> QuerySet[ExportJob]:
+        return ExportJob.objects.filter(owner=cast(User, self.request.user))
+
+    def get_object(self) -> ExportJob:
+        job: ExportJob = super().get_object()
+        fail_if_stale(job)
+        return job
+
+class ExportDownloadView(ExportJobView):
+
+    def retrieve(self, request: Request, *args: Any, **kwargs: Any) -> FileResponse:  # type: ignore[override]
+        job = self.get_object()
+        if job.status != 'done':
+            raise Http404
+        path = export_path(job)
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            # Removed from EXPORT_ROOT since the job finished.
+            raise Http404
+        return FileResponse(file, as_attachment=True, filename=path.name, content_type='application/gzip')
+
@@ -0,0 +1,234 @@
+"""
+This module contains the writes to the wishlists.
+
+A wishlist holds at most one product per category. Every WishListItem
+carries the category of its product under a `(wishlist, category)` unique
+constraint, so adding a product is a single INSERT that the database
+rejects when the wishlist already holds a product of that category,
+however large the wishlist is and however many adds race. The category of
+an item follows its product through `products_changed()`, unless the
+wishlist already holds a product of the new category: the item then keeps
+its former category, and the conflict is logged, rather than the shopper
+losing it to a change of the merchant.
+
+The items are written directly rather than through `WishList.products`, so
+`m2m_changed` is sent here, as the related manager would send it. The public
+wishlists embed their products, so the writes to the products and their
+categories invalidate the cached wishlists holding them through
+`products_changed()`, `products_deleted()` and `categories_changed()`.
+"""
+
+import logging
+from typing import Any, Iterable
+
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.signals import m2m_changed
+
+from . import cache as product_cache
+from .models import Product, WishList, WishListItem
+
+
+CATEGORY_TAKEN = 'You can add only one product from each category to your wishlist'
+PRUNE_BATCH_SIZE = 1000
+CATEGORY_CONSTRAINT = 'wishlist_category_uniq'
+
+logger = logging.getLogger(__name__)
+
+
+class CategoryConflict(ValueError):
+    """The wishlist already holds a product of the category, or the product itself."""
+
+
+def get_or_create_wishlist(user: Any) -> WishList:
+    """
+    Return the wishlist of `user`, creating it with an upsert if needed.
+    Only the writes call it, the reads make do without a row.
+    """
+    try:
+        return WishList.objects.get(user=user)
+    except WishList.DoesNotExist:
+        pass
+    # INSERT ... ON CONFLICT DO NOTHING, so concurrent first adds agree on
+    # one wishlist instead of one of them failing.
+    WishList.objects.bulk_create([WishList(user=user)], ignore_conflicts=True)
+    return WishList.objects.get(user=user)
+
+
+def send_changed(instance: WishList | Product, action: str, pk_set: set[Any]) -> None:
+    reverse = isinstance(instance, Product)
+    m2m_changed.send(
+        sender=WishListItem, instance=instance, action=action, reverse=reverse,
+        model=WishList if reverse else Product, pk_set=pk_set, using=WishListItem.objects.db)
+
+
+def add_products(wishlist: WishList, products: Iterable[Product]) -> None:
+    """
+    Add `products` to `wishlist` with one INSERT, raising CategoryConflict
+    when that would put two products of a category in the wishlist.
+    """
+    items = [
+        WishListItem(wishlist=wishlist, product=product, category_id=product.product_category_id)
+        for product in products
+    ]
+    if not items:
+        return
+    product_ids = {item.product_id for item in items}
+    try:
+        with transaction.atomic():
+            send_changed(wishlist, 'pre_add', product_ids)
+            WishListItem.objects.bulk_create(items)
+    except IntegrityError as e:
+        # Other failures, such as the wishlist pruned meanwhile, are not the shopper's to fix.
+        if not is_category_conflict(e):
+            raise
+        raise CategoryConflict(CATEGORY_TAKEN)
+    send_changed(wishlist, 'post_add', product_ids)
+
+
+def is_category_conflict(error: IntegrityError) -> bool:
+    """
+    Whether `error` violates the (wishlist, category) or the (wishlist,
+    product) unique constraint, both meaning the product can not be added.
+    """
+    message = str(error)
+    table = WishListItem._meta.db_table
+    # PostgreSQL names the constraint, SQLite lists its columns.
+    return any(marker in message for marker in (
+        CATEGORY_CONSTRAINT, f'{table}_wishlist_id_product_id_',
+        f'{table}.wishlist_id, {table}.category_id', f'{table}.wishlist_id, {table}.product_id',
+    ))
+
+
+def remove_products(wishlist: WishList, product_ids: Iterable[Any]) -> None:
+    """Remove `product_ids` from `wishlist` with one DELETE."""
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+    with transaction.atomic():
+        send_changed(wishlist, 'pre_remove', product_ids)
+        WishListItem.objects.filter(wishlist=wishlist, product_id__in=product_ids).delete()
+    send_changed(wishlist, 'post_remove', product_ids)
+
+
+def sync_products(wishlist: WishList, products: Iterable[Product]) -> tuple[list[Any], list[Any]]:
+    """
+    Make `products` the content of `wishlist` with at most one DELETE and one
+    INSERT, and return the ids of the added and removed products.
+    """
+    wanted = {product.pk: product for product in products}
+    with transaction.atomic():
+        # Concurrent syncs of a wishlist apply one after the other.
+        list(WishList.objects.select_for_update().filter(pk=wishlist.pk).values_list('pk'))
+        current = set(WishListItem.objects.filter(wishlist=wishlist).values_list('product_id', flat=True))
+        removed = sorted(current - wanted.keys())
+        added = [product for pk, product in sorted(wanted.items()) if pk not in current]
+        # Removed first, a product can replace another of its category.
+        remove_products(wishlist, removed)
+        add_products(wishlist, added)
+    return [product.pk for product in added], removed
+
+
+def products_changed(product_ids: Iterable[Any]) -> list[tuple[Any, Any]]:
+    """
+    Invalidate the cached wishlists holding `product_ids` and move their
+    items to the current category of their product. An item whose wishlist
+    already holds a product of the new category keeps its former one, and
+    the (product id, wishlist id) pairs of those items are returned.
+    """
+    items = list(
+        WishListItem.objects.filter(product_id__in=product_ids).order_by('id')
+        .values_list('id', 'wishlist_id', 'wishlist__user_id', 'product_id', 'category_id',
+                     'product__product_category_id')
+    )
+    if not items:
+        return []
+    moved = [item for item in items if item[4] != item[5]]
+    conflicts = move_items(moved) if moved else []
+    product_cache.invalidate_wishlists({user_id for _, _, user_id, *_ in items})
+    for product_id, wishlist_id in conflicts:
+        logger.warning('Product %s keeps its former category in wishlist %s, which holds a product of the new one.',
+                       product_id, wishlist_id)
+    return conflicts
+
+
+def move_items(moved: list[tuple]) -> list[tuple[Any, Any]]:
+    """
+    Move the `moved` items to their new category, and return the (product id,
+    wishlist id) pairs of those left in their former one by a conflict.
+    """
+    ids = [item_id for item_id, *_ in moved]
+    taken = set(
+        WishListItem.objects.filter(wishlist_id__in={wishlist_id for _, wishlist_id, *_ in moved})
+        .exclude(id__in=ids).values_list('wishlist_id', 'category_id')
+    )
+    # An item left in place still holds its former category, which may be
+    # the new one of an item assigned before it, so assign them again until
+    # no item is left in place.
+    stuck: set[Any] = set()
+    while True:
+        occupied = taken | {(wishlist_id, old) for item_id, wishlist_id, _, _, old, _ in moved if item_id in stuck}
+        kept = []
+        conflicts = set()
+        for item_id, wishlist_id, _, product_id, _, category_id in moved:
+            if item_id in stuck:
+                continue
+            if (wishlist_id, category_id) in occupied:
+                conflicts.add(item_id)
+                continue
+            occupied.add((wishlist_id, category_id))
+            kept.append(WishListItem(id=item_id, wishlist_id=wishlist_id, product_id=product_id, category_id=category_id))
+        if not conflicts:
+            break
+        stuck |= conflicts
+
+    with transaction.atomic():
+        # Deleted and inserted back rather than updated one by one, so that
+        # items swapping categories never collide on the constraint.
+        WishListItem.objects.filter(id__in=[item.id for item in kept]).delete()
+        WishListItem.objects.bulk_create(kept)
+    return [(product_id, wishlist_id) for item_id, wishlist_id, _, product_id, *_ in moved if item_id in stuck]
+
+
+def products_deleted(product_ids: Iterable[Any]) -> None:
+    """Invalidate the cached wishlists holding `product_ids`, before they are deleted."""
+    product_cache.invalidate_wishlists(set(
+        WishListItem.objects.filter(product_id__in=product_ids).values_list('wishlist__user_id', flat=True)))
+
+
+def categories_changed(category_ids: Iterable[Any]) -> None:
+    """Invalidate the cached wishlists holding products of `category_ids`."""
+    product_cache.invalidate_wishlists(set(
+        WishListItem.objects.filter(category_id__in=category_ids).values_list('wishlist__user_id', flat=True)))
+
+
+def prune_empty(batch_size: int = PRUNE_BATCH_SIZE) -> int:
+    """
+    Delete the wishlists without products, one short transaction per batch
+    of ids, and return how many were deleted.
+
+    An empty wishlist reads the same as a missing one, so no cache is
+    invalidated. Each DELETE checks again that the wishlist is empty, and
+    a product added concurrently fails the foreign key of its item, so a
+    wishlist that gains a product is never deleted with it.
+    """
+    empty = WishList.objects.filter(~Exists(WishListItem.objects.filter(wishlist=OuterRef('pk'))))
+    deleted = 0
+    last_id = 0
+    while True:
+        ids = list(empty.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        last_id = ids[-1]
+        try:
+            with transaction.atomic():
+                # A single DELETE, where delete() would load the wishlists and
+                # run the delete receivers of each, which have nothing to do for
+                # a wishlist without products. The private _raw_delete() is safe
+                # because WishListItem is the only table referencing WishList
+                # and the DELETE itself skips the wishlists holding items.
+                batch = empty.filter(id__in=ids)
+                deleted += batch._raw_delete(batch.db)
+        except IntegrityError:
+            # A wishlist of the batch gained a product meanwhile, the next run prunes the rest.
+            continue